@@ -0,0 +1,213 @@
+"""Process-wide admission control for Gemini calls: a concurrency cap, fair queueing and load shedding
+
+Every Streamlit session shares one Gemini quota. AdmissionController lets
+at most max_concurrent calls run at once (and optionally no more than
+rate_per_minute start per minute); the rest wait in per-user queues that
+are served round-robin, so one user's burst can't starve everyone else.
+Waiters are told their position and an estimated wait as it changes.
+Requests that could not start within max_wait (or while the circuit
+breaker is open, or past the queue limits) are refused up front with
+Overloaded instead of failing after a full round trip.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from gemini_client import CircuitBreaker, ErrorKind, classify_error
+
+
+class Overloaded(Exception):
+    """Raised by AdmissionController.admit when a request is shed; retry_after is in seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ('user', 'enqueued_at', 'granted')
+
+    def __init__(self, user, enqueued_at):
+        self.user = user
+        self.enqueued_at = enqueued_at
+        self.granted = False
+
+
+class AdmissionController:
+    """Concurrency cap with per-user round-robin queues, wait estimates and load shedding
+
+    Use `with controller.admit(user, on_wait):` around a Gemini call. While
+    queued, on_wait(position, eta_seconds) is called from the waiting thread
+    whenever the position changes and at least every update_interval
+    seconds. Wait estimates use a moving average of how long admitted calls
+    held their slot. A call that ends in a quota error pauses new starts
+    for quota_cooldown seconds, so queued requests wait out the quota
+    instead of all failing against it.
+    """
+
+    def __init__(self, max_concurrent=4, rate_per_minute=None, max_queue=50, max_queued_per_user=1,
+                 max_wait=120.0, breaker=None, expected_call_seconds=10.0, quota_cooldown=10.0,
+                 update_interval=1.0, clock=time.monotonic):
+        self.max_concurrent = max(1, max_concurrent)
+        self.interval = 60.0 / rate_per_minute if rate_per_minute else 0.0
+        self.max_queue = max_queue
+        self.max_queued_per_user = max_queued_per_user
+        self.max_wait = max_wait
+        self.breaker = breaker
+        self.quota_cooldown = quota_cooldown
+        self.update_interval = update_interval
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # user -> deque of waiting tickets; the first user is served next
+        self._queued = 0
+        self._in_flight = 0
+        self._next_start = 0.0  # earliest time the next call may start (rate limit, quota cooldown)
+        self._call_seconds = expected_call_seconds  # moving average of slot hold times
+        self.admitted = 0
+        self.enqueued = 0
+        self.shed = 0
+        self.wait_seconds = 0.0
+
+    @contextmanager
+    def admit(self, user, on_wait=None):
+        """Hold one call slot for the duration of the block; raises Overloaded if the request is shed"""
+        ticket = self._enqueue(user)
+        try:
+            self._wait(ticket, on_wait)
+        except BaseException:
+            self._cancel(ticket)
+            raise
+        started = self._clock()
+        quota_hit = False
+        try:
+            yield
+        except Exception as e:
+            # resume_ai wraps SDK errors in GenerationError; the cause carries the real error
+            quota_hit = classify_error(e.__cause__ or e) == ErrorKind.QUOTA
+            raise
+        finally:
+            self._release(self._clock() - started, quota_hit)
+
+    def _enqueue(self, user):
+        with self._cond:
+            now = self._clock()
+            if self.breaker is not None and self.breaker.state == CircuitBreaker.OPEN:
+                self.shed += 1
+                raise Overloaded("AI service is temporarily unavailable.", self.breaker.reset_timeout)
+            ticket = _Ticket(user, now)
+            if not self._queued and self._in_flight < self.max_concurrent and now >= self._next_start:
+                self._grant(ticket, now)
+                return ticket
+            if len(self._queues.get(user, ())) >= self.max_queued_per_user:
+                self.shed += 1
+                raise Overloaded("You already have a request waiting.", self._eta(self._queued, now))
+            eta = self._eta(self._position(user, len(self._queues.get(user, ()))), now)
+            if self._queued >= self.max_queue or eta > self.max_wait:
+                self.shed += 1
+                raise Overloaded("The AI service is busy.", eta)
+            self._queues.setdefault(user, deque()).append(ticket)
+            self._queued += 1
+            self.enqueued += 1
+            return ticket
+
+    def _wait(self, ticket, on_wait):
+        reported_position, reported_at = None, 0.0
+        with self._cond:
+            while True:
+                self._dispatch()
+                if ticket.granted:
+                    return
+                now = self._clock()
+                position = self._position(ticket.user, self._queues[ticket.user].index(ticket))
+                if on_wait is not None and (position != reported_position
+                                            or now - reported_at >= self.update_interval):
+                    reported_position, reported_at = position, now
+                    eta = self._eta(position, now)
+                    # Outside the lock: the callback may block on UI updates
+                    self._cond.release()
+                    try:
+                        on_wait(position, eta)
+                    finally:
+                        self._cond.acquire()
+                    continue
+                timeout = self.update_interval
+                if self._next_start > now:
+                    timeout = min(timeout, self._next_start - now)
+                self._cond.wait(timeout)
+
+    def _cancel(self, ticket):
+        with self._cond:
+            if ticket.granted:
+                self._in_flight -= 1
+            else:
+                queue = self._queues.get(ticket.user)
+                if queue and ticket in queue:
+                    queue.remove(ticket)
+                    self._queued -= 1
+                    if not queue:
+                        del self._queues[ticket.user]
+            self._dispatch()
+
+    def _release(self, held_seconds, quota_hit=False):
+        with self._cond:
+            self._in_flight -= 1
+            self._call_seconds += 0.2 * (held_seconds - self._call_seconds)
+            if quota_hit:
+                self._next_start = max(self._next_start, self._clock() + self.quota_cooldown)
+            self._dispatch()
+
+    def _grant(self, ticket, now):
+        ticket.granted = True
+        self._in_flight += 1
+        self.admitted += 1
+        self.wait_seconds += now - ticket.enqueued_at
+        if self.interval:
+            self._next_start = max(now, self._next_start) + self.interval
+
+    def _dispatch(self):
+        """Grant free slots round-robin across users' queues (call with the lock held)"""
+        granted = False
+        now = self._clock()
+        while self._queues and self._in_flight < self.max_concurrent and now >= self._next_start:
+            user, queue = next(iter(self._queues.items()))
+            self._grant(queue.popleft(), now)
+            self._queued -= 1
+            if queue:
+                self._queues.move_to_end(user)
+            else:
+                del self._queues[user]
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _position(self, user, rank):
+        """Tickets granted before the rank-th ticket of user's queue under round-robin order
+
+        A user not queued yet joins the end of the rotation, after one ticket of every queued user.
+        """
+        position = rank
+        before = True
+        for other, queue in self._queues.items():
+            if other == user:
+                before = False
+            else:
+                position += min(len(queue), rank + 1 if before else rank)
+        return position
+
+    def _eta(self, position, now):
+        """Estimated seconds until the ticket at position starts"""
+        # Every slot busy means waiting for one more call to finish
+        calls_ahead = position + (1 if self._in_flight >= self.max_concurrent else 0)
+        eta = calls_ahead * self._call_seconds / self.max_concurrent
+        if self.interval or self._next_start > now:
+            eta = max(eta, max(0.0, self._next_start - now) + position * self.interval)
+        return eta
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'in_flight': self._in_flight, 'queued': self._queued, 'admitted': self.admitted,
+                'enqueued': self.enqueued, 'shed': self.shed, 'wait_seconds': self.wait_seconds,
+                'call_seconds': self._call_seconds,
+            }
@@ -1,17 +1,34 @@
 import streamlit as st
-from google import genai
-from google.genai import types
-import firebase_admin
-from firebase_admin import credentials, firestore
 from datetime import datetime
+import glob
+import json
+import time
+import uuid
 import os
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_JUSTIFY
-from reportlab.lib import colors
-from io import BytesIO
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from functools import partial, wraps
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from caching import (LRUCache, DiskCacheTier, FirestoreCacheTier,
+                     GenerationCache, canonical_hash)
+from resume_ai import (GEMINI_MODEL, GenerationError, INSTRUCTION_TOKENS, SYSTEM_INSTRUCTION, plan_resume_prompt,
+                       stream_resume_with_gemini)
+from context_cache import ContextCache
+from pdf_templates import TEMPLATES, create_professional_pdf, template_label
+from markdown_pdf import parse_cache_stats
+from pdf_export import export_jobs, export_resumes_zip
+from firestore_writer import WriteBehindQueue, SAVED, FAILED
+from resume_store import ResumeStore
+from retention import RetentionWorker
+from storage import SERVER_TIMESTAMP, FirestoreStorage, SQLiteStorage
+from gemini_client import ResilientGeminiClient, CircuitBreaker, LatencyHistogram
+from admission import AdmissionController, Overloaded
+from metrics import Metrics, serve_metrics, stats_collector
+from resume_sections import plan_section_update, regenerate_sections, section_label, split_sections
+from resume_model import BasicInfo, Education, Experience, Project, Resume
+from warmup import Warmup
 
 # Page configuration - MUST BE FIRST
 st.set_page_config(
@@ -72,388 +89,709 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+def get_setting(name, default=None):
+    """Read a setting from Streamlit secrets, falling back to the environment"""
+    try:
+        value = st.secrets.get(name)
+    except Exception:
+        value = None
+    return value if value is not None else os.environ.get(name, default)
+
+# Tracing and metrics
+@st.cache_resource
+def get_metrics():
+    """Initialize and cache the process-wide metrics registry (and its HTTP endpoint, if enabled)"""
+    metrics = Metrics()
+    port = get_setting("CVREADY_METRICS_PORT")
+    if port:
+        try:
+            serve_metrics(metrics, int(port))
+        except OSError as e:
+            st.warning(f"Metrics endpoint not started: {str(e)}")
+    return metrics
+
+metrics = get_metrics()
+if 'trace_session' not in st.session_state:
+    st.session_state.trace_session = uuid.uuid4().hex[:12]
+metrics.start_trace(session=st.session_state.trace_session)
+rerun_started = time.perf_counter()
+rerun_cpu_started = time.thread_time()
+
+@st.cache_resource
+def get_rerun_cpu_histogram():
+    """Initialize and cache the histogram of server CPU time per full or fragment rerun"""
+    histogram = LatencyHistogram(buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+    metrics.add_histogram('cvready_rerun_cpu_seconds', histogram, ('scope', 'outcome'),
+                          "Server CPU time per script rerun, by fragment ('app' for full reruns)")
+    return histogram
+
+rerun_cpu = get_rerun_cpu_histogram()
+
+def app_fragment(fn):
+    """st.fragment that traces and times its own reruns
+
+    A widget inside the fragment reruns only the fragment. Such reruns get
+    their own trace and CPU sample; when the whole app reruns the fragment
+    is part of that run instead. State other parts of the page depend on is
+    handed over through st.session_state, followed by a full st.rerun().
+    """
+    @st.fragment
+    @wraps(fn)
+    def run(*args, **kwargs):
+        ctx = get_script_run_ctx()
+        if not (ctx and ctx.fragment_ids_this_run):
+            return fn(*args, **kwargs)
+        metrics.start_trace(session=st.session_state.trace_session, fragment=fn.__name__)
+        cpu_started = time.thread_time()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            rerun_cpu.observe(fn.__name__, 'ok', time.thread_time() - cpu_started)
+    return run
+
+def rerun_fragment():
+    """Rerun only the calling fragment, or the whole app when this run is a full rerun"""
+    ctx = get_script_run_ctx()
+    st.rerun(scope="fragment" if ctx and ctx.fragment_ids_this_run else "app")
+
+def storage_backend():
+    """'firestore' (the default) or 'sqlite', from CVREADY_STORAGE"""
+    return str(get_setting("CVREADY_STORAGE", "firestore")).lower()
+
+# Background start-up of the Firebase and Gemini clients
+@st.cache_resource
+def start_warmup():
+    """Start creating the Firebase and Gemini clients on background threads (once per server)"""
+    try:
+        firebase_credentials = dict(st.secrets["firebase"]) if "firebase" in st.secrets else 'serviceAccountKey.json'
+    except Exception:
+        firebase_credentials = 'serviceAccountKey.json'
+    try:
+        api_key = st.secrets.get("GEMINI_API_KEY") or os.environ.get("GEMINI_API_KEY")
+    except Exception:
+        api_key = os.environ.get("GEMINI_API_KEY")
+    clients = {}
+    if storage_backend() == 'sqlite':
+        # Resumes are stored locally, so no Firestore client is needed
+        clients['create_firestore'] = lambda _: None
+    if str(get_setting("CVREADY_FAKE_BACKENDS", "")).lower() in ("1", "true", "yes"):
+        # In-memory Firestore and offline Gemini stand-ins, for load tests and local development
+        from fakes import FakeFirestore, FakeGeminiClient
+        fake_db = FakeFirestore(
+            read_latency=float(get_setting("CVREADY_FAKE_FIRESTORE_LATENCY", 0.005)),
+            write_latency=float(get_setting("CVREADY_FAKE_FIRESTORE_LATENCY", 0.005)),
+            error_rate=float(get_setting("CVREADY_FAKE_FIRESTORE_ERROR_RATE", 0))
+        )
+        fake_gemini = FakeGeminiClient(
+            latency=float(get_setting("CVREADY_FAKE_GEMINI_LATENCY", 1.0)),
+            error_rate=float(get_setting("CVREADY_FAKE_GEMINI_ERROR_RATE", 0))
+        )
+        clients.setdefault('create_firestore', lambda _: fake_db)
+        clients['create_gemini'] = lambda _: fake_gemini
+    warmup = Warmup(firebase_credentials, api_key, gemini_model=GEMINI_MODEL,
+                    warm_connections=str(get_setting("CVREADY_WARMUP", "1")).lower() not in ("0", "false", "no"),
+                    **clients)
+    metrics.register_collector(lambda: [('cvready_warmup_seconds', 'gauge', {'step': step}, seconds,
+                                         "Seconds each background start-up step took")
+                                        for step, seconds in dict(warmup.timings).items()])
+    return warmup
+
+warmup = start_warmup()
+
 # Firebase initialization
 @st.cache_resource
 def init_firebase():
     """Initialize Firebase Admin SDK"""
-    try:
-        firebase_admin.get_app()
-    except ValueError:
+    with metrics.span('init_firebase'):
         try:
-            if "firebase" in st.secrets:
-                cred = credentials.Certificate(dict(st.secrets["firebase"]))
-            else:
-                cred = credentials.Certificate('serviceAccountKey.json')
-            firebase_admin.initialize_app(cred)
+            return warmup.firestore()
         except Exception as e:
             st.error(f"Firebase initialization error: {str(e)}")
             return None
-    return firestore.client()
 
-# Initialize Firebase
-db = init_firebase()
+# Resume storage backend
+@st.cache_resource
+def init_storage():
+    """Open the storage backend selected by CVREADY_STORAGE (None if it can't be opened)"""
+    if storage_backend() == 'sqlite':
+        with metrics.span('init_storage', backend='sqlite'):
+            try:
+                return SQLiteStorage(get_setting("CVREADY_SQLITE_PATH", "cvready.db"),
+                                     pool_size=int(get_setting("CVREADY_SQLITE_POOL_SIZE", 4)))
+            except Exception as e:
+                st.error(f"Storage initialization error: {str(e)}")
+                return None
+    db = init_firebase()
+    return FirestoreStorage(db) if db else None
 
 # Initialize Gemini Client
 @st.cache_resource
 def get_gemini_client():
     """Initialize and cache Gemini client"""
     try:
-        api_key = st.secrets.get("GEMINI_API_KEY") or os.environ.get("GEMINI_API_KEY")
-        if api_key:
-            return genai.Client(api_key=api_key)
-        return None
+        return warmup.gemini()
     except Exception as e:
         st.error(f"Error initializing Gemini client: {str(e)}")
         return None
 
-# Firebase helper functions
-def save_resume_to_firebase(db, resume_data, generated_resume, user_email):
-    """Save resume to Firestore"""
-    if not db:
-        st.warning("Firebase not initialized. Resume not saved.")
+@st.cache_resource
+def get_resilient_gemini_client():
+    """Wrap the cached Gemini client with retries, a shared circuit breaker and hedging"""
+    client = get_gemini_client()
+    if not client:
+        return None
+    hedge_after = get_setting("CVREADY_HEDGE_AFTER")
+    resilient = ResilientGeminiClient(
+        client,
+        max_attempts=int(get_setting("CVREADY_GEMINI_MAX_ATTEMPTS", 3)),
+        breaker=CircuitBreaker(
+            failure_threshold=int(get_setting("CVREADY_BREAKER_THRESHOLD", 5)),
+            reset_timeout=float(get_setting("CVREADY_BREAKER_RESET", 30))
+        ),
+        hedge_after=float(hedge_after) if hedge_after else None
+    )
+    metrics.add_histogram('cvready_gemini_call_seconds', resilient.histogram, ('operation', 'outcome'),
+                          "Gemini API call latency by outcome")
+    metrics.register_collector(stats_collector('cvready_gemini', resilient.stats,
+                                               counters=('calls', 'retries', 'hedges')))
+    return resilient
+
+@st.cache_resource
+def get_admission_controller():
+    """Initialize and cache the process-wide cap and fair queue in front of Gemini calls"""
+    resilient = get_resilient_gemini_client()
+    rate = get_setting("CVREADY_GEMINI_RPM")
+    admission = AdmissionController(
+        max_concurrent=int(get_setting("CVREADY_GEMINI_MAX_CONCURRENT", 4)),
+        rate_per_minute=float(rate) if rate else None,
+        max_queue=int(get_setting("CVREADY_QUEUE_MAX", 50)),
+        max_wait=float(get_setting("CVREADY_QUEUE_MAX_WAIT", 120)),
+        breaker=resilient.breaker if resilient else None
+    )
+    metrics.register_collector(stats_collector('cvready_admission', admission.stats,
+                                               counters=('admitted', 'enqueued', 'shed', 'wait_seconds'),
+                                               gauges=('in_flight', 'queued')))
+    return admission
+
+@st.cache_resource
+def get_context_cache():
+    """Initialize and cache the Gemini context cache for the fixed system instruction"""
+    context_cache = ContextCache(
+        get_resilient_gemini_client(), GEMINI_MODEL, SYSTEM_INSTRUCTION,
+        ttl=float(get_setting("CVREADY_CONTEXT_CACHE_TTL", 3600)),
+        enabled=str(get_setting("CVREADY_CONTEXT_CACHE", "1")).lower() not in ("0", "false", "no")
+    )
+    metrics.register_collector(stats_collector('cvready_context_cache', context_cache.stats,
+                                               counters=('created', 'failures'), gauges=('active', 'cached_tokens')))
+    metrics.register_collector(lambda: [
+        ('cvready_gemini_input_tokens_total', 'counter', {'source': source}, context_cache.stats()[key],
+         "Input tokens reported by Gemini for resume generations")
+        for source, key in (('all', 'prompt_tokens'), ('context_cache', 'cached_prompt_tokens'))])
+    return context_cache
+
+# Generation cache
+@st.cache_resource
+def get_generation_cache():
+    """Initialize and cache the two-tier generated resume cache"""
+    ttl = float(get_setting("CVREADY_CACHE_TTL", 24 * 3600))
+    memory = LRUCache(max_entries=int(get_setting("CVREADY_CACHE_SIZE", 256)), ttl=ttl)
+    backing = None
+    cache_dir = get_setting("CVREADY_CACHE_DIR")
+    if cache_dir:
+        backing = DiskCacheTier(cache_dir, ttl=ttl,
+                                max_bytes=float(get_setting("CVREADY_CACHE_DISK_MAX_MB", 512)) * 2 ** 20)
+    elif isinstance(storage, FirestoreStorage) and \
+            str(get_setting("CVREADY_FIRESTORE_CACHE", "")).lower() in ("1", "true", "yes"):
+        backing = FirestoreCacheTier(storage.db, ttl=ttl)
+    cache = GenerationCache(memory, backing)
+    metrics.register_collector(stats_collector('cvready_cache', cache.stats, counters=('hits', 'misses', 'evictions'),
+                                               gauges=('entries',), cache='generation'))
+    return cache
+
+# Rendered PDF cache
+@st.cache_resource
+def get_pdf_cache():
+    """Initialize and cache the memory-bounded store of rendered PDF bytes"""
+    cache = LRUCache(
+        max_entries=int(get_setting("CVREADY_PDF_CACHE_SIZE", 128)),
+        max_bytes=int(get_setting("CVREADY_PDF_CACHE_BYTES", 32 * 1024 * 1024))
+    )
+    metrics.register_collector(stats_collector('cvready_cache', cache.stats, counters=('hits', 'misses', 'evictions'),
+                                               gauges=('entries', 'bytes'), cache='pdf'))
+    # Parsed generated markdown, shared by every template's render
+    metrics.register_collector(stats_collector('cvready_cache', parse_cache_stats, counters=('hits', 'misses', 'evictions'),
+                                               gauges=('entries',), cache='markdown'))
+    return cache
+
+# PDF export worker pool
+@st.cache_resource
+def get_pdf_export_pool():
+    """Initialize and cache the process pool used for bulk PDF export"""
+    workers = int(get_setting("CVREADY_EXPORT_WORKERS", os.cpu_count() or 2))
+    # spawn rather than fork: the Streamlit server process is multi-threaded
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+# Saved-resume listing cache
+@st.cache_resource
+def get_resume_list_cache():
+    """Initialize and cache the per-email saved-resume listings"""
+    cache = LRUCache(max_entries=1024, ttl=float(get_setting("CVREADY_LIST_CACHE_TTL", 300)))
+    metrics.register_collector(stats_collector('cvready_cache', cache.stats, counters=('hits', 'misses', 'evictions'),
+                                               gauges=('entries',), cache='resume_list'))
+    return cache
+
+# Background storage writes
+@st.cache_resource
+def get_write_queue():
+    """Initialize and cache the write-behind queue shared by all sessions"""
+    if not storage:
+        return None
+    queue = WriteBehindQueue(storage, batch_size=int(get_setting("CVREADY_WRITE_BATCH_SIZE", 20)))
+    metrics.register_collector(stats_collector('cvready_firestore_batch', queue.stats,
+                                               counters=('commits', 'retries', 'failures'), gauges=('pending',)))
+    metrics.register_collector(lambda: [('cvready_firestore_writes_total', 'counter', {'source': 'write_queue'},
+                                         queue.writes, "Firestore document writes")])
+    return queue
+
+# Content-addressed resume storage
+@st.cache_resource
+def get_resume_store():
+    """Initialize and cache the content-addressed resume version store"""
+    if not storage:
+        return None
+    store = ResumeStore(storage)
+    metrics.register_collector(lambda: [('cvready_firestore_reads_total', 'counter', {'source': 'resume_blobs'},
+                                         store.blob_reads, "Firestore document reads")])
+    return store
+
+# Retention and bulk deletes
+@st.cache_resource
+def get_retention_worker():
+    """Initialize and cache the background worker that purges old and deleted resume versions"""
+    if not storage:
+        return None
+    worker = RetentionWorker(storage, keep=int(get_setting("CVREADY_RETENTION_KEEP", 0)),
+                             interval=float(get_setting("CVREADY_RETENTION_INTERVAL", 3600)),
+                             chunk_size=int(get_setting("CVREADY_DELETE_CHUNK_SIZE", 100)),
+                             on_purged=resume_list_cache.pop,
+                             sweep_interval=float(get_setting("CVREADY_BLOB_SWEEP_INTERVAL", 86400)),
+                             sweep_grace=float(get_setting("CVREADY_BLOB_SWEEP_GRACE", 86400)),
+                             forget_blobs=resume_store.forget)
+    metrics.register_collector(stats_collector('cvready_retention', worker.stats,
+                                               counters=('jobs', 'deleted', 'sweeps', 'blobs_deleted', 'failures'),
+                                               gauges=('pending',)))
+    return worker
+
+# ATS keyword index over job postings
+@st.cache_resource
+def get_ats_index():
+    """Load (building it if missing or stale) and cache the ATS index of CVREADY_ATS_POSTINGS"""
+    postings_path = get_setting("CVREADY_ATS_POSTINGS")
+    if not postings_path:
         return None
+    # numpy-backed, so only imported when ATS matching is configured
+    from ats_index import load_or_build
     try:
-        doc_ref = db.collection('resumes').add({
-            'user_email': user_email,
-            'resume_data': resume_data,
-            'generated_resume': generated_resume,
-            'created_at': firestore.SERVER_TIMESTAMP
-        })
-        return doc_ref[1].id
+        with metrics.span('ats_index_load'):
+            return load_or_build(postings_path, get_setting("CVREADY_ATS_INDEX"))
+    except Exception as e:
+        st.error(f"ATS index error: {str(e)}")
+        return None
+
+# Storage helper functions
+def save_resume_to_firebase(storage, resume_data, generated_resume, user_email, parent=None):
+    """Queue a resume save to storage; returns the new version's info (with 'id')
+
+    resume_data and the generated text are stored once per distinct content
+    in resume_blobs, the text as a delta against parent (the version this
+    one was derived from) when that is smaller. The write is committed in
+    the background, check write_queue.status(info['id']) for the outcome.
+    """
+    if not storage or not write_queue:
+        st.warning("Storage not initialized. Resume not saved.")
+        return None
+    try:
+        with metrics.span('save_resume'):
+            version_doc, blob_writes, version_info = resume_store.build_version(
+                user_email, resume_data, generated_resume, parent)
+            coalesce_key = canonical_hash([user_email, version_doc])
+            version_doc['created_at'] = SERVER_TIMESTAMP
+            
+            def on_done(saved):
+                if saved:
+                    resume_store.mark_written(blob_writes)
+                    retention.enforce(user_email)
+                resume_list_cache.pop(user_email)
+            
+            version_info['id'] = write_queue.enqueue(
+                'resumes',
+                version_doc,
+                coalesce_key=coalesce_key,
+                on_done=on_done,
+                related=blob_writes
+            )
+        return version_info
     except Exception as e:
-        st.error(f"Error saving to Firebase: {str(e)}")
+        st.error(f"Error saving resume: {str(e)}")
         return None
 
-def load_user_resumes(db, user_email):
-    """Load all resumes for a user"""
-    if not db:
+RESUME_PAGE_SIZE = 10
+
+def fetch_resume_page(storage, user_email, start_after=None, page_size=RESUME_PAGE_SIZE):
+    """Fetch one page of a user's saved resumes (id, name, created_at only)
+
+    Pages are ordered newest first, ties broken by id, and continue after
+    the (created_at, id) cursor start_after; versions saved in one batch
+    share a created_at. Both backends serve this from a (user_email,
+    created_at DESC, id DESC) index (on Firestore, the composite index in
+    firestore.indexes.json).
+    Returns (resumes, has_more).
+    """
+    resumes = []
+    with metrics.span('fetch_resume_page', first_page=start_after is None):
+        # One extra row tells us whether another page exists
+        for doc_id, data in storage.list_resumes(user_email, start_after=start_after,
+                                                  limit=page_size + 1, summary=True):
+            # 'name' is top-level on content-addressed versions, nested on older documents
+            name = data.get('name') or data.get('resume_data', {}).get('basic_info', {}).get('name')
+            resumes.append({
+                'id': doc_id,
+                'name': name or 'Untitled',
+                'created_at': data.get('created_at')
+            })
+    metrics.inc('cvready_firestore_reads_total', len(resumes), source='resume_list')
+    return resumes[:page_size], len(resumes) > page_size
+
+def load_user_resumes(storage, user_email):
+    """First page of a user's saved resumes, cached per email; returns (resumes, has_more)"""
+    if not storage:
+        return [], False
+    with metrics.span('load_user_resumes') as span:
+        first_page = resume_list_cache.get(user_email)
+        span.set(cache_hit=first_page is not None)
+        if first_page is not None:
+            return first_page
+        try:
+            first_page = fetch_resume_page(storage, user_email)
+            resume_list_cache.put(user_email, first_page)
+            return first_page
+        except Exception as e:
+            st.error(f"Error loading resumes: {str(e)}")
+            return [], False
+
+def load_more_user_resumes(storage, user_email, resumes):
+    """Fetch the page after the last resume shown; returns (resumes, has_more)"""
+    try:
+        return fetch_resume_page(storage, user_email, start_after=(resumes[-1]['created_at'], resumes[-1]['id']))
+    except Exception as e:
+        st.error(f"Error loading resumes: {str(e)}")
+        return [], True
+
+def load_resume_from_firebase(storage, doc_id):
+    """Fetch one full saved resume document"""
+    if not storage:
+        return None
+    try:
+        with metrics.span('load_resume', doc_id=doc_id):
+            doc = storage.get('resumes', doc_id)
+            metrics.inc('cvready_firestore_reads_total', source='resumes')
+            if doc is None:
+                return None
+            return resume_store.resolve(dict(doc, id=doc_id))
+    except Exception as e:
+        st.error(f"Error loading resume: {str(e)}")
+        return None
+
+def load_all_user_resumes(storage, user_email):
+    """Load every saved resume for a user, newest first"""
+    if not storage:
         return []
     try:
-        resumes = []
-        docs = db.collection('resumes')\
-            .where('user_email', '==', user_email)\
-            .order_by('created_at', direction=firestore.Query.DESCENDING)\
-            .limit(10)\
-            .stream()
-        
-        for doc in docs:
-            resume = doc.to_dict()
-            resume['id'] = doc.id
-            resumes.append(resume)
-        
+        resumes = [resume_store.resolve(dict(data, id=doc_id))
+                   for doc_id, data in storage.list_resumes(user_email)]
+        metrics.inc('cvready_firestore_reads_total', len(resumes), source='resumes')
         return resumes
     except Exception as e:
         st.error(f"Error loading resumes: {str(e)}")
         return []
 
-def delete_resume_from_firebase(db, doc_id):
-    """Delete resume from Firestore"""
-    if not db:
+def delete_resume_from_firebase(storage, doc_id, user_email=None):
+    """Delete a saved resume from storage"""
+    if not storage:
         return False
     try:
-        db.collection('resumes').document(doc_id).delete()
+        storage.delete('resumes', doc_id)
+        metrics.inc('cvready_firestore_writes_total', source='delete')
+        resume_list_cache.pop(user_email)
         return True
     except Exception as e:
         st.error(f"Error deleting resume: {str(e)}")
         return False
 
-# AI Resume Generation Functions
-def build_resume_prompt(resume_data: dict) -> str:
-    """Build the prompt for Gemini"""
-    basic = resume_data.get('basic_info', {})
-    experiences = resume_data.get('experience', [])
-    education = resume_data.get('education', [])
-    projects = resume_data.get('projects', [])
+# PDF Generation Function
+def render_pdf_cached(resume, generated_resume, template_style, cache):
+    """Return PDF bytes, running ReportLab layout only for inputs not seen before"""
+    with metrics.span('render_pdf', template=template_style) as span:
+        key = (resume.canonical_hash(), canonical_hash(generated_resume), template_style)
+        pdf_bytes = cache.get(key)
+        span.set(cache_hit=pdf_bytes is not None)
+        if pdf_bytes is None:
+            pdf_bytes = create_professional_pdf(resume.to_dict(), generated_resume, template_style).getvalue()
+            cache.put(key, pdf_bytes)
+        return pdf_bytes
+
+def export_all_resumes(storage, user_email, progress_bar):
+    """Render every saved resume in every template into a ZIP file on disk"""
+    resumes = load_all_user_resumes(storage, user_email)
+    total = len(resumes) * len(TEMPLATES)
+    if not total:
+        return None, 0
+    
+    def report(done):
+        progress_bar.progress(done / total, text=f"Rendered {done}/{total} PDFs")
     
-    prompt = f"""Create a professional, ATS-friendly resume for the following candidate:
+    remove_old_exports()
+    fd, zip_path = tempfile.mkstemp(prefix=EXPORT_PREFIX, suffix=".zip")
+    try:
+        with metrics.span('export_all_resumes') as span, os.fdopen(fd, 'wb') as zip_file:
+            count = export_resumes_zip(export_jobs(resumes, list(TEMPLATES)), zip_file,
+                                       get_pdf_export_pool(), progress=report)
+            span.set(pdfs=count)
+    except BaseException:
+        os.remove(zip_path)
+        raise
+    return zip_path, count
 
-PERSONAL INFORMATION:
-Name: {basic.get('name', 'N/A')}
-Email: {basic.get('email', 'N/A')}
-Phone: {basic.get('phone', 'N/A')}
-Location: {basic.get('location', 'N/A')}
-LinkedIn: {basic.get('linkedin', 'N/A')}
-Target Job Title: {basic.get('job_title', 'N/A')}
+EXPORT_PREFIX = "cvready-export-"
 
-SKILLS:
-{basic.get('skills', 'N/A')}
+def remove_old_exports():
+    """Delete export ZIPs older than CVREADY_EXPORT_MAX_AGE seconds, left by any session"""
+    cutoff = time.time() - float(get_setting("CVREADY_EXPORT_MAX_AGE", 3600))
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), f"{EXPORT_PREFIX}*.zip")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass  # already removed by another session
 
-PROFESSIONAL SUMMARY:
-{basic.get('summary', 'Generate a compelling 3-4 sentence professional summary')}
+@st.cache_resource
+def clean_exports_at_startup():
+    """Remove exports left over from a previous server run (once per server)"""
+    remove_old_exports()
+    return True
 
-WORK EXPERIENCE:"""
-    
-    for exp in experiences:
-        if exp.get('title'):
-            prompt += f"\n\n{exp['title']} at {exp.get('company', 'N/A')}"
-            prompt += f"\n{exp.get('start', '')} - {exp.get('end', '')}"
-            prompt += f"\n{exp.get('responsibilities', '')}"
-    
-    prompt += "\n\nEDUCATION:"
-    for edu in education:
-        if edu.get('degree'):
-            prompt += f"\n{edu['degree']}, {edu.get('institution', '')}, {edu.get('year', '')}"
-    
-    if projects and any(p.get('name') for p in projects):
-        prompt += "\n\nPROJECTS:"
-        for proj in projects:
-            if proj.get('name'):
-                prompt += f"\n\n{proj['name']}"
-                prompt += f"\n{proj.get('description', '')}"
-                prompt += f"\nTechnologies: {proj.get('technologies', '')}"
-    
-    prompt += """
+@st.fragment(run_every=1)
+def purge_status_panel():
+    """Show the progress of this session's delete-all job, rerunning the app once it finishes"""
+    job = st.session_state.purge_job
+    if job.finished:
+        st.rerun()
+    elif job.matched:
+        st.progress(job.deleted / job.matched, text=f"Deleted {job.deleted}/{job.matched} resumes...")
+    else:
+        st.caption("🗑️ Finding saved resumes...")
 
-Please create a well-structured, professional resume with:
-1. A compelling professional summary (if not provided, create one)
-2. Optimized work experience with achievement-focused bullet points
-3. Relevant skills section
-4. Clean formatting suitable for ATS systems
-5. Action verbs and quantifiable results
+@st.fragment(run_every=1)
+def save_status_panel():
+    """Poll background saves started by this session and report their outcome"""
+    finished = False
+    for doc_id in list(st.session_state.pending_saves):
+        state, error = write_queue.status(doc_id)
+        if state == SAVED:
+            st.toast("✅ Resume saved")
+        elif state == FAILED:
+            st.error(f"Error saving resume: {error}")
+            current = st.session_state.current_version
+            if current and current['id'] == doc_id:
+                st.session_state.current_version = None
+        else:
+            continue
+        st.session_state.pending_saves.remove(doc_id)
+        finished = True
+    if st.session_state.pending_saves:
+        st.caption(f"💾 Saving {len(st.session_state.pending_saves)} resume(s)...")
+    elif finished:
+        st.rerun()
 
-Format in clean, readable markdown."""
-    
-    return prompt
+def store_generated_resume(generated_resume, user_email):
+    """Make generated_resume the current result and auto-save it if the user is logged in"""
+    st.session_state.generated_resume = generated_resume
+    # The inputs behind this text, so later edits can regenerate only what changed
+    # (a Resume is never modified in place, so sharing it is enough)
+    st.session_state.generated_from = st.session_state.resume
+    if user_email and storage:
+        version = save_resume_to_firebase(storage, st.session_state.resume.to_dict(),
+                                          generated_resume, user_email,
+                                          parent=st.session_state.current_version)
+        if version:
+            st.session_state.current_version = version
+            if version['id'] not in st.session_state.pending_saves:
+                st.session_state.pending_saves.append(version['id'])
 
-def generate_resume_with_gemini(resume_data: dict, client) -> str:
-    """Generate resume using Gemini with new API"""
-    try:
-        if not client:
-            return "Error: Gemini client not initialized. Please configure your API key."
-        
-        # Build the prompt
-        prompt = build_resume_prompt(resume_data)
-        
-        # Generate content with new API
-        response = client.models.generate_content(
-            model='gemini-2.0-flash-exp',  # Using Gemini 2.0 Flash (most recent available)
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                temperature=0.7,
-                top_p=0.95,
-                top_k=40,
-                max_output_tokens=8192,
-                safety_settings=[
-                    types.SafetySetting(
-                        category='HARM_CATEGORY_HATE_SPEECH',
-                        threshold='BLOCK_NONE'
-                    ),
-                    types.SafetySetting(
-                        category='HARM_CATEGORY_HARASSMENT',
-                        threshold='BLOCK_NONE'
-                    ),
-                    types.SafetySetting(
-                        category='HARM_CATEGORY_SEXUALLY_EXPLICIT',
-                        threshold='BLOCK_NONE'
-                    ),
-                    types.SafetySetting(
-                        category='HARM_CATEGORY_DANGEROUS_CONTENT',
-                        threshold='BLOCK_NONE'
-                    )
-                ]
-            )
-        )
-        
-        # Extract text from response
-        if hasattr(response, 'text') and response.text:
-            return response.text
-        else:
-            return "Error: No response generated. Content may have been filtered."
-        
-    except Exception as e:
-        error_msg = str(e)
-        
-        if "API_KEY_INVALID" in error_msg or "invalid api key" in error_msg.lower():
-            return "Error: Invalid API key. Please verify your Gemini API key."
-        elif "quota" in error_msg.lower() or "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
-            return "Error: API quota exceeded. Please try again later."
-        elif "403" in error_msg or "permission" in error_msg.lower():
-            return "Error: API access forbidden. Ensure Gemini API is enabled."
-        elif "404" in error_msg or "not found" in error_msg.lower():
-            return "Error: Model not found. Please check if the model is available."
-        elif "blocked" in error_msg.lower() or "safety" in error_msg.lower():
-            return "Error: Content was blocked by safety filters."
-        elif "timeout" in error_msg.lower() or "deadline" in error_msg.lower():
-            return "Error: Request timed out. Please try again."
-        else:
-            return f"Error: {error_msg}"
+def admit_gemini_call(placeholder):
+    """admit= callable for the Gemini helpers: waits for a call slot, showing the queue position in placeholder"""
+    user = st.session_state.user_email or st.session_state.trace_session
+    def show_position(position, eta):
+        placeholder.info(f"🚦 The AI service is busy: you're #{position + 1} in line, about {eta:.0f}s to go...")
+    return lambda: admission.admit(user, on_wait=show_position)
 
-# PDF Generation Function
-def create_professional_pdf(resume_data, generated_resume, template_style="modern"):
-    """Create a professional PDF resume"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
-    
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Custom styles based on template
-    if template_style == "modern":
-        title_style = ParagraphStyle(
-            'CustomTitle', parent=styles['Heading1'], fontSize=24,
-            textColor=colors.HexColor('#2563eb'), spaceAfter=6,
-            alignment=TA_CENTER, fontName='Helvetica-Bold'
-        )
-        heading_style = ParagraphStyle(
-            'CustomHeading', parent=styles['Heading2'], fontSize=14,
-            textColor=colors.HexColor('#1e40af'), spaceAfter=6, spaceBefore=12,
-            fontName='Helvetica-Bold', borderColor=colors.HexColor('#2563eb'),
-            borderWidth=2, borderPadding=5
-        )
-    elif template_style == "classic":
-        title_style = ParagraphStyle(
-            'CustomTitle', parent=styles['Heading1'], fontSize=22,
-            textColor=colors.black, spaceAfter=6,
-            alignment=TA_CENTER, fontName='Times-Bold'
-        )
-        heading_style = ParagraphStyle(
-            'CustomHeading', parent=styles['Heading2'], fontSize=13,
-            textColor=colors.black, spaceAfter=6, spaceBefore=12,
-            fontName='Times-Bold', borderColor=colors.black,
-            borderWidth=1, borderPadding=3
-        )
-    elif template_style == "creative":
-        title_style = ParagraphStyle(
-            'CustomTitle', parent=styles['Heading1'], fontSize=26,
-            textColor=colors.HexColor('#7c3aed'), spaceAfter=6,
-            alignment=TA_CENTER, fontName='Helvetica-Bold'
-        )
-        heading_style = ParagraphStyle(
-            'CustomHeading', parent=styles['Heading2'], fontSize=14,
-            textColor=colors.HexColor('#7c3aed'), spaceAfter=6, spaceBefore=12,
-            fontName='Helvetica-Bold', borderColor=colors.HexColor('#a78bfa'),
-            borderWidth=2, borderPadding=5
-        )
-    else:  # minimal
-        title_style = ParagraphStyle(
-            'CustomTitle', parent=styles['Heading1'], fontSize=20,
-            textColor=colors.HexColor('#374151'), spaceAfter=6,
-            alignment=TA_LEFT, fontName='Helvetica-Bold'
-        )
-        heading_style = ParagraphStyle(
-            'CustomHeading', parent=styles['Heading2'], fontSize=12,
-            textColor=colors.HexColor('#374151'), spaceAfter=6, spaceBefore=12,
-            fontName='Helvetica-Bold'
-        )
-    
-    contact_style = ParagraphStyle(
-        'ContactStyle', parent=styles['Normal'], fontSize=10,
-        textColor=colors.HexColor('#6b7280'), alignment=TA_CENTER, spaceAfter=12
-    )
-    body_style = ParagraphStyle(
-        'BodyStyle', parent=styles['Normal'], fontSize=10,
-        textColor=colors.black, spaceAfter=6, alignment=TA_JUSTIFY
-    )
-    
-    # Get data
-    basic = resume_data.get('basic_info', {})
-    experiences = resume_data.get('experience', [])
-    education = resume_data.get('education', [])
-    projects = resume_data.get('projects', [])
-    
-    # Header - Name
-    name = basic.get('name', 'Your Name')
-    elements.append(Paragraph(name.upper(), title_style))
-    
-    # Contact Information
-    contact_info = []
-    if basic.get('email'):
-        contact_info.append(basic['email'])
-    if basic.get('phone'):
-        contact_info.append(basic['phone'])
-    if basic.get('location'):
-        contact_info.append(basic['location'])
-    if basic.get('linkedin'):
-        contact_info.append(basic['linkedin'])
-    
-    if contact_info:
-        elements.append(Paragraph(' | '.join(contact_info), contact_style))
-    
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Professional Summary
-    if basic.get('summary'):
-        elements.append(Paragraph("PROFESSIONAL SUMMARY", heading_style))
-        elements.append(Paragraph(basic['summary'], body_style))
-        elements.append(Spacer(1, 0.15*inch))
-    
-    # Skills
-    if basic.get('skills'):
-        elements.append(Paragraph("SKILLS", heading_style))
-        elements.append(Paragraph(basic['skills'], body_style))
-        elements.append(Spacer(1, 0.15*inch))
-    
-    # Work Experience
-    if experiences and any(exp.get('title') for exp in experiences):
-        elements.append(Paragraph("WORK EXPERIENCE", heading_style))
-        
-        for exp in experiences:
-            if exp.get('title'):
-                job_header = f"<b>{exp['title']}</b> | {exp.get('company', '')}"
-                elements.append(Paragraph(job_header, body_style))
-                
-                duration = f"{exp.get('start', '')} - {exp.get('end', '')}"
-                duration_style = ParagraphStyle('Duration', parent=body_style, 
-                    textColor=colors.HexColor('#6b7280'), fontSize=9)
-                elements.append(Paragraph(duration, duration_style))
-                
-                if exp.get('responsibilities'):
-                    resp_lines = exp['responsibilities'].split('\n')
-                    for line in resp_lines:
-                        if line.strip():
-                            elements.append(Paragraph(f"• {line.strip()}", body_style))
-                
-                elements.append(Spacer(1, 0.1*inch))
-    
-    # Education
-    if education and any(edu.get('degree') for edu in education):
-        elements.append(Paragraph("EDUCATION", heading_style))
-        for edu in education:
-            if edu.get('degree'):
-                edu_text = f"<b>{edu['degree']}</b> | {edu.get('institution', '')} | {edu.get('year', '')}"
-                elements.append(Paragraph(edu_text, body_style))
-                elements.append(Spacer(1, 0.05*inch))
-    
-    # Projects
-    if projects and any(proj.get('name') for proj in projects):
-        elements.append(Paragraph("PROJECTS", heading_style))
-        for proj in projects:
-            if proj.get('name'):
-                proj_header = f"<b>{proj['name']}</b>"
-                elements.append(Paragraph(proj_header, body_style))
-                
-                if proj.get('description'):
-                    elements.append(Paragraph(proj['description'], body_style))
-                
-                if proj.get('technologies'):
-                    tech_style = ParagraphStyle('Tech', parent=body_style, 
-                        textColor=colors.HexColor('#6b7280'), fontSize=9)
-                    elements.append(Paragraph(f"<i>Technologies: {proj['technologies']}</i>", tech_style))
-                
-                elements.append(Spacer(1, 0.1*inch))
-    
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer
+def overloaded_message(e):
+    return f"Error: {e} Please try again in about {max(1, round(e.retry_after))} seconds."
+
+def read_file_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
 
 # Initialize session state
-if 'resume_data' not in st.session_state:
-    st.session_state.resume_data = {}
+if 'resume' not in st.session_state:
+    st.session_state.resume = Resume()
 if 'generated_resume' not in st.session_state:
     st.session_state.generated_resume = None
+if 'export_zip_path' not in st.session_state:
+    st.session_state.export_zip_path = None
+if 'pending_saves' not in st.session_state:
+    st.session_state.pending_saves = []
+if 'current_version' not in st.session_state:
+    st.session_state.current_version = None
+if 'generated_from' not in st.session_state:
+    st.session_state.generated_from = None
+if 'purge_job' not in st.session_state:
+    st.session_state.purge_job = None
+if 'resume_history' not in st.session_state:
+    st.session_state.resume_history = {'email': None, 'first_page': None, 'more': [], 'has_more': False}
 
-# Initialize Gemini client
-gemini_client = get_gemini_client()
-
-# Title
+# Title (rendered before waiting on the clients, so the first paint isn't blocked)
 st.title("📄 CVReady")
 st.markdown("### Your AI-Powered Resume Builder")
 st.markdown("*Powered by Google Gemini 2.0 & Firebase*")
 
+# Initialize storage (Firestore unless CVREADY_STORAGE selects SQLite)
+storage = init_storage()
+
+# Initialize Gemini client
+gemini_client = get_resilient_gemini_client()
+context_cache = get_context_cache()
+admission = get_admission_controller()
+generation_cache = get_generation_cache()
+pdf_cache = get_pdf_cache()
+resume_list_cache = get_resume_list_cache()
+write_queue = get_write_queue()
+resume_store = get_resume_store()
+retention = get_retention_worker()
+clean_exports_at_startup()
+
+# Tabs and sidebar panels are fragments: a widget inside one reruns only that fragment.
+# Changes other parts of the page depend on go into st.session_state, then st.rerun()
+# reruns the whole app so they pick them up.
+def save_and_rerun(section, notice, **changes):
+    """Store one tab's fields in the session's Resume and rerun the app so the other tabs see them"""
+    st.session_state.resume = replace(st.session_state.resume, **changes)
+    st.session_state[f"{section}_notice"] = notice
+    st.rerun()
+
+def show_notice(section):
+    notice = st.session_state.pop(f"{section}_notice", None)
+    if notice:
+        st.success(notice)
+
+@app_fragment
+def saved_resumes_panel():
+    """The signed-in user's saved resumes, with load, delete and paging"""
+    user_email = st.session_state.user_email
+    first_page, has_more = load_user_resumes(storage, user_email)
+    # Older pages are cached in the session until the shared first page changes
+    history = st.session_state.resume_history
+    if history['email'] != user_email or history['first_page'] is not first_page:
+        history.update(email=user_email, first_page=first_page, more=[], has_more=has_more)
+    saved_resumes = first_page + history['more']
+
+    if saved_resumes:
+        for resume in saved_resumes:
+            with st.expander(f"📄 {resume['name']}"):
+                col1, col2 = st.columns(2)
+
+                with col1:
+                    if st.button("Load", key=f"load_{resume['id']}", use_container_width=True):
+                        full_resume = load_resume_from_firebase(storage, resume['id'])
+                        if full_resume:
+                            st.session_state.resume = Resume.from_dict(full_resume.get('resume_data'))
+                            st.session_state.generated_resume = full_resume.get('generated_resume', '')
+                            st.session_state.generated_from = st.session_state.resume
+                            st.session_state.current_version = resume_store.version_info(full_resume)
+                            st.success("✅ Resume loaded!")
+                            st.rerun()
+
+                with col2:
+                    if st.button("🗑️ Delete", key=f"delete_{resume['id']}", use_container_width=True):
+                        if delete_resume_from_firebase(storage, resume['id'], user_email):
+                            st.success("Deleted!")
+                            rerun_fragment()
+
+        if history['has_more'] and st.button("⬇️ Load older resumes", use_container_width=True):
+            page, history['has_more'] = load_more_user_resumes(storage, user_email, saved_resumes)
+            history['more'].extend(page)
+            rerun_fragment()
+    else:
+        st.info("No saved resumes yet")
+
+@app_fragment
+def export_panel():
+    """Bulk export of every saved version as PDFs"""
+    user_email = st.session_state.user_email
+    if st.button("Export every version as PDFs", use_container_width=True):
+        progress_bar = st.progress(0.0, text="Preparing export...")
+        old_path = st.session_state.export_zip_path
+        if old_path and os.path.exists(old_path):
+            os.remove(old_path)
+        st.session_state.export_zip_path = None
+        try:
+            zip_path, count = export_all_resumes(storage, user_email, progress_bar)
+        except Exception as e:
+            progress_bar.empty()
+            st.error(f"Error exporting resumes: {str(e)}")
+        else:
+            st.session_state.export_zip_path = zip_path
+            if count:
+                progress_bar.progress(1.0, text=f"✅ {count} PDFs ready")
+            else:
+                progress_bar.empty()
+                st.info("No saved resumes to export")
+
+    export_path = st.session_state.export_zip_path
+    if export_path and os.path.exists(export_path):
+        st.download_button(
+            label="📥 Download ZIP",
+            data=partial(read_file_bytes, export_path),
+            file_name=f"cvready_resumes_{datetime.now().strftime('%Y%m%d')}.zip",
+            mime="application/zip",
+            use_container_width=True
+        )
+
+@app_fragment
+def delete_all_panel():
+    """Delete every saved version of the signed-in user's resumes on the retention worker"""
+    job = st.session_state.purge_job
+    if job and not job.finished:
+        purge_status_panel()
+        return
+    if job:
+        if job.error:
+            st.error(f"Error deleting resumes: {job.error}")
+        elif job.deleted:
+            st.success(f"✅ Deleted {job.deleted} saved resume(s)")
+        else:
+            st.info("No saved resumes to delete")
+        st.session_state.purge_job = None
+    confirmed = st.checkbox("I understand this can't be undone", key="confirm_delete_all")
+    if st.button("🗑️ Delete all my resumes", use_container_width=True, disabled=not confirmed):
+        st.session_state.purge_job = retention.submit(st.session_state.user_email)
+        st.session_state.current_version = None
+        rerun_fragment()
+
 # Sidebar
 with st.sidebar:
     st.header("⚙️ Settings")
-    
+
     # API Key Status
     if gemini_client:
         st.success("✅ AI Features Enabled")
@@ -463,255 +801,382 @@ with st.sidebar:
         if api_key_input:
             os.environ["GEMINI_API_KEY"] = api_key_input
             st.rerun()
-    
+
+    cache_stats = generation_cache.stats()
+    st.caption(f"⚡ Generation cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+    if gemini_client and gemini_client.breaker.state != CircuitBreaker.CLOSED:
+        st.warning("⚠️ Gemini is failing right now; requests are paused briefly")
+
     st.markdown("---")
-    
+
     # User Email
-    user_email = st.text_input("Your Email (for saving)", placeholder="user@example.com")
-    
-    if user_email and db:
+    user_email = st.text_input("Your Email (for saving)", placeholder="user@example.com", key="user_email")
+
+    if user_email and storage:
         st.success(f"✅ Logged in as: {user_email}")
-        
+
+        if st.session_state.pending_saves:
+            save_status_panel()
+
         st.markdown("---")
         st.subheader("💾 Your Saved Resumes")
-        
-        saved_resumes = load_user_resumes(db, user_email)
-        
-        if saved_resumes:
-            for resume in saved_resumes:
-                resume_name = resume.get('resume_data', {}).get('basic_info', {}).get('name', 'Untitled')
-                
-                with st.expander(f"📄 {resume_name}"):
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        if st.button("Load", key=f"load_{resume['id']}", use_container_width=True):
-                            st.session_state.resume_data = resume['resume_data']
-                            st.session_state.generated_resume = resume.get('generated_resume', '')
-                            st.success("✅ Resume loaded!")
-                            st.rerun()
-                    
-                    with col2:
-                        if st.button("🗑️ Delete", key=f"delete_{resume['id']}", use_container_width=True):
-                            if delete_resume_from_firebase(db, resume['id']):
-                                st.success("Deleted!")
-                                st.rerun()
-        else:
-            st.info("No saved resumes yet")
-    
+        saved_resumes_panel()
+
+        st.markdown("---")
+        st.subheader("📦 Export All Resumes")
+        export_panel()
+
+        st.markdown("---")
+        st.subheader("🗑️ Delete All Resumes")
+        delete_all_panel()
+
     st.markdown("---")
     st.markdown("🔑 [Get Gemini API Key](https://aistudio.google.com/app/apikey)")
     st.markdown("📖 [View Documentation](https://github.com/yourusername/cvready)")
 
-# Create tabs
-tab1, tab2, tab3, tab4 = st.tabs(["📝 Basic Info", "💼 Experience", "🎓 Education & Projects", "📄 Generate Resume"])
-
 # Tab 1: Basic Information
-with tab1:
+@app_fragment
+def basic_info_tab():
     st.header("Basic Information")
-    
+    basic = st.session_state.resume.basic_info or BasicInfo()
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
-        name = st.text_input("Full Name *", 
-            value=st.session_state.resume_data.get('basic_info', {}).get('name', ''))
-        email = st.text_input("Email *", 
-            value=st.session_state.resume_data.get('basic_info', {}).get('email', ''))
-        phone = st.text_input("Phone *", 
-            value=st.session_state.resume_data.get('basic_info', {}).get('phone', ''))
-    
+        name = st.text_input("Full Name *",
+            value=basic.name)
+        email = st.text_input("Email *",
+            value=basic.email)
+        phone = st.text_input("Phone *",
+            value=basic.phone)
+
     with col2:
-        location = st.text_input("Location", 
-            value=st.session_state.resume_data.get('basic_info', {}).get('location', ''))
-        linkedin = st.text_input("LinkedIn URL", 
-            value=st.session_state.resume_data.get('basic_info', {}).get('linkedin', ''))
-        job_title = st.text_input("Target Job Title", 
-            value=st.session_state.resume_data.get('basic_info', {}).get('job_title', ''))
-    
+        location = st.text_input("Location",
+            value=basic.location)
+        linkedin = st.text_input("LinkedIn URL",
+            value=basic.linkedin)
+        job_title = st.text_input("Target Job Title",
+            value=basic.job_title)
+
     st.markdown("---")
-    
+
     skills = st.text_area(
         "Skills (comma-separated) *",
-        value=st.session_state.resume_data.get('basic_info', {}).get('skills', ''),
+        value=basic.skills,
         placeholder="Python, Machine Learning, Data Analysis, SQL, TensorFlow",
         height=100
     )
-    
+
     professional_summary = st.text_area(
         "Professional Summary (optional - AI can generate)",
-        value=st.session_state.resume_data.get('basic_info', {}).get('summary', ''),
+        value=basic.summary,
         placeholder="A brief overview of your professional background...",
         height=150
     )
-    
+
     if st.button("💾 Save Basic Info", type="primary"):
-        st.session_state.resume_data['basic_info'] = {
-            'name': name, 'email': email, 'phone': phone,
-            'location': location, 'linkedin': linkedin, 'job_title': job_title,
-            'skills': skills, 'summary': professional_summary
-        }
-        st.success("✅ Basic information saved!")
+        save_and_rerun('basic_info', "✅ Basic information saved!", basic_info=BasicInfo(
+            name=name, email=email, phone=phone,
+            location=location, linkedin=linkedin, job_title=job_title,
+            skills=skills, summary=professional_summary
+        ))
+    show_notice('basic_info')
+    if st.session_state.resume.basic_info:
+        for problem in st.session_state.resume.basic_info.problems():
+            st.warning(f"⚠️ {problem}")
 
 # Tab 2: Work Experience
-with tab2:
+@app_fragment
+def experience_tab():
     st.header("Work Experience")
-    
+
     num_jobs = st.number_input("How many jobs to add?", min_value=1, max_value=10, value=1)
-    
+
     experiences = []
     for i in range(num_jobs):
         with st.expander(f"Job #{i+1}", expanded=(i==0)):
             job_title_input = st.text_input(f"Job Title", key=f"job_title_{i}")
             company = st.text_input(f"Company Name", key=f"company_{i}")
-            
+
             col1, col2 = st.columns(2)
             with col1:
                 start_date = st.text_input(f"Start Date", placeholder="MM/YYYY", key=f"start_{i}")
             with col2:
                 end_date = st.text_input(f"End Date", placeholder="MM/YYYY or Present", key=f"end_{i}")
-            
+
             responsibilities = st.text_area(
                 f"Key Responsibilities (one per line)",
                 key=f"resp_{i}",
                 height=100
             )
-            
-            experiences.append({
-                'title': job_title_input, 'company': company,
-                'start': start_date, 'end': end_date,
-                'responsibilities': responsibilities
-            })
-    
+
+            experiences.append(Experience(
+                title=job_title_input, company=company,
+                start=start_date, end=end_date,
+                responsibilities=responsibilities
+            ))
+
     if st.button("💾 Save Work Experience", type="primary"):
-        st.session_state.resume_data['experience'] = experiences
-        st.success("✅ Work experience saved!")
+        save_and_rerun('experience', "✅ Work experience saved!", experience=tuple(experiences))
+    show_notice('experience')
 
 # Tab 3: Education & Projects
-with tab3:
+@app_fragment
+def education_tab():
     st.header("🎓 Education")
-    
+
     num_edu = st.number_input("How many education entries?", min_value=1, max_value=5, value=1)
-    
+
     education = []
     for i in range(num_edu):
         with st.expander(f"Education #{i+1}", expanded=(i==0)):
             degree = st.text_input(f"Degree", placeholder="B.S. Computer Science", key=f"degree_{i}")
             institution = st.text_input(f"Institution", key=f"institution_{i}")
             edu_year = st.text_input(f"Year", placeholder="2020", key=f"edu_year_{i}")
-            
-            education.append({
-                'degree': degree, 'institution': institution, 'year': edu_year
-            })
-    
+
+            education.append(Education(
+                degree=degree, institution=institution, year=edu_year
+            ))
+
     st.markdown("---")
     st.subheader("🚀 Projects (Optional)")
-    
+
     num_projects = st.number_input("How many projects?", min_value=0, max_value=10, value=0)
-    
+
     projects = []
     for i in range(num_projects):
         with st.expander(f"Project #{i+1}", expanded=(i==0)):
             project_name = st.text_input(f"Project Name", key=f"project_name_{i}")
             project_desc = st.text_area(f"Project Description", key=f"project_desc_{i}", height=100)
             project_tech = st.text_input(f"Technologies Used", placeholder="React, Node.js, MongoDB", key=f"project_tech_{i}")
-            
-            projects.append({
-                'name': project_name, 'description': project_desc,
-                'technologies': project_tech
-            })
-    
+
+            projects.append(Project(
+                name=project_name, description=project_desc,
+                technologies=project_tech
+            ))
+
     if st.button("💾 Save Education & Projects", type="primary"):
-        st.session_state.resume_data['education'] = education
-        st.session_state.resume_data['projects'] = projects
-        st.success("✅ Education and projects saved!")
+        save_and_rerun('education', "✅ Education and projects saved!",
+                       education=tuple(education), projects=tuple(projects))
+    show_notice('education')
+
+# Download panel: switching templates reruns only this
+@app_fragment
+def download_panel():
+    st.subheader("📄 Download Your Resume")
+
+    generated_resume = st.session_state.generated_resume
+    resume = st.session_state.resume
+    file_stem = (resume.basic_info.name if resume.basic_info else 'resume').replace(' ', '_')
+    template_choice = st.selectbox(
+        "Choose PDF Template Style",
+        list(TEMPLATES),
+        format_func=template_label
+    )
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.download_button(
+            label="📥 Download as Text",
+            data=generated_resume,
+            file_name=f"{file_stem}_resume.txt",
+            mime="text/plain",
+            use_container_width=True
+        )
+
+    with col2:
+        st.download_button(
+            label="📥 Download as Markdown",
+            data=generated_resume,
+            file_name=f"{file_stem}_resume.md",
+            mime="text/markdown",
+            use_container_width=True
+        )
+
+    with col3:
+        # Rendered only when the button is clicked, then served from the PDF cache
+        pdf_data = partial(
+            render_pdf_cached,
+            resume,
+            generated_resume,
+            template_choice,
+            pdf_cache
+        )
+
+        st.download_button(
+            label="📄 Download as PDF",
+            data=pdf_data,
+            file_name=f"{file_stem}_resume.pdf",
+            mime="application/pdf",
+            use_container_width=True,
+            type="primary"
+        )
 
 # Tab 4: Generate Resume
-with tab4:
+def ats_panel(resume_data, generated_resume):
+    """Keyword fit of the resume against the indexed job postings"""
+    ats_index = get_ats_index()
+    if ats_index is None:
+        return
+    from ats_index import resume_text
+    with st.expander(f"🎯 ATS keyword match ({len(ats_index):,} job postings)", expanded=False):
+        with metrics.span('ats_match', postings=len(ats_index)):
+            report = ats_index.match(resume_text(resume_data, generated_resume), top=5)
+        if not report.resume_terms:
+            st.info("None of your keywords appear in the job postings yet.")
+            return
+        for match in report.matches:
+            company = f" at {match.company}" if match.company else ""
+            st.markdown(f"**{match.title}**{company} — {match.score:.0%} keyword match")
+            if match.missing_keywords:
+                st.caption("Missing: " + ", ".join(match.missing_keywords))
+        if report.missing_keywords:
+            st.markdown("**Keywords to consider adding:** " + ", ".join(report.missing_keywords))
+
+@app_fragment
+def generate_tab():
     st.header("📄 Generate Your Resume")
-    
-    if not st.session_state.resume_data.get('basic_info'):
+
+    if not st.session_state.resume.basic_info:
         st.warning("⚠️ Please fill in your information in the previous tabs first!")
-    else:
-        st.success("✅ Ready to generate your resume!")
-        
-        with st.expander("👁️ Preview Your Data", expanded=False):
-            st.json(st.session_state.resume_data)
-        
-        st.markdown("---")
-        
-        if st.button("🤖 Generate Resume with AI", type="primary", use_container_width=True):
-            with st.spinner("✨ AI is crafting your professional resume..."):
-                generated_resume = generate_resume_with_gemini(st.session_state.resume_data, gemini_client)
-                
-                if generated_resume.startswith("Error:"):
-                    st.error(generated_resume)
-                else:
-                    st.session_state.generated_resume = generated_resume
-                    
-                    # Auto-save to Firebase if user email is provided
-                    if user_email and db:
-                        save_id = save_resume_to_firebase(db, st.session_state.resume_data, 
-                                                         generated_resume, user_email)
-                        if save_id:
-                            st.success("✅ Resume generated and saved to Firebase!")
-                    else:
-                        st.success("✅ Resume generated successfully!")
-                    
+        return
+
+    st.success("✅ Ready to generate your resume!")
+    user_email = st.session_state.user_email
+    resume_data = st.session_state.resume.to_dict()
+
+    with st.expander("👁️ Preview Your Data", expanded=False):
+        st.json(resume_data)
+
+    token_budget = int(get_setting("CVREADY_PROMPT_TOKEN_BUDGET", 6000))
+    prompt_plan = plan_resume_prompt(resume_data, token_budget)
+    instructions = "served from the context cache" if context_cache.stats()['active'] else "sent as system instruction"
+    st.caption(f"📏 Prompt ≈ {prompt_plan.input_tokens:,} tokens + ≈{INSTRUCTION_TOKENS:,} instruction tokens "
+               f"({instructions}) · output capped at {prompt_plan.max_output_tokens:,} tokens")
+    if prompt_plan.trimmed:
+        st.info("✂️ Your details exceed the prompt budget, so these entries were shortened or left out: "
+                + ", ".join(prompt_plan.trimmed))
+
+    st.markdown("---")
+
+    generate_clicked = st.button("🤖 Generate Resume with AI", type="primary", use_container_width=True)
+    regenerate_clicked = False
+    if st.session_state.generated_resume:
+        regenerate_clicked = st.button("🔄 Regenerate (ignore cached result)", use_container_width=True)
+
+    if generate_clicked or regenerate_clicked:
+        stream_placeholder = st.empty()
+        chunks = []
+        try:
+            with metrics.span('generate_resume', regenerate=regenerate_clicked) as span:
+                with st.spinner("✨ AI is crafting your professional resume..."):
+                    resume_stream = stream_resume_with_gemini(
+                        resume_data, gemini_client,
+                        cache=generation_cache, use_cache=not regenerate_clicked,
+                        token_budget=token_budget, context_cache=context_cache,
+                        admit=admit_gemini_call(stream_placeholder)
+                    )
+                    with metrics.span('generate_resume.first_chunk'):
+                        first_chunk = next(resume_stream, None)
+                if first_chunk is not None:
+                    chunks.append(first_chunk)
+                    stream_placeholder.markdown(first_chunk + " ▌")
+                    for chunk in resume_stream:
+                        chunks.append(chunk)
+                        stream_placeholder.markdown("".join(chunks) + " ▌")
+                span.set(input_tokens=prompt_plan.input_tokens, chunks=len(chunks))
+            generated_resume = "".join(chunks)
+        except GenerationError as e:
+            generated_resume = str(e)
+        except Overloaded as e:
+            generated_resume = overloaded_message(e)
+
+        if generated_resume.startswith("Error:"):
+            stream_placeholder.empty()
+            st.error(generated_resume)
+        else:
+            # Auto-save if user email is provided
+            store_generated_resume(generated_resume, user_email)
+            st.rerun()
+
+    # Edits since the last generation: re-prompt only the sections they touch
+    if st.session_state.generated_resume and st.session_state.generated_from \
+            and st.session_state.generated_from != st.session_state.resume:
+        generated_from = st.session_state.generated_from.to_dict()
+        sections = split_sections(st.session_state.generated_resume, generated_from)
+        targets = plan_section_update(sections, generated_from, resume_data)
+        if targets:
+            st.info("✏️ Changed since the last generation: " + ", ".join(section_label(t) for t in targets))
+            if st.button("♻️ Update changed sections only", use_container_width=True):
+                queue_placeholder = st.empty()
+                try:
+                    with st.spinner("✨ Rewriting the changed sections..."), \
+                            metrics.span('regenerate_sections', sections=len(targets)):
+                        update = regenerate_sections(sections, targets, resume_data,
+                                                     gemini_client, admit=admit_gemini_call(queue_placeholder))
+                    store_generated_resume(update.markdown, user_email)
+                    st.session_state.section_update_note = (
+                        f"♻️ Regenerated {len(update.sections)} section(s): ≈{update.output_tokens:,} "
+                        f"output tokens instead of ≈{update.full_output_tokens:,} for the full resume")
                     st.rerun()
-        
-        # Display generated resume
-        if st.session_state.generated_resume:
-            st.markdown("---")
-            st.subheader("📝 Your AI-Generated Resume")
-            
-            st.markdown(st.session_state.generated_resume)
-            
-            st.markdown("---")
-            st.subheader("📄 Download Your Resume")
-            
-            template_choice = st.selectbox(
-                "Choose PDF Template Style",
-                ["modern", "classic", "creative", "minimal"],
-                format_func=lambda x: {
-                    "modern": "🔵 Modern - Bold & Professional",
-                    "classic": "⚫ Classic - Traditional & Formal",
-                    "creative": "🟣 Creative - Unique & Colorful",
-                    "minimal": "⚪ Minimal - Clean & Simple"
-                }[x]
-            )
-            
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.download_button(
-                    label="📥 Download as Text",
-                    data=st.session_state.generated_resume,
-                    file_name=f"{st.session_state.resume_data.get('basic_info', {}).get('name', 'resume').replace(' ', '_')}_resume.txt",
-                    mime="text/plain",
-                    use_container_width=True
-                )
-            
-            with col2:
-                st.download_button(
-                    label="📥 Download as Markdown",
-                    data=st.session_state.generated_resume,
-                    file_name=f"{st.session_state.resume_data.get('basic_info', {}).get('name', 'resume').replace(' ', '_')}_resume.md",
-                    mime="text/markdown",
-                    use_container_width=True
-                )
-            
-            with col3:
-                pdf_buffer = create_professional_pdf(
-                    st.session_state.resume_data,
-                    st.session_state.generated_resume,
-                    template_choice
-                )
-                
-                st.download_button(
-                    label="📄 Download as PDF",
-                    data=pdf_buffer,
-                    file_name=f"{st.session_state.resume_data.get('basic_info', {}).get('name', 'resume').replace(' ', '_')}_resume.pdf",
-                    mime="application/pdf",
-                    use_container_width=True,
-                    type="primary"
-                )
\ No newline at end of file
+                except GenerationError as e:
+                    st.error(str(e))
+                except Overloaded as e:
+                    st.error(overloaded_message(e))
+                queue_placeholder.empty()
+        elif targets is None:
+            st.info("✏️ Your details changed in a way that needs a full regeneration.")
+
+    if st.session_state.get('section_update_note'):
+        st.caption(st.session_state.pop('section_update_note'))
+
+    # Display generated resume
+    if st.session_state.generated_resume:
+        st.markdown("---")
+        st.subheader("📝 Your AI-Generated Resume")
+
+        st.markdown(st.session_state.generated_resume)
+
+        st.markdown("---")
+        download_panel()
+
+    ats_panel(resume_data, st.session_state.generated_resume)
+
+# Create tabs
+tab1, tab2, tab3, tab4 = st.tabs(["📝 Basic Info", "💼 Experience", "🎓 Education & Projects", "📄 Generate Resume"])
+
+with tab1:
+    basic_info_tab()
+
+with tab2:
+    experience_tab()
+
+with tab3:
+    education_tab()
+
+with tab4:
+    generate_tab()
+
+# Optional timing breakdown of this rerun (CVREADY_DEBUG_PANEL=1 or ?debug=1)
+if str(get_setting("CVREADY_DEBUG_PANEL", "")).lower() in ("1", "true", "yes") \
+        or st.query_params.get("debug") == "1":
+    with st.sidebar.expander("⏱️ Timing for this rerun", expanded=False):
+        trace_id = metrics.current_trace_id()
+        rerun_spans = metrics.spans(trace_id)
+        st.caption(f"Rerun: {(time.perf_counter() - rerun_started) * 1000:.1f} ms, "
+                   f"{(time.thread_time() - rerun_cpu_started) * 1000:.1f} ms CPU, "
+                   f"{len(rerun_spans)} instrumented span(s)")
+        if rerun_spans:
+            st.table([{
+                'span': span.name,
+                'ms': round(span.duration * 1000, 1),
+                'status': span.status,
+                'attributes': ", ".join(f"{k}={v}" for k, v in span.attributes.items() if k != 'session'),
+            } for span in rerun_spans])
+        st.download_button("Download spans (OTLP JSON)",
+                           data=json.dumps(metrics.otlp_traces(trace_id)),
+                           file_name="cvready-trace.json", mime="application/json")
+
+# Server CPU for this full rerun (fragment reruns are recorded by app_fragment)
+rerun_cpu.observe('app', 'ok', time.thread_time() - rerun_cpu_started)
@@ -0,0 +1,306 @@
+"""Local ATS keyword matching of a resume against a corpus of job postings
+
+AtsIndex.build() tokenizes the postings once into a TF-IDF inverted index
+(per term: the postings containing it and their L2-normalized weights,
+as flat numpy arrays) plus each posting's top keywords. match() then
+scores a resume against every posting in one vectorized pass that only
+touches the postings lists of the resume's own terms, and reports the
+closest postings with the keywords they stress that the resume lacks.
+save() and load() persist the arrays to a .npz file, so the index is
+rebuilt only when the postings file changes:
+
+    python ats_index.py build postings.jsonl -o postings.ats.npz
+    python ats_index.py match postings.ats.npz resume.json --top 5
+
+Postings are read from JSONL or CSV with 'title', 'company' and
+'description' fields (and optionally 'id', 'skills').
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import re
+import sys
+from collections import Counter
+from typing import NamedTuple
+
+import numpy as np
+
+INDEX_VERSION = 1
+KEYWORDS_PER_POSTING = 25
+
+# Keeps c++, c#, node.js, ci/cd and similar skill names in one token
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#./-]*[a-z0-9+#]|[a-z0-9]")
+# Word pairs are only taken within a phrase, not across list separators or sentences
+_PHRASE_BREAK = re.compile(r"[,;:()\[\]|•*\n]|[.!?](?:\s|$)")
+STOP_WORDS = frozenset("""
+a about above across after all also am an and any are as at be because been being both but by can could
+did do does doing during each either etc every for from further had has have having he her here hers him
+his how i if in into is it its itself just may me might more most must my no nor not of off on once only
+or other our ours out over own per same shall she should so some such than that the their theirs them
+then there these they this those through to too under until up upon us very via was we were what when
+where which while who whom why will with within without would you your yours
+able ability across candidate candidates company environment etc experience hire hiring including job join looking new
+opportunity plus preferred required requirements responsibilities role skills strong team teams work
+working year years
+""".split())
+
+
+def tokenize(text):
+    """Lowercased terms of text: single words and adjacent word pairs within a phrase, stop words removed"""
+    terms = []
+    for phrase in _PHRASE_BREAK.split(text.lower()):
+        words = [w.strip('./-') for w in _TOKEN.findall(phrase)]
+        words = [w for w in words if len(w) > 1 and w not in STOP_WORDS and not w.isdigit()]
+        terms += words
+        terms += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return terms
+
+
+def resume_text(resume_data, generated_resume=''):
+    """The text of a resume that ATS keyword matching looks at; skills count twice"""
+    basic = resume_data.get('basic_info') or {}
+    parts = [basic.get('job_title', ''), basic.get('skills', ''), basic.get('skills', '')]
+    if generated_resume and not generated_resume.startswith("Error:"):
+        parts.append(generated_resume)
+    else:
+        parts.append(basic.get('summary', ''))
+        for exp in resume_data.get('experience') or []:
+            parts += [exp.get('title', ''), exp.get('responsibilities', '')]
+        for proj in resume_data.get('projects') or []:
+            parts += [proj.get('description', ''), proj.get('technologies', '')]
+    return '\n'.join(part for part in parts if part)
+
+
+def read_postings(path):
+    """Postings from a JSONL or CSV file as dicts with id, title, company and text"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            records = list(csv.DictReader(f))
+        else:
+            records = [json.loads(line) for line in f if line.strip()]
+    postings = []
+    for i, record in enumerate(records):
+        text = '\n'.join(str(record.get(key) or '') for key in ('title', 'skills', 'description'))
+        postings.append({'id': str(record.get('id') or i), 'title': str(record.get('title') or ''),
+                         'company': str(record.get('company') or ''), 'text': text})
+    return postings
+
+
+def file_fingerprint(path):
+    """Cheap identity of a file (size and mtime), stored in the index to detect a stale one"""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class AtsMatch(NamedTuple):
+    posting_id: str
+    title: str
+    company: str
+    score: float  # cosine similarity, 0..1
+    missing_keywords: list  # the posting's highest-weighted terms absent from the resume
+
+
+class AtsReport(NamedTuple):
+    matches: list  # AtsMatch, best first
+    missing_keywords: list  # missing keywords across the matches, most important first
+    resume_terms: int  # distinct resume terms known to the index
+
+
+class AtsIndex:
+    """TF-IDF inverted index over job postings; build with AtsIndex.build or AtsIndex.load"""
+
+    def __init__(self, vocabulary, idf, term_ptr, doc_ids, weights, keywords, keyword_weights,
+                 posting_ids, titles, companies, source=''):
+        self.vocabulary = vocabulary  # term -> column
+        self.terms = np.array(sorted(vocabulary, key=vocabulary.get)) if vocabulary else np.array([], dtype=str)
+        self.idf = idf
+        # Postings of term t are doc_ids[term_ptr[t]:term_ptr[t + 1]], with the matching weights
+        self.term_ptr = term_ptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.keywords = keywords  # (postings, KEYWORDS_PER_POSTING) term columns, -1 padded
+        self.keyword_weights = keyword_weights
+        self.posting_ids = posting_ids
+        self.titles = titles
+        self.companies = companies
+        self.source = source
+
+    def __len__(self):
+        return len(self.posting_ids)
+
+    @classmethod
+    def build(cls, postings, min_df=2, max_df=0.5, collocation=0.5, source=''):
+        """Index postings (dicts with id, title, company, text)
+
+        Terms in fewer than min_df postings (typos, one-off names) or in more
+        than max_df of them (boilerplate) are left out of the vocabulary.
+        With fewer than 20 postings min_df is relaxed to 1. A word pair is
+        kept only when it appears in at least `collocation` of the postings
+        holding its rarer word ("machine learning", not "improve aws").
+        """
+        counts = [Counter(tokenize(posting['text'])) for posting in postings]
+        n_docs = len(postings)
+        df = Counter()
+        for doc_counts in counts:
+            df.update(doc_counts.keys())
+        min_df = min_df if n_docs >= 20 else 1
+        max_count = max(1, int(max_df * n_docs)) if n_docs >= 20 else n_docs
+
+        def keep(term, n):
+            if not min_df <= n <= max_count:
+                return False
+            first, space, second = term.partition(' ')
+            return not space or n >= collocation * min(df[first], df[second])
+
+        vocabulary = {term: i for i, term in enumerate(sorted(t for t, n in df.items() if keep(t, n)))}
+        idf = np.zeros(len(vocabulary), dtype=np.float32)
+        for term, column in vocabulary.items():
+            idf[column] = math.log((1 + n_docs) / (1 + df[term])) + 1
+
+        # Forward (document -> terms) entries first, then regroup by term
+        rows, columns, values = [], [], []
+        keywords = np.full((n_docs, KEYWORDS_PER_POSTING), -1, dtype=np.int32)
+        keyword_weights = np.zeros((n_docs, KEYWORDS_PER_POSTING), dtype=np.float32)
+        for doc, doc_counts in enumerate(counts):
+            cols = np.fromiter((vocabulary[t] for t in doc_counts if t in vocabulary), dtype=np.int32)
+            if not len(cols):
+                continue
+            tf = np.fromiter((doc_counts[t] for t in doc_counts if t in vocabulary), dtype=np.float32)
+            weight = (1 + np.log(tf)) * idf[cols]  # sublinear tf
+            weight /= np.linalg.norm(weight)
+            rows.append(np.full(len(cols), doc, dtype=np.int32))
+            columns.append(cols)
+            values.append(weight)
+            top = np.argsort(-weight, kind='stable')[:KEYWORDS_PER_POSTING]
+            keywords[doc, :len(top)] = cols[top]
+            keyword_weights[doc, :len(top)] = weight[top]
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int32)
+        columns = np.concatenate(columns) if columns else np.zeros(0, dtype=np.int32)
+        values = np.concatenate(values) if values else np.zeros(0, dtype=np.float32)
+        order = np.argsort(columns, kind='stable')
+        term_ptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(columns, minlength=len(vocabulary)), out=term_ptr[1:])
+        return cls(vocabulary, idf, term_ptr, rows[order], values[order], keywords, keyword_weights,
+                   np.array([p['id'] for p in postings]), np.array([p['title'] for p in postings]),
+                   np.array([p['company'] for p in postings]), source=source)
+
+    def save(self, path):
+        """Write the index to a .npz file (uncompressed, so loading is a straight read)"""
+        with open(path, 'wb') as f:
+            np.savez(f, version=np.array(INDEX_VERSION), source=np.array(self.source), terms=self.terms,
+                     idf=self.idf, term_ptr=self.term_ptr, doc_ids=self.doc_ids, weights=self.weights,
+                     keywords=self.keywords, keyword_weights=self.keyword_weights,
+                     posting_ids=self.posting_ids, titles=self.titles, companies=self.companies)
+
+    @classmethod
+    def load(cls, path):
+        """Read an index written by save(); raises ValueError for another index version"""
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != INDEX_VERSION:
+                raise ValueError(f"{path} is ATS index version {int(data['version'])}, expected {INDEX_VERSION}")
+            terms = data['terms']
+            return cls({term: i for i, term in enumerate(terms.tolist())}, data['idf'], data['term_ptr'],
+                       data['doc_ids'], data['weights'], data['keywords'], data['keyword_weights'],
+                       data['posting_ids'], data['titles'], data['companies'], source=str(data['source']))
+
+    def query_vector(self, text):
+        """(columns, weights) of text's known terms, L2-normalized like the postings"""
+        counts = Counter(term for term in tokenize(text) if term in self.vocabulary)
+        if not counts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        cols = np.fromiter((self.vocabulary[t] for t in counts), dtype=np.int64, count=len(counts))
+        weight = (1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))) * self.idf[cols]
+        return cols, weight / np.linalg.norm(weight)
+
+    def scores(self, cols, weights):
+        """Cosine similarity of the query vector with every posting"""
+        starts, ends = self.term_ptr[cols], self.term_ptr[cols + 1]
+        lengths = ends - starts
+        if not lengths.sum():
+            return np.zeros(len(self), dtype=np.float32)
+        # Flat positions of all postings of the query terms, without a Python loop
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.bincount(self.doc_ids[offsets], weights=self.weights[offsets] * np.repeat(weights, lengths),
+                           minlength=len(self))
+
+    def match(self, text, top=5, keywords=10):
+        """Best-matching postings for a resume's text, with their missing keywords"""
+        cols, weights = self.query_vector(text)
+        scores = self.scores(cols, weights)
+        top = min(top, len(self))
+        if not top:
+            return AtsReport([], [], len(cols))
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        best = best[scores[best] > 0]  # postings sharing no term with the resume aren't matches
+        present = np.zeros(len(self.vocabulary) + 1, dtype=bool)  # last slot absorbs the -1 padding
+        present[cols] = True
+        present[-1] = True
+
+        matches = []
+        missing_weight = Counter()
+        for doc in best:
+            doc_keywords = self.keywords[doc]
+            absent = ~present[doc_keywords]
+            missing = [str(self.terms[c]) for c in doc_keywords[absent][:keywords]]
+            for column, weight in zip(doc_keywords[absent], self.keyword_weights[doc][absent]):
+                missing_weight[int(column)] += float(weight * scores[doc])
+            matches.append(AtsMatch(str(self.posting_ids[doc]), str(self.titles[doc]), str(self.companies[doc]),
+                                    float(scores[doc]), missing))
+        missing_keywords = [str(self.terms[c]) for c, _ in missing_weight.most_common(keywords)]
+        return AtsReport(matches, missing_keywords, len(cols))
+
+
+def load_or_build(postings_path, index_path=None):
+    """Load the persisted index for postings_path, rebuilding and saving it if missing or stale"""
+    index_path = index_path or os.path.splitext(postings_path)[0] + '.ats.npz'
+    source = file_fingerprint(postings_path)
+    try:
+        index = AtsIndex.load(index_path)
+        if index.source == source:
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+    index = AtsIndex.build(read_postings(postings_path), source=source)
+    index.save(index_path)
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an ATS keyword index or match a resume against it")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="index a JSONL or CSV file of job postings")
+    build.add_argument('postings')
+    build.add_argument('-o', '--output', help="index file (default: <postings>.ats.npz)")
+    build.add_argument('--min-df', type=int, default=2)
+    build.add_argument('--max-df', type=float, default=0.5)
+    build.add_argument('--collocation', type=float, default=0.5)
+    match = commands.add_parser('match', help="score a resume_data JSON file against an index")
+    match.add_argument('index')
+    match.add_argument('resume', help="JSON file with resume_data (and optionally generated_resume)")
+    match.add_argument('--top', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        output = args.output or os.path.splitext(args.postings)[0] + '.ats.npz'
+        index = AtsIndex.build(read_postings(args.postings), min_df=args.min_df, max_df=args.max_df,
+                               collocation=args.collocation, source=file_fingerprint(args.postings))
+        index.save(output)
+        print(f"Indexed {len(index):,} postings, {len(index.vocabulary):,} terms -> {output}")
+        return 0
+
+    index = AtsIndex.load(args.index)
+    with open(args.resume, 'r', encoding='utf-8') as f:
+        record = json.load(f)
+    resume_data = record.get('resume_data', record)
+    report = index.match(resume_text(resume_data, record.get('generated_resume', '')), top=args.top)
+    for m in report.matches:
+        print(f"{m.score:.3f}  {m.title} ({m.company})  missing: {', '.join(m.missing_keywords[:6])}")
+    print(f"Missing keywords: {', '.join(report.missing_keywords)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
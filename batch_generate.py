@@ -0,0 +1,202 @@
+"""Headless bulk resume generation from a JSONL file of resume_data dicts
+
+Each input line is a resume_data dict (the shape build_resume_prompt
+consumes), optionally with an "id". Results are appended to the output
+JSONL as they complete; re-running with the same output file skips
+records that already succeeded, so an interrupted run can be resumed.
+
+    python batch_generate.py candidates.jsonl -o resumes.jsonl --concurrency 8 --rpm 60
+    python batch_generate.py candidates.jsonl -o resumes.jsonl --fake  # offline
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from caching import canonical_hash
+from context_cache import ContextCache
+from resume_ai import DEFAULT_PROMPT_TOKEN_BUDGET, GEMINI_MODEL, SYSTEM_INSTRUCTION, agenerate_resume_with_gemini
+
+
+class TokenBucket:
+    """Async token-bucket rate limiter: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=1):
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def record_id(resume_data: dict) -> str:
+    """Stable id for an input record: its "id" field or a hash of its content"""
+    return str(resume_data.get('id') or canonical_hash(resume_data))
+
+
+def load_checkpoint(output_path) -> set:
+    """Ids of records already generated successfully in a previous run"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by an interrupted run
+            if result.get('status') == 'ok':
+                done.add(result['id'])
+    return done
+
+
+def read_records(input_path):
+    """Yield (line number, resume_data, error) from a JSONL file; error describes a line that isn't a JSON object"""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                resume_data = json.loads(line)
+            except ValueError as e:
+                yield line_no, None, f"Invalid JSON on line {line_no}: {e}"
+                continue
+            if not isinstance(resume_data, dict):
+                yield line_no, None, f"Line {line_no} is not a JSON object"
+                continue
+            yield line_no, resume_data, None
+
+
+async def run_batch(records, client, output, concurrency=4, limiter=None, done_ids=frozenset(),
+                    on_result=None, token_budget=DEFAULT_PROMPT_TOKEN_BUDGET, context_cache=None):
+    """Generate resumes for `records` with bounded concurrency, writing results to `output`"""
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    stats = {'ok': 0, 'error': 0, 'skipped': 0}
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            rid, resume_data = item
+            if limiter is not None:
+                await limiter.acquire()
+            start = time.perf_counter()
+            generated = await agenerate_resume_with_gemini(resume_data, client, token_budget, context_cache)
+            result = {'id': rid, 'latency': round(time.perf_counter() - start, 3)}
+            if generated.startswith("Error:"):
+                result.update(status='error', error=generated)
+            else:
+                result.update(status='ok', generated_resume=generated)
+            stats[result['status']] += 1
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            if on_result:
+                on_result(result, stats)
+
+    def write_invalid(line_no, error):
+        result = {'id': f"line-{line_no}", 'latency': 0.0, 'status': 'error', 'error': error}
+        stats['error'] += 1
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        output.flush()
+        if on_result:
+            on_result(result, stats)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    for line_no, resume_data, error in records:
+        if error is not None:
+            # One bad line is reported in the output, not fatal to the rest of the batch
+            write_invalid(line_no, error)
+            continue
+        rid = record_id(resume_data)
+        if rid in done_ids:
+            stats['skipped'] += 1
+            continue
+        await queue.put((rid, resume_data))
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+    return stats
+
+
+def positive_float(value):
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def make_client(args):
+    if args.fake:
+        from fakes import FakeGeminiClient
+        return FakeGeminiClient(latency=args.fake_latency, error_rate=args.fake_error_rate, seed=0)
+    from google import genai
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        sys.exit("GEMINI_API_KEY is not set (use --fake for an offline run)")
+    return genai.Client(api_key=api_key)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate resumes in bulk from a JSONL file")
+    parser.add_argument('input', help="JSONL file of resume_data dicts")
+    parser.add_argument('-o', '--output', required=True, help="JSONL results file (also the checkpoint)")
+    parser.add_argument('--concurrency', type=positive_int, default=4, help="max in-flight Gemini calls")
+    parser.add_argument('--rpm', type=positive_float, default=60, help="requests per minute allowed by the quota")
+    parser.add_argument('--burst', type=positive_int, default=1, help="requests that may be sent back to back")
+    parser.add_argument('--token-budget', type=int, default=DEFAULT_PROMPT_TOKEN_BUDGET,
+                        help="estimated input tokens per prompt (larger resumes are trimmed)")
+    parser.add_argument('--no-context-cache', action='store_true',
+                        help="send the system instruction with every request instead of caching it")
+    parser.add_argument('--fake', action='store_true', help="use the offline fake Gemini client")
+    parser.add_argument('--fake-latency', type=float, default=0.5)
+    parser.add_argument('--fake-error-rate', type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    client = make_client(args)
+    done_ids = load_checkpoint(args.output)
+    limiter = TokenBucket(args.rpm / 60.0, args.burst)
+    context_cache = ContextCache(client, GEMINI_MODEL, SYSTEM_INSTRUCTION, enabled=not args.no_context_cache)
+
+    def report(result, stats):
+        print(f"[{stats['ok'] + stats['error']}] {result['id'][:16]} {result['status']} "
+              f"{result['latency']:.2f}s", file=sys.stderr)
+
+    with open(args.output, 'a', encoding='utf-8') as output:
+        stats = asyncio.run(run_batch(read_records(args.input), client, output,
+                                      concurrency=args.concurrency, limiter=limiter,
+                                      done_ids=done_ids, on_result=report,
+                                      token_budget=args.token_budget, context_cache=context_cache))
+    print(f"Done: {stats['ok']} generated, {stats['error']} failed, "
+          f"{stats['skipped']} already done", file=sys.stderr)
+    usage = context_cache.stats()
+    if usage['calls']:
+        print(f"Input tokens: {usage['prompt_tokens']:,} reported by Gemini, "
+              f"{usage['cached_prompt_tokens']:,} of them served from the context cache", file=sys.stderr)
+    return 0 if stats['error'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""Import-time budget for the modules app.py loads before its first render
+
+Each run imports them in a fresh interpreter (after streamlit, which the app
+can't avoid), so the numbers are cold-start costs. The check fails when the
+median exceeds --budget-ms or when a heavy dependency that should load
+lazily (Firebase, the Gemini SDK, ReportLab) is pulled in eagerly:
+
+    python -m benchmarks.bench_imports --runs 5 --budget-ms 150
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Keep in sync with the local imports at the top of app.py
+APP_MODULES = ('caching', 'resume_ai', 'context_cache', 'pdf_templates', 'markdown_pdf', 'pdf_export',
+               'firestore_writer', 'resume_store', 'retention', 'storage', 'gemini_client', 'admission', 'metrics',
+               'resume_sections', 'resume_model', 'warmup')
+LAZY_DEPENDENCIES = ('firebase_admin', 'google.cloud.firestore', 'google.genai', 'grpc', 'reportlab')
+
+_PROBE = """
+import json, sys, time
+import streamlit
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'ms': elapsed * 1000, 'eager': [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_once():
+    probe = _PROBE.format(modules=APP_MODULES, lazy=LAZY_DEPENDENCIES)
+    output = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=150.0)
+    args = parser.parse_args(argv)
+
+    runs = [measure_once() for _ in range(args.runs)]
+    median = statistics.median(run['ms'] for run in runs)
+    eager = sorted({name for run in runs for name in run['eager']})
+    print(f"app modules: median {median:.1f} ms over {args.runs} cold imports "
+          f"(min {min(r['ms'] for r in runs):.1f}, max {max(r['ms'] for r in runs):.1f}); budget {args.budget_ms:.0f} ms")
+    failed = False
+    if eager:
+        print(f"loaded eagerly, should be lazy: {', '.join(eager)}", file=sys.stderr)
+        failed = True
+    if median > args.budget_ms:
+        print(f"over budget by {median - args.budget_ms:.1f} ms", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Benchmark precompiled PDF templates against per-document style construction
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pdf_templates --iterations 50
+"""
+import argparse
+import time
+import tracemalloc
+
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+from benchmarks.fixtures import max_size_resume
+from pdf_templates import TEMPLATE_SPECS, compile_template, get_template, render_pdf
+
+
+def legacy_styles(template_style, resume_data):
+    """Style setup as create_professional_pdf used to do it for every document"""
+    styles = compile_template(template_style, TEMPLATE_SPECS[template_style], getSampleStyleSheet())
+    # The old loops built a new Duration/Tech style for every job and project
+    for _ in resume_data['experience']:
+        ParagraphStyle('Duration', parent=styles['body'], textColor=colors.HexColor('#6b7280'), fontSize=9)
+    for _ in resume_data['projects']:
+        ParagraphStyle('Tech', parent=styles['body'], textColor=colors.HexColor('#6b7280'), fontSize=9)
+    return styles
+
+
+def measure(fn, iterations):
+    """Return (mean seconds, mean allocated bytes) per call"""
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = (time.perf_counter() - start) / iterations
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    fn()
+    allocated = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return elapsed, allocated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=30)
+    args = parser.parse_args()
+
+    resume_data = max_size_resume()
+    print(f"Max-size resume (10 jobs, 10 projects), {args.iterations} iterations\n")
+    print(f"{'template':<10} {'phase':<14} {'legacy ms':>10} {'compiled ms':>12} {'legacy KiB':>11} {'compiled KiB':>13}")
+
+    for template_style in TEMPLATE_SPECS:
+        rows = {
+            'style setup': (
+                lambda: legacy_styles(template_style, resume_data),
+                lambda: get_template(template_style),
+            ),
+            'full document': (
+                lambda: render_pdf(resume_data, legacy_styles(template_style, resume_data)),
+                lambda: render_pdf(resume_data, get_template(template_style)),
+            ),
+        }
+        for phase, (legacy, compiled) in rows.items():
+            legacy_t, legacy_mem = measure(legacy, args.iterations)
+            compiled_t, compiled_mem = measure(compiled, args.iterations)
+            print(f"{template_style:<10} {phase:<14} {legacy_t * 1000:>10.3f} {compiled_t * 1000:>12.3f} "
+                  f"{legacy_mem / 1024:>11.1f} {compiled_mem / 1024:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
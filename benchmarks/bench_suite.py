@@ -0,0 +1,226 @@
+"""Reproducible benchmark suite: prompt building, the resume model, markdown parsing, ATS matching, PDF rendering,
+saved-resume storage and the generate-save-list cycle
+
+Gemini and Firestore are replaced by the deterministic fakes in fakes.py
+and SQLite runs on a temporary file, so runs need no network or credentials. Each case reports throughput,
+p50/p99 latency and peak traced memory. Results can be saved as a
+baseline and later runs compared against it:
+
+    python -m benchmarks.bench_suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_suite --baseline benchmarks/baseline.json
+
+The comparison exits non-zero when a case's p50 regresses by more than
+--tolerance. Baselines are machine-specific; regenerate one when the
+hardware changes.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import tempfile
+import sys
+import time
+import tracemalloc
+
+from ats_index import AtsIndex, resume_text
+from benchmarks.fixtures import SIZES, generated_markdown, job_postings
+from fakes import FakeFirestore, FakeGeminiClient
+from firestore_writer import WriteBehindQueue
+from markdown_pdf import parse_markdown
+from pdf_templates import TEMPLATES, create_professional_pdf
+from resume_ai import build_resume_prompt, generate_resume_with_gemini
+from resume_model import Resume
+from resume_store import ResumeStore
+from storage import SERVER_TIMESTAMP, FirestoreStorage, SQLiteStorage
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def run_case(fn, iterations, warmup=2):
+    """Time fn() per call, then measure the peak memory of one extra call"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call_start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - call_start)
+    total = time.perf_counter() - start
+    samples.sort()
+
+    # Traced separately: tracemalloc slows allocation-heavy code down
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'iterations': iterations,
+        'ops_per_sec': iterations / total if total else float('inf'),
+        'p50_ms': percentile(samples, 0.50) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+        'peak_kib': peak / 1024,
+    }
+
+
+def list_first_page(storage, user_email, page_size=10):
+    """The sidebar's first-page query (mirrors app.fetch_resume_page)"""
+    return [doc_id for doc_id, _ in storage.list_resumes(user_email, limit=page_size + 1, summary=True)][:page_size]
+
+
+def sqlite_storage():
+    return SQLiteStorage(os.path.join(tempfile.mkdtemp(prefix='cvready-bench-'), 'resumes.db'))
+
+
+def history_storage(resume_data, users=20, versions=100):
+    """SQLite storage holding a history of `versions` saved resumes for each of `users` users"""
+    storage = sqlite_storage()
+    store = ResumeStore(storage)
+    for user in range(users):
+        parent, writes = None, []
+        for n in range(versions):
+            data = dict(resume_data, basic_info=dict(resume_data['basic_info'], summary=f"Revision {n}"))
+            version_doc, blob_writes, parent = store.build_version(
+                f'user{user}@example.com', data, f"# Resume {n}\n\nRevision {n}\n", parent,
+                require_committed_base=False)
+            parent['id'] = storage.new_id('resumes')
+            version_doc['created_at'] = SERVER_TIMESTAMP
+            writes.extend(blob_writes)
+            writes.append(('resumes', parent['id'], version_doc))
+        storage.commit(writes)
+    return storage
+
+
+def cycle_case(resume_data, gemini_latency, storage, seed):
+    """One generate -> save (committed) -> list round trip against the fake client and storage"""
+    client = FakeGeminiClient(latency=gemini_latency, seed=seed)
+    store = ResumeStore(storage)
+    queue = WriteBehindQueue(storage, flush_interval=0)
+    state = {'parent': None, 'n': 0}
+
+    def run():
+        state['n'] += 1
+        # Vary the input so the delta-encoding path runs, as it does for real edits
+        data = dict(resume_data, basic_info=dict(resume_data['basic_info'], summary=f"Revision {state['n']}"))
+        generated = generate_resume_with_gemini(data, client)
+        version_doc, blob_writes, version_info = store.build_version(
+            'bench@example.com', data, generated, state['parent'])
+        version_doc['created_at'] = SERVER_TIMESTAMP
+        version_info['id'] = queue.enqueue('resumes', version_doc, related=blob_writes,
+                                           on_done=lambda saved, blobs=blob_writes: store.mark_written(blobs))
+        queue.flush()
+        state['parent'] = version_info
+        list_first_page(storage, 'bench@example.com')
+    return run
+
+
+def build_cases(args):
+    cases = {}
+    for size, make in SIZES.items():
+        data = make()
+        cases[f'prompt/{size}'] = (lambda data=data: build_resume_prompt(data), args.iterations * 20)
+        cases[f'model/roundtrip/{size}'] = (lambda data=data: Resume.from_dict(data).to_dict(), args.iterations * 20)
+        # Uncached parse; PDF renders below reuse the parse cached per text
+        lines = generated_markdown(data).splitlines()
+        cases[f'markdown/parse/{size}'] = (lambda lines=lines: tuple(parse_markdown(lines)), args.iterations * 20)
+    ats_index = AtsIndex.build(job_postings(args.postings, args.seed))
+    index_path = os.path.join(tempfile.mkdtemp(prefix='cvready-bench-'), 'postings.ats.npz')
+    ats_index.save(index_path)
+    cases['ats/load'] = (lambda: AtsIndex.load(index_path), args.iterations * 5)
+    for size, make in SIZES.items():
+        data = make()
+        text = resume_text(data, generated_markdown(data))
+        cases[f'ats/match/{size}'] = (lambda text=text: ats_index.match(text), args.iterations * 20)
+    for size, make in SIZES.items():
+        data = make()
+        generated = generated_markdown(data)
+        for template_style in TEMPLATES:
+            cases[f'pdf/{template_style}/{size}'] = (
+                lambda data=data, generated=generated, t=template_style: create_professional_pdf(data, generated, t),
+                args.iterations)
+    history = history_storage(SIZES['typical']())
+    last_id, last_doc = history.list_resumes('user0@example.com', limit=90, summary=True)[-1]
+    last_page = (last_doc['created_at'], last_id)
+    cases['storage/sqlite/list'] = (lambda: list_first_page(history, 'user0@example.com'), args.iterations * 20)
+    cases['storage/sqlite/list_last'] = (
+        lambda: history.list_resumes('user0@example.com', start_after=last_page, limit=11, summary=True),
+        args.iterations * 20)
+    newest = list_first_page(history, 'user0@example.com')[0]
+    cases['storage/sqlite/get'] = (lambda: history.get('resumes', newest), args.iterations * 20)
+    for size in ('typical', 'max'):
+        storage = FirestoreStorage(FakeFirestore(read_latency=args.firestore_latency,
+                                                 write_latency=args.firestore_latency))
+        cases[f'cycle/{size}'] = (cycle_case(SIZES[size](), args.gemini_latency, storage, args.seed),
+                                  max(5, args.iterations // 2))
+    cases['cycle/sqlite/typical'] = (cycle_case(SIZES['typical'](), args.gemini_latency, sqlite_storage(), args.seed),
+                                     max(5, args.iterations // 2))
+    return cases
+
+
+def compare(results, baseline, tolerance):
+    """Print the p50 change per case; returns the names of regressed cases"""
+    regressions = []
+    print(f"\n{'case':<28} {'baseline p50':>13} {'p50':>10} {'change':>8}")
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            print(f"{name:<28} {'-':>13} {result['p50_ms']:>10.3f} {'new':>8}")
+            continue
+        change = result['p50_ms'] / base['p50_ms'] - 1 if base['p50_ms'] else 0.0
+        flag = ''
+        if change > tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<28} {base['p50_ms']:>13.3f} {result['p50_ms']:>10.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20, help="iterations per PDF case (prompts run 20x more)")
+    parser.add_argument('--filter', default='', help="only run cases whose name contains this")
+    parser.add_argument('--gemini-latency', type=float, default=0.05, help="fake Gemini seconds per call")
+    parser.add_argument('--firestore-latency', type=float, default=0.002, help="fake Firestore seconds per operation")
+    parser.add_argument('--postings', type=int, default=5000, help="job postings in the ATS index")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--baseline', help="compare against this results file")
+    parser.add_argument('--save-baseline', help="write results as a new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed p50 slowdown before failing")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'case':<28} {'ops/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'peak KiB':>10}")
+    for name, (fn, iterations) in build_cases(args).items():
+        if args.filter not in name:
+            continue
+        result = run_case(fn, iterations)
+        results[name] = result
+        print(f"{name:<28} {result['ops_per_sec']:>10.1f} {result['p50_ms']:>10.3f} "
+              f"{result['p99_ms']:>10.3f} {result['peak_kib']:>10.1f}")
+
+    report = {
+        'python': platform.python_version(), 'platform': platform.platform(),
+        'settings': {'gemini_latency': args.gemini_latency, 'firestore_latency': args.firestore_latency,
+                     'postings': args.postings, 'seed': args.seed},
+        'results': results,
+    }
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed by more than {args.tolerance:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
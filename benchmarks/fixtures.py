@@ -0,0 +1,120 @@
+"""Sample resume_data of the sizes the benchmarks run against, and markdown resumes generated from it"""
+
+
+def small_resume():
+    """A first-job resume: one position, one degree, no projects"""
+    return {
+        'basic_info': {
+            'name': 'Sam Example', 'email': 'sam@example.com', 'phone': '555-0101',
+            'location': 'Denver, CO', 'linkedin': '', 'job_title': 'Junior Developer',
+            'skills': 'Python, SQL, Git', 'summary': '',
+        },
+        'experience': [{
+            'title': 'Developer Intern', 'company': 'Startup Inc', 'start': '06/2023', 'end': '09/2023',
+            'responsibilities': 'Built internal dashboards\nFixed bugs in the billing service',
+        }],
+        'education': [{'degree': 'B.S. Computer Science', 'institution': 'State University', 'year': '2024'}],
+        'projects': [],
+    }
+
+
+def typical_resume():
+    """A mid-career resume: three positions, one degree, two projects"""
+    return {
+        'basic_info': {
+            'name': 'Alex Example', 'email': 'alex@example.com', 'phone': '555-0102',
+            'location': 'Seattle, WA', 'linkedin': 'linkedin.com/in/alex',
+            'job_title': 'Senior Software Engineer',
+            'skills': 'Python, Go, PostgreSQL, Kubernetes, AWS, Terraform, React',
+            'summary': 'Backend engineer focused on reliable, observable distributed systems.',
+        },
+        'experience': [{
+            'title': f'Software Engineer {i}', 'company': f'Company {i}',
+            'start': f'01/{2016 + 3 * i}', 'end': 'Present' if i == 0 else f'12/{2018 + 3 * i}',
+            'responsibilities': '\n'.join(f'Led initiative {j} that cut latency by {10 + j}%' for j in range(4)),
+        } for i in range(3)],
+        'education': [{'degree': 'B.S. Computer Science', 'institution': 'State University', 'year': '2015'}],
+        'projects': [{
+            'name': f'Project {i}', 'description': 'Open-source tool for tracing batch jobs.',
+            'technologies': 'Go, OpenTelemetry',
+        } for i in range(2)],
+    }
+
+
+def max_size_resume():
+    """Largest resume the UI allows: 10 jobs, 5 education entries, 10 projects"""
+    return {
+        'basic_info': {
+            'name': 'Jordan Example', 'email': 'jordan@example.com', 'phone': '555-0100',
+            'location': 'Austin, TX', 'linkedin': 'linkedin.com/in/jordan',
+            'job_title': 'Staff Engineer', 'skills': ', '.join(f'Skill {i}' for i in range(30)),
+            'summary': 'Seasoned engineer with a record of shipping reliable systems. ' * 4,
+        },
+        'experience': [{
+            'title': f'Engineer {i}', 'company': f'Company {i}',
+            'start': '01/2015', 'end': 'Present',
+            'responsibilities': '\n'.join(f'Delivered outcome {j} for team {i}' for j in range(6)),
+        } for i in range(10)],
+        'education': [{'degree': f'Degree {i}', 'institution': 'State University', 'year': '2014'}
+                      for i in range(5)],
+        'projects': [{
+            'name': f'Project {i}', 'description': 'Built and launched a service. ' * 3,
+            'technologies': 'Python, PostgreSQL, Kubernetes',
+        } for i in range(10)],
+    }
+
+
+SIZES = {'small': small_resume, 'typical': typical_resume, 'max': max_size_resume}
+
+
+def generated_markdown(resume_data):
+    """Markdown shaped like a Gemini resume for resume_data: headings, bold, links and bullets"""
+    basic = resume_data['basic_info']
+    contact = ' | '.join(value for value in (basic['email'], basic['phone'], basic['location']) if value)
+    if basic['linkedin']:
+        contact += f" | [LinkedIn](https://{basic['linkedin']})"
+    lines = [f"# {basic['name']}", f"**{basic['job_title']}**  ", contact, '', '## Professional Summary',
+             basic['summary'] or f"Results-driven *{basic['job_title']}* with hands-on experience.", '',
+             '## Skills']
+    lines += [f"- **{skill.strip()}**" for skill in basic['skills'].split(',')]
+    lines += ['', '## Work Experience']
+    for exp in resume_data['experience']:
+        lines += [f"### {exp['title']} | {exp['company']}", f"*{exp['start']} – {exp['end']}*"]
+        for line in exp['responsibilities'].splitlines():
+            lines.append(f"- {line}, improving `p99` latency by **{len(line) % 40 + 10}%**")
+            lines.append(f"  - Partnered with 3 teams on {line.lower()}")
+        lines.append('')
+    lines.append('## Education')
+    lines += [f"- **{edu['degree']}**, {edu['institution']} ({edu['year']})" for edu in resume_data['education']]
+    if resume_data['projects']:
+        lines += ['', '## Projects']
+        for proj in resume_data['projects']:
+            lines += [f"### {proj['name']}", proj['description'], f"_Technologies: {proj['technologies']}_", '']
+    return '\n'.join(lines)
+
+
+_ROLES = ('Backend Engineer', 'Frontend Developer', 'Data Scientist', 'DevOps Engineer', 'Mobile Developer',
+          'Machine Learning Engineer', 'Site Reliability Engineer', 'Full Stack Developer', 'Data Engineer',
+          'Security Engineer')
+_SKILLS = ('Python', 'Go', 'Java', 'Kotlin', 'Swift', 'TypeScript', 'React', 'Vue', 'Node.js', 'C++', 'C#',
+           'PostgreSQL', 'MySQL', 'Redis', 'Kafka', 'Spark', 'Airflow', 'dbt', 'Snowflake', 'AWS', 'GCP', 'Azure',
+           'Kubernetes', 'Docker', 'Terraform', 'Ansible', 'Prometheus', 'Grafana', 'OpenTelemetry', 'PyTorch',
+           'TensorFlow', 'scikit-learn', 'pandas', 'GraphQL', 'gRPC', 'REST APIs', 'CI/CD', 'GitHub Actions',
+           'machine learning', 'distributed systems', 'data modeling', 'incident response', 'threat modeling',
+           'iOS', 'Android', 'accessibility', 'microservices', 'event sourcing', 'A/B testing', 'Elasticsearch')
+
+
+def job_postings(count=5000, seed=0):
+    """Synthetic job postings (id, title, company, text) for the ATS index benchmarks"""
+    import random
+    rng = random.Random(seed)
+    postings = []
+    for i in range(count):
+        role = rng.choice(_ROLES)
+        skills = rng.sample(_SKILLS, 8)
+        text = (f"{role}\n{', '.join(skills)}\nWe are hiring a {role.lower()} to design, build and operate "
+                f"services using {skills[0]} and {skills[1]}. You will own {skills[2]} pipelines, improve "
+                f"{skills[3]} reliability and mentor engineers. Experience with {', '.join(skills[4:])} "
+                f"is a plus. Team {rng.randrange(200)} ships weekly.")
+        postings.append({'id': f'job-{i}', 'title': role, 'company': f'Company {i % 700}', 'text': text})
+    return postings
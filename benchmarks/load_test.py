@@ -0,0 +1,242 @@
+"""Load test: concurrent simulated sessions driving app.py through Streamlit's AppTest
+
+Each simulated user is an AppTest session running the real script: it
+opens the app, signs in, fills the Basic Info and Work Experience tabs
+(one rerun per field, as a browser does), saves them, generates a resume,
+lists its saved resumes, switches the PDF template and downloads the PDF.
+All sessions share this process, as they would share one `streamlit run`
+server, with Gemini and Firestore replaced by the stand-ins in fakes.py
+(CVREADY_FAKE_BACKENDS), so no credentials or network are needed.
+
+Concurrency ramps through --ramp; at each level that many sessions run at
+once, each worker running --rounds users back to back. Every level
+reports throughput, p50/p95/p99 per step, errors, process CPU and RSS:
+
+    python -m benchmarks.load_test --ramp 1,2,4,8 --gemini-latency 1.0
+    python -m benchmarks.load_test --gemini-error-rate 0.05 --json load.json
+
+Other CVREADY_* settings (e.g. CVREADY_GEMINI_MAX_CONCURRENT) are read
+from the environment as usual.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.bench_suite import percentile
+
+APP_PATH = Path(__file__).resolve().parent.parent / 'app.py'
+STEPS = ('open', 'type_field', 'save_tab', 'generate', 'list_saved', 'switch_template', 'download_pdf')
+
+
+def install_shared_runtime():
+    """Give all AppTest sessions one mock Runtime and script cache, as one server process would have
+
+    AppTest installs a fresh mock Runtime (media files, cache storage) around
+    every run and clears it afterwards, which breaks when sessions run
+    concurrently. Here the real Runtime slot is filled once and AppTest's
+    per-run swaps go to a stand-in class instead. AppTest also compiles the
+    script into a new ScriptCache on every run; compiling it on several
+    threads at once can fail in the interpreter ("AST constructor recursion
+    depth mismatch"), so all runs share one cache and app.py is compiled
+    once, under its lock, as the server does.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = shared
+    app_test.Runtime = type('PerRunRuntime', (), {'_instance': None})
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    return shared
+
+
+class SessionDriver:
+    """One simulated user; records (step, seconds, error) into the shared results"""
+
+    def __init__(self, user_id, results, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.user_id = user_id
+        self.results = results
+        self.at = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+
+    def _timed(self, step, action):
+        """Time one step; a script exception, an "Error..." message or an empty page counts as its error"""
+        start = time.perf_counter()
+        error = None
+        try:
+            action()
+            if self.at.exception:
+                error = self.at.exception[0].value.splitlines()[0]
+            elif not self.at.main.children:
+                # A run that failed before rendering anything (e.g. a compile error) leaves an empty page
+                error = "Run rendered nothing"
+            else:
+                error = next((e.value for e in self.at.error if str(e.value).startswith("Error")), None)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self.results.record(step, time.perf_counter() - start, error)
+        return error is None
+
+    def _widget(self, kind, label):
+        for widget in getattr(self.at, kind):
+            if widget.label.startswith(label):
+                return widget
+        raise LookupError(f"no {kind} labelled {label!r}")
+
+    def _type(self, kind, label, value):
+        return self._timed('type_field', lambda: self._widget(kind, label).input(value).run())
+
+    def run(self):
+        email = f"{self.user_id}@example.com"
+        if not self._timed('open', self.at.run):
+            return
+        steps = [
+            lambda: self._type('text_input', "Your Email", email),
+            lambda: self._type('text_input', "Full Name", f"Load User {self.user_id}"),
+            lambda: self._type('text_input', "Email *", email),
+            lambda: self._type('text_input', "Phone", "555-0100"),
+            lambda: self._type('text_area', "Skills", "Python, Kubernetes, PostgreSQL, Terraform"),
+            lambda: self._timed('save_tab', lambda: self._widget('button', "💾 Save Basic Info").click().run()),
+            lambda: self._type('text_input', "Job Title", "Backend Engineer"),
+            lambda: self._type('text_input', "Company Name", "Example Corp"),
+            lambda: self._type('text_area', "Key Responsibilities", "Built APIs\nCut latency by 30%"),
+            lambda: self._timed('save_tab', lambda: self._widget('button', "💾 Save Work Experience").click().run()),
+            lambda: self._timed('generate', lambda: self._widget('button', "🤖 Generate Resume").click().run()),
+            lambda: self._timed('list_saved', self.at.run),
+            lambda: self._timed('switch_template',
+                                lambda: self._widget('selectbox', "Choose PDF Template").select('classic').run()),
+            lambda: self._timed('download_pdf', self._download_pdf),
+        ]
+        for step in steps:
+            if not step():
+                return
+
+    def _download_pdf(self):
+        """What the server does when the PDF button is clicked: run its deferred render"""
+        from streamlit.runtime import Runtime
+        button = next(b for b in self.at.get('download_button') if b.proto.label.endswith("PDF"))
+        Runtime.instance().media_file_mgr.execute_deferred(button.proto.deferred_file_id)
+
+
+class Results:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def record(self, step, seconds, error):
+        with self._lock:
+            self.samples[step].append(seconds)
+            if error:
+                self.errors[step][error[:120]] += 1
+
+
+def rss_mib():
+    """Current resident set size (falls back to the peak where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_level(concurrency, rounds, timeout, level_tag):
+    results = Results()
+
+    def worker(index):
+        for round_ in range(rounds):
+            SessionDriver(f"load-{level_tag}-{index}-{round_}", results, timeout).run()
+
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="session") as pool:
+        list(pool.map(worker, range(concurrency)))
+    wall = time.perf_counter() - wall_started
+    cpu = time.process_time() - cpu_started
+
+    steps = {}
+    for step in STEPS:
+        values = sorted(results.samples.get(step, ()))
+        if values:
+            steps[step] = {
+                'count': len(values), 'errors': sum(results.errors[step].values()),
+                'p50_ms': percentile(values, 0.50) * 1000, 'p95_ms': percentile(values, 0.95) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000,
+            }
+    completed = len(results.samples.get('download_pdf', ())) - sum(results.errors['download_pdf'].values())
+    reruns = sum(len(values) for step, values in results.samples.items() if step != 'download_pdf')
+    return {
+        'concurrency': concurrency, 'sessions': concurrency * rounds, 'completed': completed,
+        'wall_s': wall, 'sessions_per_s': completed / wall, 'reruns_per_s': reruns / wall,
+        'cpu_percent': 100 * cpu / wall, 'rss_mib': rss_mib(),
+        'peak_rss_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'steps': steps,
+        'errors': {step: dict(messages) for step, messages in results.errors.items() if messages},
+    }
+
+
+def print_level(report):
+    print(f"\nconcurrency {report['concurrency']}: {report['completed']}/{report['sessions']} sessions completed "
+          f"in {report['wall_s']:.1f} s ({report['sessions_per_s']:.2f} sessions/s, "
+          f"{report['reruns_per_s']:.1f} reruns/s), CPU {report['cpu_percent']:.0f}%, "
+          f"RSS {report['rss_mib']:.0f} MiB (peak {report['peak_rss_mib']:.0f})")
+    print(f"  {'step':<16} {'count':>6} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for step, row in report['steps'].items():
+        print(f"  {step:<16} {row['count']:>6} {row['errors']:>7} {row['p50_ms']:>9.1f} "
+              f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+    for step, messages in report['errors'].items():
+        for message, count in messages.items():
+            print(f"  ! {step}: {count}x {message}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ramp', default='1,2,4,8', help="comma-separated concurrent session counts")
+    parser.add_argument('--rounds', type=int, default=2, help="sessions each concurrent worker runs back to back")
+    parser.add_argument('--gemini-latency', type=float, default=1.0, help="fake Gemini seconds per call")
+    parser.add_argument('--gemini-error-rate', type=float, default=0.0)
+    parser.add_argument('--firestore-latency', type=float, default=0.005,
+                        help="fake Firestore seconds per read or write")
+    parser.add_argument('--firestore-error-rate', type=float, default=0.0)
+    parser.add_argument('--timeout', type=float, default=120, help="seconds allowed per script run")
+    parser.add_argument('--json', help="write the per-level reports to this file")
+    args = parser.parse_args(argv)
+
+    # Read by app.py through get_setting(); set before the first run creates the clients
+    os.environ.update({
+        'CVREADY_FAKE_BACKENDS': '1',
+        'CVREADY_FAKE_GEMINI_LATENCY': str(args.gemini_latency),
+        'CVREADY_FAKE_GEMINI_ERROR_RATE': str(args.gemini_error_rate),
+        'CVREADY_FAKE_FIRESTORE_LATENCY': str(args.firestore_latency),
+        'CVREADY_FAKE_FIRESTORE_ERROR_RATE': str(args.firestore_error_rate),
+    })
+    install_shared_runtime()
+
+    reports = []
+    for level, concurrency in enumerate(int(n) for n in args.ramp.split(',')):
+        report = run_level(concurrency, args.rounds, args.timeout, level)
+        print_level(report)
+        reports.append(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'levels': reports}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
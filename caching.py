@@ -0,0 +1,274 @@
+"""Caching helpers: an in-process LRU/TTL cache and the generation cache tiers"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def canonical_hash(obj) -> str:
+    """Stable SHA-256 of a JSON-serializable object (key order independent)"""
+    payload = json.dumps(obj, sort_keys=True, separators=(',', ':'),
+                         ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def normalize_resume_data(resume_data: dict) -> dict:
+    """Normalize resume_data so equivalent inputs compare equal
+
+    Strings are stripped and list entries that build_resume_prompt skips
+    (jobs without a title, education without a degree, projects without a
+    name) are dropped.
+    """
+    def clean(value):
+        if isinstance(value, str):
+            return value.strip()
+        if isinstance(value, dict):
+            return {k: clean(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [clean(v) for v in value]
+        return value
+
+    data = clean(resume_data or {})
+    required = {'experience': 'title', 'education': 'degree', 'projects': 'name'}
+    for section, field in required.items():
+        if section in data:
+            data[section] = [item for item in data[section] if item.get(field)]
+    return data
+
+
+def generation_cache_key(prompt: str, model: str, config: dict) -> str:
+    """Cache key for a generation request: the exact prompt sent + model + config"""
+    return canonical_hash({
+        'prompt': prompt,
+        'model': model,
+        'config': config,
+    })
+
+
+class LRUCache:
+    """Thread-safe LRU cache with optional TTL and byte-size bound"""
+
+    def __init__(self, max_entries=256, ttl=None, max_bytes=None, sizeof=len):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data = OrderedDict()  # key -> (value, stored_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, stored_at, _ = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._data[key] = (value, time.monotonic(), size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._data), 'bytes': self._bytes,
+            'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+        }
+
+
+class DiskCacheTier:
+    """Second-tier cache storing one JSON file per key in a directory
+
+    Expired entries are deleted when read. With max_bytes, once the entries
+    written (by this process, on top of what was there at startup) pass it,
+    the oldest files by modification time are deleted down to
+    PRUNE_FRACTION of max_bytes.
+    """
+
+    PRUNE_FRACTION = 0.8
+
+    def __init__(self, directory, ttl=None, max_bytes=None):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._bytes = sum(size for _, size, _ in self._entries()) if max_bytes is not None else 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _entries(self):
+        """(mtime, size, path) of every entry file"""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for name in names:
+            if name.endswith('.json'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # removed by another process meanwhile
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.ttl is not None and time.time() - entry.get('created', 0) > self.ttl:
+            self._remove(path)
+            return None
+        return entry.get('value')
+
+    def put(self, key, value):
+        # Write to a temp file first so concurrent readers never see a partial entry
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'created': time.time(), 'value': value}, f)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            self._remove(tmp_path)
+            return
+        if self.max_bytes is not None:
+            with self._lock:
+                self._bytes += size
+                if self._bytes > self.max_bytes:
+                    self._prune()
+
+    def _prune(self):
+        # Called with the lock held; rescans, since other processes may share the directory
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes * self.PRUNE_FRACTION:
+                break
+            self._remove(path)
+            total -= size
+            self.evictions += 1
+        self._bytes = total
+
+
+class FirestoreCacheTier:
+    """Second-tier cache backed by a Firestore collection keyed by hash"""
+
+    def __init__(self, db, collection='generation_cache', ttl=None):
+        self.db = db
+        self.collection = collection
+        self.ttl = ttl
+
+    def get(self, key):
+        try:
+            snapshot = self.db.collection(self.collection).document(key).get()
+        except Exception:
+            return None
+        if not snapshot.exists:
+            return None
+        entry = snapshot.to_dict()
+        if self.ttl is not None and time.time() - entry.get('created', 0) > self.ttl:
+            return None
+        return entry.get('value')
+
+    def put(self, key, value):
+        try:
+            self.db.collection(self.collection).document(key).set(
+                {'created': time.time(), 'value': value})
+        except Exception:
+            pass
+
+
+class GenerationCache:
+    """Two-tier cache for generated resumes: in-process LRU plus optional backing tier"""
+
+    def __init__(self, memory=None, backing=None):
+        self.memory = memory or LRUCache(max_entries=256, ttl=24 * 3600)
+        self.backing = backing
+        self.backing_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.backing is not None:
+            value = self.backing.get(key)
+            if value is not None:
+                self.backing_hits += 1
+                self.memory.put(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        if self.backing is not None:
+            self.backing.put(key, value)
+
+    def stats(self) -> dict:
+        return {
+            'memory_hits': self.memory.hits,
+            'backing_hits': self.backing_hits,
+            'hits': self.memory.hits + self.backing_hits,
+            'misses': self.misses,
+            'entries': len(self.memory),
+            'evictions': self.memory.evictions,
+        }
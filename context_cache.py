@@ -0,0 +1,101 @@
+"""Gemini explicit context caching for the fixed system instruction
+
+The instruction block is identical for every generation, so it can be
+stored once with client.caches.create and referenced by name instead of
+being sent and processed with each request. Gemini only caches content
+above a model-specific minimum size and not every model supports it; when
+creation fails, callers fall back to sending the instruction inline as a
+system_instruction.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ContextCache:
+    """Lazily created, self-renewing context cache holding one system instruction
+
+    cached_content() returns the cache's resource name, creating it on first
+    use and again shortly before it expires. It returns None while caching
+    is disabled or after a failed creation (retried after retry_after
+    seconds); callers then send the instruction inline. record_usage() keeps
+    input token totals from response usage metadata, so the saving can be
+    checked against what Gemini actually billed.
+    """
+
+    def __init__(self, client, model, system_instruction, ttl=3600, retry_after=600,
+                 enabled=True, clock=time.monotonic):
+        self.client = client
+        self.model = model
+        self.system_instruction = system_instruction
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.enabled = enabled and client is not None
+        self._clock = clock
+        self._name = None
+        self._expires_at = 0.0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self.created = 0
+        self.failures = 0
+        self.cached_tokens = None  # size of the cached instruction, as reported by Gemini
+        self.prompt_tokens = 0  # input tokens of recorded calls, cached ones included
+        self.cached_prompt_tokens = 0  # of which were served from a context cache
+        self.calls = 0
+
+    def cached_content(self):
+        """Resource name of a live cache for the instruction, or None to send it inline"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            now = self._clock()
+            # Renew a little early so requests never reference a cache that just expired
+            if self._name and now < self._expires_at - min(60, self.ttl / 10):
+                return self._name
+            if now < self._retry_at:
+                return None
+            try:
+                from google.genai import types
+                cache = self.client.caches.create(model=self.model, config=types.CreateCachedContentConfig(
+                    system_instruction=self.system_instruction,
+                    ttl=f"{int(self.ttl)}s",
+                    display_name='cvready-resume-instructions'
+                ))
+            except Exception as e:
+                # Typically the instruction is below the model's minimum cacheable size,
+                # or the model doesn't support explicit caching
+                self.failures += 1
+                self._name = None
+                self._retry_at = now + self.retry_after
+                logger.warning("Context cache unavailable, sending the instruction inline: %s", e)
+                return None
+            self.created += 1
+            self._name = cache.name
+            self._expires_at = now + self.ttl
+            usage = getattr(cache, 'usage_metadata', None)
+            self.cached_tokens = getattr(usage, 'total_token_count', None)
+            return self._name
+
+    def invalidate(self, name=None):
+        """Forget the cache (e.g. after Gemini reported it missing) so the next call recreates it"""
+        with self._lock:
+            if name is None or name == self._name:
+                self._name = None
+
+    def record_usage(self, usage_metadata):
+        """Add a response's usage_metadata to the input token totals"""
+        if usage_metadata is None:
+            return
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += getattr(usage_metadata, 'prompt_token_count', None) or 0
+            self.cached_prompt_tokens += getattr(usage_metadata, 'cached_content_token_count', None) or 0
+
+    def stats(self) -> dict:
+        return {
+            'active': int(self._name is not None), 'created': self.created, 'failures': self.failures,
+            'cached_tokens': self.cached_tokens or 0, 'calls': self.calls,
+            'prompt_tokens': self.prompt_tokens, 'cached_prompt_tokens': self.cached_prompt_tokens,
+        }
@@ -0,0 +1,463 @@
+"""Offline stand-ins for the Gemini client and Firestore, for batch runs, benchmarks and load tests"""
+import asyncio
+import copy
+import datetime
+import hashlib
+import itertools
+import random
+import threading
+import time
+
+
+class FakeUsage:
+    def __init__(self, prompt_token_count=None, cached_content_token_count=None, total_token_count=None):
+        self.prompt_token_count = prompt_token_count
+        self.cached_content_token_count = cached_content_token_count
+        self.total_token_count = total_token_count
+
+
+class FakeResponse:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+def _fake_tokens(text):
+    return -(-len(text or '') // 4)
+
+
+def fake_resume_text(contents) -> str:
+    """Deterministic markdown 'resume' derived from the prompt"""
+    prompt = contents if isinstance(contents, str) else str(contents)
+    digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+    lines = [line.strip() for line in prompt.splitlines() if line.strip()]
+    name = next((line.split(':', 1)[1].strip() for line in lines if line.startswith('Name:')), 'Candidate')
+    return (
+        f"# {name}\n\n"
+        f"## Professional Summary\n\nGenerated offline (fake client, prompt {digest}).\n\n"
+        "## Experience\n\n" + "\n".join(f"- {line}" for line in lines[:20])
+    )
+
+
+class _FakeModels:
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content(self, model, contents, config=None):
+        self._client._before_call()
+        usage = self._client._usage(contents, config)
+        time.sleep(self._client._latency())
+        self._client._maybe_fail()
+        return FakeResponse(fake_resume_text(contents), usage)
+
+    def get(self, model):
+        """Model metadata, as pinged by the start-up warm-up"""
+        return {'name': model}
+
+    def generate_content_stream(self, model, contents, config=None):
+        self._client._before_call()
+        usage = self._client._usage(contents, config)
+        text = fake_resume_text(contents)
+        chunk_size = max(1, len(text) // self._client.stream_chunks)
+        latency = self._client._latency()
+
+        def chunks():
+            for start in range(0, len(text), chunk_size):
+                time.sleep(latency / self._client.stream_chunks)
+                self._client._maybe_fail()
+                last = start + chunk_size >= len(text)
+                yield FakeResponse(text[start:start + chunk_size], usage if last else None)
+        return chunks()
+
+
+class _FakeCaches:
+    """client.caches: stores system instructions at least min_cache_tokens long (as Gemini enforces)"""
+
+    def __init__(self, client):
+        self._client = client
+        self._ids = itertools.count(1)
+
+    def create(self, model, config=None):
+        instruction = getattr(config, 'system_instruction', None) or ''
+        tokens = _fake_tokens(str(instruction))
+        if tokens < self._client.min_cache_tokens:
+            raise RuntimeError(f"400 INVALID_ARGUMENT: Cached content is too small. "
+                               f"total_token_count={tokens}, min_total_token_count={self._client.min_cache_tokens}")
+        name = f"cachedContents/fake-{next(self._ids)}"
+        with self._client._lock:
+            self._client.context_caches[name] = tokens
+        return FakeCachedContent(name, model, FakeUsage(total_token_count=tokens))
+
+    def get(self, name, config=None):
+        if name not in self._client.context_caches:
+            raise RuntimeError(f"404 NOT_FOUND: {name} not found")
+        return FakeCachedContent(name, None, FakeUsage(total_token_count=self._client.context_caches[name]))
+
+    def delete(self, name, config=None):
+        with self._client._lock:
+            self._client.context_caches.pop(name, None)
+
+
+class FakeCachedContent:
+    def __init__(self, name, model, usage_metadata):
+        self.name = name
+        self.model = model
+        self.usage_metadata = usage_metadata
+
+
+class _FakeAsyncModels:
+    def __init__(self, client):
+        self._client = client
+
+    async def generate_content(self, model, contents, config=None):
+        self._client._before_call()
+        usage = self._client._usage(contents, config)
+        await asyncio.sleep(self._client._latency())
+        self._client._maybe_fail()
+        return FakeResponse(fake_resume_text(contents), usage)
+
+
+class _FakeAio:
+    def __init__(self, client):
+        self.models = _FakeAsyncModels(client)
+
+
+class FakeGeminiClient:
+    """Drop-in for genai.Client with configurable latency and error rate
+
+    latency is the mean seconds per call (jitter adds up to +/-25%) and
+    error_rate the probability a call raises error_message. A seed makes
+    the latency and failure sequence reproducible. Responses carry
+    usage_metadata with estimated token counts, and client.caches accepts
+    instructions of at least min_cache_tokens.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, error_message="429 RESOURCE_EXHAUSTED",
+                 seed=None, stream_chunks=8, min_cache_tokens=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_message = error_message
+        self.stream_chunks = stream_chunks
+        self.min_cache_tokens = min_cache_tokens
+        self.calls = 0
+        self.context_caches = {}  # name -> cached tokens
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.models = _FakeModels(self)
+        self.aio = _FakeAio(self)
+        self.caches = _FakeCaches(self)
+
+    def _usage(self, contents, config):
+        """Token counts as Gemini reports them: prompt_token_count includes cached tokens"""
+        prompt_tokens = _fake_tokens(contents if isinstance(contents, str) else str(contents))
+        cached_name = getattr(config, 'cached_content', None)
+        if cached_name:
+            if cached_name not in self.context_caches:
+                raise RuntimeError(f"404 NOT_FOUND: {cached_name} not found")
+            cached = self.context_caches[cached_name]
+            return FakeUsage(prompt_tokens + cached, cached, None)
+        instruction = getattr(config, 'system_instruction', None)
+        return FakeUsage(prompt_tokens + _fake_tokens(str(instruction or '')), None, None)
+
+    def _before_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def _latency(self):
+        with self._lock:
+            return self.latency * self._rng.uniform(0.75, 1.25)
+
+    def _maybe_fail(self):
+        with self._lock:
+            failed = self._rng.random() < self.error_rate
+        if failed:
+            raise RuntimeError(self.error_message)
+
+
+try:
+    from google.cloud.firestore_v1 import DELETE_FIELD, SERVER_TIMESTAMP
+except ImportError:  # the fake works without the Firestore SDK installed
+    DELETE_FIELD, SERVER_TIMESTAMP = object(), object()
+
+DESCENDING = 'DESCENDING'
+
+
+def _field(data, path):
+    for part in path.split('.'):
+        data = data[part]
+    return data
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+    def get(self, path):
+        return _field(self._data, path)
+
+
+class FakeDocumentReference:
+    def __init__(self, collection, doc_id):
+        self._collection = collection
+        self.id = doc_id
+
+    def get(self):
+        db = self._collection.db
+        db._io(db.read_latency)
+        with db._lock:
+            db.doc_reads += 1
+            data = self._collection._docs.get(self.id)
+            return FakeSnapshot(self, copy.deepcopy(data))
+
+    def set(self, data, merge=False):
+        self._collection.db._io(self._collection.db.write_latency)
+        self._apply('set', data, merge)
+
+    def update(self, data):
+        self._collection.db._io(self._collection.db.write_latency)
+        self._apply('update', data)
+
+    def delete(self):
+        self._collection.db._io(self._collection.db.write_latency)
+        self._apply('delete')
+
+    def _apply(self, op, data=None, merge=False, commit_time=None):
+        db = self._collection.db
+        with db._lock:
+            db.writes += 1
+            docs = self._collection._docs
+            if op == 'delete':
+                docs.pop(self.id, None)
+                return
+            if op == 'update' and self.id not in docs:
+                raise KeyError(f"No document to update: {self.id}")
+            data = db._resolve(data, commit_time)
+            if op == 'set' and not merge:
+                docs[self.id] = {}
+            target = docs.setdefault(self.id, {})
+            for key, value in data.items():
+                if value is DELETE_FIELD:
+                    target.pop(key, None)
+                else:
+                    target[key] = value
+
+
+class FakeQuery:
+    def __init__(self, collection, filters=(), order=(), limit=None, fields=None, after=None):
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._order = tuple(order)  # (field path, descending) pairs; '__name__' is the document id
+        self._limit = limit
+        self._fields = fields
+        self._after = after
+
+    def _with(self, **changes):
+        args = dict(filters=self._filters, order=self._order, limit=self._limit,
+                    fields=self._fields, after=self._after)
+        args.update(changes)
+        return FakeQuery(self._collection, **args)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string != '==':
+            raise NotImplementedError(f"FakeFirestore only supports '==' filters, got {op_string!r}")
+        return self._with(filters=self._filters + ((field_path, value),))
+
+    def order_by(self, field_path, direction='ASCENDING'):
+        return self._with(order=self._order + ((field_path, str(direction).upper().endswith('DESCENDING')),))
+
+    def limit(self, count):
+        return self._with(limit=count)
+
+    def select(self, field_paths):
+        return self._with(fields=list(field_paths))
+
+    def start_after(self, values):
+        return self._with(after=values)
+
+    def stream(self):
+        db = self._collection.db
+        db._io(db.read_latency)
+        with db._lock:
+            db.queries += 1
+            items = [(doc_id, data) for doc_id, data in self._collection._docs.items()
+                     if all(_field_or_none(data, f) == v for f, v in self._filters)]
+            for path, descending in reversed(self._order):  # stable sorts, least significant first
+                items.sort(key=lambda item: _order_value(item, path), reverse=descending)
+            if self._after is not None and self._order:
+                # A dict of cursor values or a snapshot, covering a prefix of the orderings
+                orders = [(path, descending) for path, descending in self._order
+                          if _has_cursor_value(self._after, path)]
+                cursor = [_cursor_value(self._after, path) for path, _ in orders]
+                items = [item for item in items if _after_cursor(item, orders, cursor)]
+            if self._limit is not None:
+                items = items[:self._limit]
+            db.doc_reads += len(items)
+            results = [(doc_id, _project(data, self._fields)) for doc_id, data in items]
+        for doc_id, data in results:
+            yield FakeSnapshot(FakeDocumentReference(self._collection, doc_id), data)
+
+    def get(self):
+        return list(self.stream())
+
+
+def _order_value(item, path):
+    return item[0] if path == '__name__' else _field(item[1], path)
+
+
+def _has_cursor_value(after, path):
+    return path in after if isinstance(after, dict) else True  # a snapshot has every field
+
+
+def _cursor_value(after, path):
+    if path == '__name__':
+        value = after.get('__name__') if isinstance(after, dict) else after.id
+        return getattr(value, 'id', value)  # a document id or reference
+    return after.get(path)
+
+
+def _after_cursor(item, orders, cursor):
+    """Whether item sorts strictly after the cursor under the given orderings"""
+    for (path, descending), bound in zip(orders, cursor):
+        value = _order_value(item, path)
+        if value != bound:
+            return value < bound if descending else value > bound
+    return False
+
+
+def _field_or_none(data, path):
+    try:
+        return _field(data, path)
+    except (KeyError, TypeError):
+        return None
+
+
+def _project(data, fields):
+    if fields is None:
+        return copy.deepcopy(data)
+    projected = {}
+    for path in fields:
+        try:
+            value = _field(data, path)
+        except (KeyError, TypeError):
+            continue
+        target = projected
+        parts = path.split('.')
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = copy.deepcopy(value)
+    return projected
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self._docs = {}
+        super().__init__(self)
+
+    def document(self, doc_id=None):
+        return FakeDocumentReference(self, doc_id or self.db._new_id())
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+
+class FakeWriteBatch:
+    def __init__(self, db):
+        self._db = db
+        self._ops = []
+
+    def set(self, reference, data, merge=False):
+        self._ops.append((reference, 'set', data, merge))
+
+    def update(self, reference, data):
+        self._ops.append((reference, 'update', data, False))
+
+    def delete(self, reference):
+        self._ops.append((reference, 'delete', None, False))
+
+    def commit(self):
+        if len(self._ops) > 500:
+            raise ValueError("A batch can contain at most 500 writes")
+        self._db._io(self._db.write_latency)
+        with self._db._lock:
+            self._db.commits += 1
+        # As in Firestore, every SERVER_TIMESTAMP in one commit gets the same time
+        commit_time = self._db._commit_time()
+        for reference, op, data, merge in self._ops:
+            reference._apply(op, data, merge, commit_time)
+        self._ops = []
+
+
+class FakeFirestore:
+    """In-memory stand-in for a firestore.Client with configurable latency
+
+    Supports what the app uses: collection/document get, set (merge),
+    update (with DELETE_FIELD) and delete, equality where(), order_by() (also on '__name__'),
+    select(), start_after(), limit(), stream() and write batches.
+    SERVER_TIMESTAMP becomes the commit time, strictly increasing between
+    commits and shared by every write in one batch, as in Firestore.
+    read_latency/write_latency are seconds added per query or document
+    read and per write or batch commit, and error_rate the probability
+    one of them raises a 503 error instead. Counters: queries,
+    doc_reads, writes, commits.
+    """
+
+    def __init__(self, read_latency=0.0, write_latency=0.0, error_rate=0.0, seed=None):
+        self.read_latency = read_latency
+        self.write_latency = write_latency
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self.queries = 0
+        self.doc_reads = 0
+        self.writes = 0
+        self.commits = 0
+        self._collections = {}
+        self._ids = itertools.count()
+        self._clock_lock = threading.Lock()
+        self._last_commit_time = None
+        self._lock = threading.RLock()
+
+    def collection(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = FakeCollection(self, name)
+            return self._collections[name]
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def _new_id(self):
+        return f"fake{next(self._ids):016d}"
+
+    def _io(self, seconds):
+        if seconds:
+            time.sleep(seconds)
+        if self.error_rate:
+            with self._lock:
+                failed = self._rng.random() < self.error_rate
+            if failed:
+                raise RuntimeError("503 UNAVAILABLE: fake Firestore error")
+
+    def _commit_time(self):
+        with self._clock_lock:
+            now = datetime.datetime.now(datetime.timezone.utc)
+            if self._last_commit_time is not None and now <= self._last_commit_time:
+                now = self._last_commit_time + datetime.timedelta(microseconds=1)
+            self._last_commit_time = now
+            return now
+
+    def _resolve(self, data, commit_time=None):
+        commit_time = commit_time or self._commit_time()
+        return {key: commit_time if value is SERVER_TIMESTAMP else copy.deepcopy(value) for key, value in data.items()}
+
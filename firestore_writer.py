@@ -0,0 +1,195 @@
+"""Write-behind queue that batches storage writes on a background thread"""
+import atexit
+import queue
+import random
+import re
+import sys
+import threading
+import time
+
+from caching import LRUCache
+
+PENDING = 'pending'
+SAVED = 'saved'
+FAILED = 'failed'
+
+
+class _Write:
+    __slots__ = ('collection', 'doc_id', 'data', 'coalesce_key', 'on_done', 'related')
+
+    def __init__(self, collection, doc_id, data, coalesce_key, on_done, related):
+        self.collection = collection
+        self.doc_id = doc_id
+        self.data = data
+        self.coalesce_key = coalesce_key
+        self.on_done = on_done
+        self.related = related
+
+
+class WriteBehindQueue:
+    """Queue document writes and commit them in batches, retrying with backoff
+
+    enqueue() returns the document id straight away; status(doc_id) later
+    reports PENDING, SAVED or (FAILED, message). Writes sharing a
+    coalesce_key while still queued collapse into the first one, so a
+    double-submitted save is written once. storage is a backend from
+    storage.py; each batch is one storage.commit(). Only transient errors
+    are retried; when a batch fails permanently its writes are committed
+    one at a time, so one bad document fails only its own save.
+    """
+
+    def __init__(self, storage, batch_size=20, flush_interval=0.25, max_retries=5,
+                 base_delay=0.5, max_delay=10.0):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._coalesced = {}  # coalesce_key -> doc_id while queued
+        self._statuses = LRUCache(max_entries=10000)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.commits = 0
+        self.writes = 0
+        self.retries = 0
+        self.failures = 0
+        self._thread = threading.Thread(target=self._run, name="firestore-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enqueue(self, collection, data, doc_id=None, coalesce_key=None, on_done=None, related=()):
+        """Queue a document set; returns the (possibly pre-allocated) document id
+
+        related is a list of extra (collection, doc_id, data) sets that must be
+        committed in the same batch as this document.
+        """
+        with self._lock:
+            if coalesce_key is not None and coalesce_key in self._coalesced:
+                return self._coalesced[coalesce_key]
+            if doc_id is None:
+                doc_id = self.storage.new_id(collection)
+            if coalesce_key is not None:
+                self._coalesced[coalesce_key] = doc_id
+            self._statuses.put(doc_id, (PENDING, None))
+        self._queue.put(_Write(collection, doc_id, data, coalesce_key, on_done, list(related)))
+        return doc_id
+
+    def status(self, doc_id):
+        """(state, error message) for a queued write; (None, None) if unknown"""
+        return self._statuses.get(doc_id, (None, None))
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        """Commit, document write, retry and failed-write counts so far"""
+        return {'commits': self.commits, 'writes': self.writes, 'retries': self.retries,
+                'failures': self.failures, 'pending': self.pending()}
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been committed or has failed"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout=10):
+        if self._closed:
+            return
+        self._closed = True
+        self.flush(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # Firestore caps a batch at 500 writes, counting related documents
+            size = 1 + len(batch[0].related)
+            while len(batch) < self.batch_size and size < 450:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    write = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(write)
+                size += 1 + len(write.related)
+            self._commit_with_retry(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _commit_with_retry(self, writes):
+        error = self._commit(writes)
+        if error is None or is_transient(error) or len(writes) == 1:
+            errors = [error] * len(writes)
+        else:
+            # A permanent error (e.g. a document over the size limit) comes from one write;
+            # commit them one by one so the other saves in the batch still land
+            errors = [self._commit([write]) for write in writes]
+        with self._lock:
+            self.failures += sum(error is not None for error in errors)
+            for write, error in zip(writes, errors):
+                if write.coalesce_key is not None:
+                    self._coalesced.pop(write.coalesce_key, None)
+                self._statuses.put(write.doc_id, (SAVED, None) if error is None else (FAILED, str(error)))
+        for write, error in zip(writes, errors):
+            if write.on_done:
+                try:
+                    write.on_done(error is None)
+                except Exception:
+                    pass
+
+    def _commit(self, writes):
+        """Commit writes (and their related documents) as one batch, retrying transient errors
+
+        Returns None on success or the last error.
+        """
+        sets = []
+        related_seen = set()
+        for write in writes:
+            for collection, doc_id, data in write.related:
+                # Related documents are content-addressed, so one write per id is enough
+                if (collection, doc_id) not in related_seen:
+                    related_seen.add((collection, doc_id))
+                    sets.append((collection, doc_id, data))
+            sets.append((write.collection, write.doc_id, write.data))
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.storage.commit(sets)
+            except Exception as e:
+                if attempt == self.max_retries or not is_transient(e):
+                    return e
+                self.retries += 1
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+                time.sleep(random.uniform(0, delay))  # full jitter
+            else:
+                self.commits += 1
+                self.writes += len(sets)
+                return None
+
+
+# gRPC status names of failures that may succeed when retried, and SQLite lock contention
+_TRANSIENT = re.compile(r'\b(UNAVAILABLE|DEADLINE_EXCEEDED|RESOURCE_EXHAUSTED|ABORTED|INTERNAL)\b'
+                        r'|database is (locked|busy)')
+
+
+def is_transient(e: Exception) -> bool:
+    """Whether a failed commit is worth retrying (outages, timeouts, contention), not a bad request"""
+    # Looked up rather than imported, like the Gemini SDK in gemini_client
+    api_exceptions = sys.modules.get('google.api_core.exceptions')
+    if api_exceptions is not None:
+        transient = (api_exceptions.ServiceUnavailable, api_exceptions.DeadlineExceeded,
+                     api_exceptions.TooManyRequests, api_exceptions.InternalServerError,
+                     api_exceptions.Aborted, api_exceptions.GatewayTimeout)
+        if isinstance(e, transient):
+            return True
+        if isinstance(e, api_exceptions.GoogleAPICallError):
+            return False
+    if isinstance(e, (ConnectionError, TimeoutError)):
+        return True
+    return _TRANSIENT.search(str(e)) is not None
@@ -0,0 +1,295 @@
+"""Resilient wrapper around genai.Client: typed errors, retries, circuit breaker, hedging, latency histograms"""
+import random
+import sys
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeout
+from enum import Enum
+
+
+class ErrorKind(Enum):
+    INVALID_KEY = 'invalid_key'
+    QUOTA = 'quota'
+    FORBIDDEN = 'forbidden'
+    NOT_FOUND = 'not_found'
+    BLOCKED = 'blocked'
+    TIMEOUT = 'timeout'
+    UNAVAILABLE = 'unavailable'
+    CIRCUIT_OPEN = 'circuit_open'
+    OTHER = 'other'
+
+
+# Transient failures worth retrying; they also count against the circuit breaker
+RETRYABLE = frozenset({ErrorKind.QUOTA, ErrorKind.TIMEOUT, ErrorKind.UNAVAILABLE})
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit breaker is open"""
+
+
+# The SDK and httpx are looked up rather than imported: an exception can only come
+# from them once something else has loaded them, and importing google.genai is slow.
+def _timeout_types():
+    types = [TimeoutError, FuturesTimeout]
+    httpx = sys.modules.get('httpx')
+    if httpx is not None:
+        types.append(httpx.TimeoutException)
+    return tuple(types)
+
+
+def _connection_types():
+    types = [ConnectionError]
+    httpx = sys.modules.get('httpx')
+    if httpx is not None:
+        types.append(httpx.TransportError)
+    return tuple(types)
+
+
+def classify_error(e: Exception) -> ErrorKind:
+    """Classify a Gemini call failure by exception type and status code, then by message"""
+    if isinstance(e, CircuitOpenError):
+        return ErrorKind.CIRCUIT_OPEN
+    error_msg = str(e)
+    lowered = error_msg.lower()
+    if "API_KEY_INVALID" in error_msg or "invalid api key" in lowered or "api key not valid" in lowered:
+        return ErrorKind.INVALID_KEY
+
+    genai_errors = sys.modules.get('google.genai.errors')
+    code = getattr(e, 'code', None) if genai_errors and isinstance(e, genai_errors.APIError) else None
+    if code is not None:
+        if code == 429:
+            return ErrorKind.QUOTA
+        if code in (401, 403):
+            return ErrorKind.FORBIDDEN
+        if code == 404:
+            return ErrorKind.NOT_FOUND
+        if code in (408, 504):
+            return ErrorKind.TIMEOUT
+        if code >= 500:
+            return ErrorKind.UNAVAILABLE
+    if isinstance(e, _timeout_types()):
+        return ErrorKind.TIMEOUT
+    if isinstance(e, _connection_types()):
+        return ErrorKind.UNAVAILABLE
+
+    # Untyped errors (and SDK messages without a usable code)
+    if "quota" in lowered or "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
+        return ErrorKind.QUOTA
+    if "403" in error_msg or "permission" in lowered:
+        return ErrorKind.FORBIDDEN
+    if "404" in error_msg or "not found" in lowered:
+        return ErrorKind.NOT_FOUND
+    if "blocked" in lowered or "safety" in lowered:
+        return ErrorKind.BLOCKED
+    if "timeout" in lowered or "deadline" in lowered:
+        return ErrorKind.TIMEOUT
+    if "503" in error_msg or "unavailable" in lowered:
+        return ErrorKind.UNAVAILABLE
+    return ErrorKind.OTHER
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures; half-open probe after `reset_timeout`"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+            # Half-open: let a single probe through
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram (Prometheus-style buckets) keyed by (operation, outcome)"""
+
+    BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._series = {}  # (operation, outcome) -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, operation, outcome, seconds):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.setdefault((operation, outcome), [0] * (len(self.buckets) + 2))
+            series[index] += 1
+            series[-1] += seconds
+
+    def snapshot(self) -> dict:
+        """{(operation, outcome): {'buckets': {le: cumulative count}, 'count': n, 'sum': s}}"""
+        with self._lock:
+            result = {}
+            for key, series in self._series.items():
+                cumulative, buckets = 0, {}
+                for le, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                    cumulative += count
+                    buckets[le] = cumulative
+                result[key] = {'buckets': buckets, 'count': cumulative, 'sum': series[-1]}
+            return result
+
+    def quantile(self, operation, q, outcome='ok'):
+        """Upper bucket bound containing the q-quantile, or None without samples"""
+        series = self.snapshot().get((operation, outcome))
+        if not series or not series['count']:
+            return None
+        target = q * series['count']
+        for le, cumulative in series['buckets'].items():
+            if cumulative >= target:
+                return le
+        return float('inf')
+
+
+class _ResilientModels:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def generate_content(self, **kwargs):
+        models = self._owner.client.models
+        return self._owner.call('generate_content', lambda: models.generate_content(**kwargs),
+                                hedge=True)
+
+    def generate_content_stream(self, **kwargs):
+        """Retry until the first chunk arrives; after that the stream is passed through"""
+        models = self._owner.client.models
+        end = object()
+
+        def open_stream():
+            stream = iter(models.generate_content_stream(**kwargs))
+            return stream, next(stream, end)
+
+        stream, first = self._owner.call('generate_content_stream', open_stream, hedge=False)
+
+        def chunks():
+            if first is not end:
+                yield first
+                yield from stream
+        return chunks()
+
+    def __getattr__(self, name):
+        return getattr(self._owner.client.models, name)
+
+
+class ResilientGeminiClient:
+    """Wraps a genai.Client so `client.models` calls are retried, guarded and timed
+
+    Retryable failures (quota, timeouts, 5xx) are retried up to
+    max_attempts with full-jitter exponential backoff. A shared
+    CircuitBreaker fails calls fast while Gemini is down. If hedge_after
+    is set, a second identical request is sent when the first has not
+    answered within that many seconds and the first success wins.
+    Everything else on the client is passed through unchanged.
+    """
+
+    def __init__(self, client, max_attempts=3, base_delay=0.5, max_delay=8.0,
+                 breaker=None, hedge_after=None, histogram=None, sleep=time.sleep):
+        self.client = client
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge_after = hedge_after
+        self.histogram = histogram or LatencyHistogram()
+        self._sleep = sleep
+        self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gemini-hedge") \
+            if hedge_after else None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.models = _ResilientModels(self)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def call(self, operation, fn, hedge=False):
+        """Run fn() with retries, the circuit breaker and latency accounting"""
+        with self._lock:
+            self.calls += 1
+        for attempt in range(self.max_attempts):
+            if not self.breaker.allow():
+                raise CircuitOpenError("Gemini circuit breaker is open")
+            start = time.perf_counter()
+            try:
+                result = self._hedged(fn) if hedge and self._hedge_pool else fn()
+            except Exception as e:
+                kind = classify_error(e)
+                self.histogram.observe(operation, kind.value, time.perf_counter() - start)
+                if kind in RETRYABLE:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()  # Gemini answered; the request itself was bad
+                if kind not in RETRYABLE or attempt == self.max_attempts - 1:
+                    raise
+                with self._lock:
+                    self.retries += 1
+                self._sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+                continue
+            self.histogram.observe(operation, 'ok', time.perf_counter() - start)
+            self.breaker.record_success()
+            return result
+
+    def _hedged(self, fn):
+        primary = self._hedge_pool.submit(fn)
+        if wait([primary], timeout=self.hedge_after).done:
+            return primary.result()
+        with self._lock:
+            self.hedges += 1
+        pending = {primary, self._hedge_pool.submit(fn)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stats(self) -> dict:
+        return {
+            'calls': self.calls, 'retries': self.retries, 'hedges': self.hedges,
+            'breaker': self.breaker.state, 'latency': self.histogram.snapshot(),
+        }
@@ -0,0 +1,185 @@
+"""Single-pass conversion of generated resume markdown into style-neutral PDF blocks
+
+parse_markdown() reads the markdown line by line (it accepts any iterable
+of lines, so it can consume text as it streams in) and yields Blocks whose
+text is already in ReportLab's paragraph markup: headings, bullets,
+paragraphs and rules, with **bold**, *italic*, `code` and [links](url)
+converted inline. Blocks carry a role, not a style, so the same parse
+serves every template; pdf_templates maps roles onto template styles.
+Each line is scanned once, so the cost is linear in the size of the text.
+"""
+import re
+from typing import NamedTuple
+
+from caching import LRUCache
+
+
+class Block(NamedTuple):
+    role: str  # 'title', 'contact', 'heading', 'subheading', 'body', 'bullet' or 'rule'
+    markup: str = ''
+    bullet: str = ''  # bullet character or list number, for 'bullet'
+    depth: int = 0  # list nesting level, for 'bullet'
+
+
+_HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_BULLET = re.compile(r'^(\s*)(?:([-*+•])|(\d{1,3})[.)])\s+(.*)$')
+_RULE = re.compile(r'^\s{0,3}([-*_])(?:\s*\1){2,}\s*$')
+_FENCE = re.compile(r'^\s*(```|~~~)')
+# Inline tokens, tried left to right; link text and targets are bounded so a stray
+# '[' can't make the scan quadratic
+_INLINE = re.compile(
+    r'(?P<code>`[^`\n]{1,500}`)'
+    r'|\[(?P<text>[^\]\n]{1,300})\]\((?P<url>[^)\s]{1,500})\)'
+    r'|(?P<emph>\*{1,3}|_{1,3})'
+    r'|(?P<escape>[&<>])'
+)
+_ESCAPES = {'&': '&amp;', '<': '&lt;', '>': '&gt;'}
+_LINK_SCHEMES = ('http://', 'https://', 'mailto:')
+_EMPHASIS = {1: ('i',), 2: ('b',), 3: ('b', 'i')}
+
+
+def escape(text):
+    """Escape text for a ReportLab Paragraph, so it is shown as written rather than parsed as markup"""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def inline_markup(text: str) -> str:
+    """Convert inline markdown to ReportLab paragraph markup in one left-to-right scan
+
+    Emphasis markers that are never closed are kept as literal text, and
+    underscores inside words (snake_case, e-mail addresses) are not
+    treated as emphasis.
+    """
+    out = []
+    open_tags = []  # (index in out of the opening tags, literal marker)
+    pos = 0
+    for m in _INLINE.finditer(text):
+        out.append(text[pos:m.start()])
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == 'escape':
+            out.append(_ESCAPES[m.group()])
+        elif kind == 'code':
+            out.append(f'<font face="Courier">{escape(m.group()[1:-1])}</font>')
+        elif kind == 'url':
+            url = m.group('url')
+            label = inline_markup(m.group('text'))
+            if url.lower().startswith(_LINK_SCHEMES):
+                href = escape(url).replace('"', '&quot;')
+                out.append(f'<link href="{href}"><u>{label}</u></link>')
+            else:
+                out.append(label)
+        else:
+            marker = m.group()
+            if marker[0] == '_':
+                before = text[m.start() - 1] if m.start() else ' '
+                after = text[m.end()] if m.end() < len(text) else ' '
+                if before.isalnum() and after.isalnum():
+                    out.append(marker)
+                    continue
+            tags = _EMPHASIS[len(marker)]
+            if open_tags and open_tags[-1][1] == marker:
+                open_tags.pop()
+                out.append(''.join(f'</{tag}>' for tag in reversed(tags)))
+            elif pos < len(text) and not text[pos].isspace():
+                open_tags.append((len(out), marker))
+                out.append(''.join(f'<{tag}>' for tag in tags))
+            else:
+                out.append(marker)  # a lone '*' between spaces is just an asterisk
+    out.append(text[pos:])
+    # Only the innermost opener can be closed, so the tags stay balanced; openers
+    # still pending at the end of the line were literal text after all
+    for index, marker in open_tags:
+        out[index] = marker
+    return ''.join(out)
+
+
+def parse_markdown(lines):
+    """Yield Blocks for markdown given as an iterable of lines, in one pass
+
+    The first level-1 heading is the 'title' and a paragraph directly
+    under it the 'contact' line. Consecutive text lines form one
+    paragraph; a blank line, heading, bullet or rule ends it. Code fence
+    lines (models sometimes wrap the whole resume in one) are dropped.
+    """
+    paragraph = []
+    seen_title = False
+    after_title = False
+    list_indents = []
+
+    def flush():
+        nonlocal after_title
+        if not paragraph:
+            return None
+        markup = ''.join(paragraph).rstrip()
+        if markup.endswith('<br/>'):
+            markup = markup[:-5]
+        paragraph.clear()
+        role = 'contact' if after_title else 'body'
+        after_title = False
+        return Block(role, markup)
+
+    for raw in lines:
+        line = raw.rstrip('\r\n')
+        if _FENCE.match(line):
+            continue
+        stripped = line.strip()
+        if not stripped:
+            block = flush()
+            if block:
+                yield block
+            continue
+
+        heading = _HEADING.match(stripped)
+        # '* * *' is a rule, not a bullet holding '* *'
+        rule = None if heading else _RULE.match(line)
+        bullet = None if heading or rule else _BULLET.match(line)
+        if heading or rule or bullet:
+            block = flush()
+            if block:
+                yield block
+            after_title = False
+        if heading:
+            list_indents.clear()
+            level = len(heading.group(1))
+            markup = inline_markup(heading.group(2))
+            if level == 1 and not seen_title:
+                seen_title = after_title = True
+                yield Block('title', markup)
+            else:
+                yield Block('heading' if level <= 2 else 'subheading', markup)
+        elif bullet:
+            indent = len(bullet.group(1).expandtabs(4))
+            while list_indents and indent < list_indents[-1]:
+                list_indents.pop()
+            if not list_indents or indent > list_indents[-1]:
+                list_indents.append(indent)
+            symbol = f"{bullet.group(3)}." if bullet.group(3) else '•'
+            yield Block('bullet', inline_markup(bullet.group(4).strip()), symbol, len(list_indents) - 1)
+        elif rule:
+            list_indents.clear()
+            yield Block('rule')
+        else:
+            # Two trailing spaces or a backslash are a markdown hard line break
+            hard_break = line.endswith('  ') or stripped.endswith('\\')
+            text = inline_markup(stripped.rstrip('\\').rstrip())
+            paragraph.append(text + ('<br/>' if hard_break else ' '))
+    block = flush()
+    if block:
+        yield block
+
+
+_parsed = LRUCache(max_entries=64)
+
+
+def markdown_blocks(text: str) -> tuple:
+    """Parsed Blocks for a generated resume, cached per text so other templates skip parsing"""
+    blocks = _parsed.get(text)
+    if blocks is None:
+        blocks = tuple(parse_markdown(text.splitlines()))
+        _parsed.put(text, blocks)
+    return blocks
+
+
+def parse_cache_stats() -> dict:
+    return _parsed.stats()
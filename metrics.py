@@ -0,0 +1,284 @@
+"""Lightweight tracing and metrics: spans, counters, Prometheus text and OTLP JSON export"""
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from gemini_client import LatencyHistogram
+
+_current_trace = contextvars.ContextVar('cvready_trace', default=None)
+_current_span = contextvars.ContextVar('cvready_span', default=None)
+
+# Span attributes that identify a session or document, so they stay off metric labels
+HIGH_CARDINALITY = frozenset({'session', 'doc_id', 'user_email'})
+
+
+def _new_id(n_bytes):
+    return os.urandom(n_bytes).hex()
+
+
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'attributes',
+                 'start_ns', 'end_ns', 'duration', 'status', 'error')
+
+    def __init__(self, trace_id, parent_id, name, attributes):
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.duration = None
+        self.status = 'ok'
+        self.error = None
+
+    def set(self, **attributes):
+        """Add attributes while the span is open (e.g. whether a cache was hit)"""
+        self.attributes.update(attributes)
+
+
+class Metrics:
+    """Counters, latency histograms and a ring buffer of recent spans
+
+    span() times a block and records it under the current trace (one per
+    Streamlit rerun, see start_trace). Its duration also goes into the
+    'cvready_span_seconds' histogram, labelled by span name, the
+    low-cardinality attributes (e.g. template) and status. Other components
+    expose their own statistics through register_collector().
+    """
+
+    def __init__(self, max_spans=2048):
+        self._counters = {}  # (name, labels) -> value
+        self._help = {}
+        self._histograms = {}  # name -> (LatencyHistogram, label names, help)
+        self._collectors = []
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self.span_histogram = LatencyHistogram()
+        self.add_histogram('cvready_span_seconds', self.span_histogram, ('span', 'labels', 'status'),
+                           "Duration of instrumented code paths")
+
+    # Counters and collectors
+    def inc(self, name, amount=1, help='', **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            if help:
+                self._help.setdefault(name, help)
+
+    def add_histogram(self, name, histogram, label_names, help=''):
+        """Export a LatencyHistogram whose (operation, outcome) keys map to label_names"""
+        self._histograms[name] = (histogram, tuple(label_names), help)
+
+    def register_collector(self, fn):
+        """fn() -> iterable of (name, kind, labels dict, value, help); kind is 'counter' or 'gauge'"""
+        self._collectors.append(fn)
+
+    def _samples(self):
+        with self._lock:
+            samples = [(name, 'counter', dict(labels), value, self._help.get(name, ''))
+                       for (name, labels), value in self._counters.items()]
+        for collector in self._collectors:
+            try:
+                samples.extend(collector())
+            except Exception:
+                pass  # a broken collector must not take the export down
+        return samples
+
+    def _histogram_series(self):
+        for name, (histogram, label_names, help) in self._histograms.items():
+            for (operation, outcome), series in histogram.snapshot().items():
+                values = (operation if isinstance(operation, tuple) else (operation,)) + (outcome,)
+                labels = {}
+                for label, value in zip(label_names, values):
+                    if isinstance(value, tuple):  # nested attribute labels, e.g. (('template', 'modern'),)
+                        labels.update(value)
+                    else:
+                        labels[label] = value
+                yield name, help, labels, series
+
+    # Tracing
+    def start_trace(self, **attributes):
+        """Start a new trace for this rerun; returns its id"""
+        trace_id = _new_id(16)
+        _current_trace.set((trace_id, attributes))
+        _current_span.set(None)
+        return trace_id
+
+    def current_trace_id(self):
+        trace = _current_trace.get()
+        return trace[0] if trace else None
+
+    @contextmanager
+    def span(self, name, **attributes):
+        trace = _current_trace.get()
+        trace_id, trace_attributes = trace if trace else (_new_id(16), {})
+        parent = _current_span.get()
+        span = Span(trace_id, parent.span_id if parent else None, name,
+                    dict(trace_attributes, **attributes))
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.status, span.error = 'error', f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            span.end_ns = span.start_ns + int(span.duration * 1e9)
+            _current_span.reset(token)
+            with self._lock:
+                self._spans.append(span)
+            labels = tuple(sorted((k, str(v)) for k, v in span.attributes.items()
+                                  if k not in HIGH_CARDINALITY and isinstance(v, (str, bool))))
+            self.span_histogram.observe((name, labels), span.status, span.duration)
+
+    def spans(self, trace_id=None):
+        """Recent finished spans, oldest first; only those of trace_id if given"""
+        with self._lock:
+            spans = list(self._spans)
+        return [s for s in spans if trace_id is None or s.trace_id == trace_id]
+
+    # Export
+    def prometheus_text(self) -> str:
+        """All counters, collector values and histograms in the Prometheus text format"""
+        lines, typed = [], set()
+
+        def header(name, kind, help):
+            if name not in typed:
+                typed.add(name)
+                if help:
+                    lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for name, kind, labels, value, help in sorted(self._samples(), key=lambda s: (s[0], sorted(s[2].items()))):
+            header(name, kind, help)
+            lines.append(f"{name}{_prom_labels(labels)} {_prom_number(value)}")
+        for name, help, labels, series in self._histogram_series():
+            header(name, 'histogram', help)
+            for le, count in series['buckets'].items():
+                lines.append(f"{name}_bucket{_prom_labels(dict(labels, le=_prom_number(le)))} {count}")
+            lines.append(f"{name}_sum{_prom_labels(labels)} {_prom_number(series['sum'])}")
+            lines.append(f"{name}_count{_prom_labels(labels)} {series['count']}")
+        return "\n".join(lines) + "\n"
+
+    def otlp_traces(self, trace_id=None) -> dict:
+        """Recent spans as an OTLP/JSON ExportTraceServiceRequest"""
+        spans = [{
+            'traceId': s.trace_id, 'spanId': s.span_id, 'parentSpanId': s.parent_id or '',
+            'name': s.name, 'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(s.start_ns), 'endTimeUnixNano': str(s.end_ns),
+            'attributes': _otlp_attributes(s.attributes),
+            'status': {'code': 1} if s.status == 'ok' else {'code': 2, 'message': s.error},
+        } for s in self.spans(trace_id)]
+        return {'resourceSpans': [{'resource': _RESOURCE, 'scopeSpans': [{'scope': _SCOPE, 'spans': spans}]}]}
+
+    def otlp_metrics(self) -> dict:
+        """Counters, gauges and histograms as an OTLP/JSON ExportMetricsServiceRequest"""
+        now = str(time.time_ns())
+        metrics = {}
+        for name, kind, labels, value, help in self._samples():
+            point = {'attributes': _otlp_attributes(labels), 'timeUnixNano': now, 'asDouble': float(value)}
+            if name not in metrics:
+                body = {'dataPoints': []}
+                if kind == 'counter':
+                    body.update(aggregationTemporality=2, isMonotonic=True)  # cumulative
+                metrics[name] = {'name': name, 'description': help, 'sum' if kind == 'counter' else 'gauge': body}
+            metrics[name].get('sum', metrics[name].get('gauge'))['dataPoints'].append(point)
+        for name, help, labels, series in self._histogram_series():
+            if name not in metrics:
+                metrics[name] = {'name': name, 'description': help, 'unit': 's',
+                                 'histogram': {'aggregationTemporality': 2, 'dataPoints': []}}
+            bounds = [le for le in series['buckets'] if le != float('inf')]
+            cumulative = list(series['buckets'].values())
+            counts = [c - p for c, p in zip(cumulative, [0] + cumulative[:-1])]
+            metrics[name]['histogram']['dataPoints'].append({
+                'attributes': _otlp_attributes(labels), 'timeUnixNano': now,
+                'count': str(series['count']), 'sum': series['sum'],
+                'explicitBounds': bounds, 'bucketCounts': [str(c) for c in counts],
+            })
+        return {'resourceMetrics': [{'resource': _RESOURCE,
+                                     'scopeMetrics': [{'scope': _SCOPE, 'metrics': list(metrics.values())}]}]}
+
+
+def stats_collector(prefix, stats_fn, counters=(), gauges=(), **labels):
+    """Collector exposing selected keys of a component's stats() dict
+
+    Counter keys become '<prefix>_<key>_total', gauge keys '<prefix>_<key>'.
+    """
+    def collect():
+        stats = stats_fn()
+        for key in counters:
+            yield f"{prefix}_{key}_total", 'counter', labels, stats[key], ''
+        for key in gauges:
+            yield f"{prefix}_{key}", 'gauge', labels, stats[key], ''
+    return collect
+
+
+_RESOURCE = {'attributes': [{'key': 'service.name', 'value': {'stringValue': 'cvready'}}]}
+_SCOPE = {'name': 'cvready.metrics'}
+
+
+def _prom_escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _prom_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_prom_escape(v)}"' for k, v in sorted(labels.items())) + '}'
+
+
+def _prom_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _otlp_attributes(attributes):
+    result = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {'boolValue': value}
+        elif isinstance(value, int):
+            typed = {'intValue': str(value)}
+        elif isinstance(value, float):
+            typed = {'doubleValue': value}
+        else:
+            typed = {'stringValue': str(value)}
+        result.append({'key': key, 'value': typed})
+    return result
+
+
+def serve_metrics(metrics, port, host='127.0.0.1'):
+    """Serve /metrics (Prometheus), /v1/metrics and /v1/traces (OTLP JSON) on a daemon thread"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path == '/metrics':
+                body, content_type = metrics.prometheus_text(), 'text/plain; version=0.0.4'
+            elif path == '/v1/metrics':
+                body, content_type = json.dumps(metrics.otlp_metrics()), 'application/json'
+            elif path == '/v1/traces':
+                body, content_type = json.dumps(metrics.otlp_traces()), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,100 @@
+"""Migrate inline resume documents to content-addressed storage (storage_version 2)
+
+Older documents in `resumes` carry resume_data and generated_resume inline.
+This script walks each user's history oldest first, writes the blobs
+(generated text as deltas against the previous version where smaller) and
+replaces the inline fields with references. It is idempotent: migrated
+documents are skipped, so it can be re-run after an interruption.
+
+    python migrate_resumes.py --dry-run
+    python migrate_resumes.py --credentials serviceAccountKey.json --batch-size 100
+"""
+import argparse
+import sys
+
+from resume_store import STORAGE_VERSION, ResumeStore
+from storage import SERVER_TIMESTAMP, FirestoreStorage
+
+
+def migrate_user(db, store, user_email, firestore, batch_size=100, dry_run=False):
+    """Migrate one user's documents; returns (migrated, skipped, bytes_before, bytes_after)"""
+    docs = db.collection(store.collection)\
+        .where('user_email', '==', user_email)\
+        .order_by('created_at', direction=firestore.Query.DESCENDING)\
+        .stream()
+    history = list(docs)[::-1]  # oldest first, so each version can delta against its parent
+
+    migrated = skipped = bytes_before = bytes_after = 0
+    parent = None
+    batch, pending = db.batch(), 0
+    seen_blobs = set()
+    for doc in history:
+        data = dict(doc.to_dict(), id=doc.id)
+        if data.get('storage_version') == STORAGE_VERSION:
+            parent = store.version_info(store.resolve(data))
+            skipped += 1
+            continue
+
+        resume_data = data.get('resume_data') or {}
+        generated_resume = data.get('generated_resume') or ''
+        # Parent and child blobs are committed in order within one run, so deltas
+        # may reference blobs from this batch
+        version_doc, blob_writes, version_info = store.build_version(
+            user_email, resume_data, generated_resume, parent, require_committed_base=False)
+        version_doc['parent_id'] = parent['id'] if parent else None
+        version_info['id'] = doc.id
+        parent = version_info
+
+        bytes_before += len(generated_resume.encode('utf-8')) + len(repr(resume_data))
+        bytes_after += sum(len(blob['data']) for _, blob_id, blob in blob_writes
+                           if blob_id not in seen_blobs)
+        seen_blobs.update(blob_id for _, blob_id, _ in blob_writes)
+        migrated += 1
+        if dry_run:
+            continue
+
+        writes = 1 + len(blob_writes)
+        if pending and pending + writes > batch_size:
+            batch.commit()
+            batch, pending = db.batch(), 0
+        for collection, blob_id, blob in blob_writes:
+            blob = {key: firestore.SERVER_TIMESTAMP if value is SERVER_TIMESTAMP else value
+                    for key, value in blob.items()}
+            batch.set(db.collection(collection).document(blob_id), blob)
+        version_doc['resume_data'] = firestore.DELETE_FIELD
+        version_doc['generated_resume'] = firestore.DELETE_FIELD
+        batch.update(doc.reference, version_doc)
+        store.mark_written(blob_writes)
+        pending += writes
+    if pending:
+        batch.commit()
+    return migrated, skipped, bytes_before, bytes_after
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate saved resumes to content-addressed storage")
+    parser.add_argument('--credentials', default='serviceAccountKey.json')
+    parser.add_argument('--batch-size', type=int, default=100, help="writes per Firestore batch (max 500)")
+    parser.add_argument('--dry-run', action='store_true', help="report what would change without writing")
+    args = parser.parse_args(argv)
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    firebase_admin.initialize_app(credentials.Certificate(args.credentials))
+    db = firestore.client()
+    storage = FirestoreStorage(db)
+    store = ResumeStore(storage)
+
+    totals = [0, 0, 0, 0]
+    for email in storage.user_emails():
+        result = migrate_user(db, store, email, firestore, min(args.batch_size, 500), args.dry_run)
+        totals = [t + r for t, r in zip(totals, result)]
+        print(f"{email}: {result[0]} migrated, {result[1]} already migrated", file=sys.stderr)
+    migrated, skipped, before, after = totals
+    prefix = "[dry run] " if args.dry_run else ""
+    print(f"{prefix}{migrated} documents migrated, {skipped} skipped; "
+          f"inline payload {before} bytes -> {after} bytes of new blobs", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
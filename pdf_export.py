@@ -0,0 +1,63 @@
+"""Bulk PDF export: render saved resumes across a process pool into a ZIP archive"""
+import re
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from pdf_templates import create_professional_pdf
+
+
+def _safe_name(value):
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', value or '').strip('_') or 'resume'
+
+
+def export_filename(resume, template_style):
+    """Archive member name for one saved resume rendered with one template"""
+    name = resume.get('resume_data', {}).get('basic_info', {}).get('name', '')
+    created = resume.get('created_at')
+    stamp = created.strftime('%Y%m%d-%H%M%S') if hasattr(created, 'strftime') else 'undated'
+    return f"{_safe_name(name)}/{stamp}_{resume['id']}_{template_style}.pdf"
+
+
+def render_pdf_job(job):
+    """Process-pool worker: render one (filename, resume_data, generated, template) job"""
+    filename, resume_data, generated_resume, template_style = job
+    pdf_bytes = create_professional_pdf(resume_data, generated_resume, template_style).getvalue()
+    return filename, pdf_bytes
+
+
+def export_jobs(resumes, templates):
+    """Yield one render job per saved resume per template"""
+    for resume in resumes:
+        for template_style in templates:
+            yield (export_filename(resume, template_style), resume.get('resume_data', {}),
+                   resume.get('generated_resume', ''), template_style)
+
+
+def export_resumes_zip(jobs, zip_file, executor, max_in_flight=None, progress=None):
+    """Render jobs on executor and write each PDF into zip_file as it completes
+
+    At most max_in_flight renders are outstanding, and each PDF is written
+    and dropped as soon as it arrives, so memory stays bounded no matter
+    how many resumes are exported. progress(done) is called after each
+    PDF. Returns the number of PDFs written.
+    """
+    max_in_flight = max_in_flight or 2 * (getattr(executor, '_max_workers', None) or 4)
+    jobs = iter(jobs)
+    pending = set()
+    done_count = 0
+    with zipfile.ZipFile(zip_file, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        while True:
+            for job in jobs:
+                pending.add(executor.submit(render_pdf_job, job))
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                filename, pdf_bytes = future.result()
+                archive.writestr(filename, pdf_bytes)
+                done_count += 1
+                if progress:
+                    progress(done_count)
+    return done_count
@@ -0,0 +1,333 @@
+"""PDF resume rendering with a registry of templates, each compiled once on first use
+
+ReportLab is imported lazily (it is the slowest import in the app), so
+listing templates and their labels stays cheap. The PDF lays out the
+AI-generated markdown when there is one (parsed once per text by
+markdown_pdf and shared by all templates) and the entered details otherwise.
+"""
+from collections.abc import Mapping
+from functools import lru_cache
+from io import BytesIO
+
+# Template definitions. 'label' is the name shown in the UI; every other key
+# is a style role mapping to ParagraphStyle keyword arguments, where colors
+# are hex strings or reportlab color names and alignment is a name. Roles not
+# given by a template fall back to DEFAULT_ROLES.
+DEFAULT_ROLES = {
+    'contact': {
+        'parent': 'Normal', 'fontSize': 10, 'textColor': '#6b7280',
+        'alignment': 'center', 'spaceAfter': 12,
+    },
+    'body': {
+        'parent': 'Normal', 'fontSize': 10, 'textColor': 'black',
+        'spaceAfter': 6, 'alignment': 'justify',
+    },
+    # Secondary lines (job dates, project technologies), derived from body
+    'muted': {'parent': 'body', 'textColor': '#6b7280', 'fontSize': 9},
+    # Markdown ### headings (job or project names) and list items
+    'subheading': {'parent': 'body', 'fontName': 'Helvetica-Bold', 'fontSize': 11, 'spaceBefore': 4, 'spaceAfter': 2,
+                   'alignment': 'left'},
+    'bullet': {'parent': 'body', 'leftIndent': 14, 'bulletIndent': 4, 'spaceAfter': 2, 'alignment': 'left'},
+}
+
+TEMPLATE_SPECS = {
+    'modern': {
+        'label': "🔵 Modern - Bold & Professional",
+        'title': {
+            'parent': 'Heading1', 'fontSize': 24, 'textColor': '#2563eb',
+            'spaceAfter': 6, 'alignment': 'center', 'fontName': 'Helvetica-Bold',
+        },
+        'heading': {
+            'parent': 'Heading2', 'fontSize': 14, 'textColor': '#1e40af',
+            'spaceAfter': 6, 'spaceBefore': 12, 'fontName': 'Helvetica-Bold',
+            'borderColor': '#2563eb', 'borderWidth': 2, 'borderPadding': 5,
+        },
+    },
+    'classic': {
+        'label': "⚫ Classic - Traditional & Formal",
+        'title': {
+            'parent': 'Heading1', 'fontSize': 22, 'textColor': 'black',
+            'spaceAfter': 6, 'alignment': 'center', 'fontName': 'Times-Bold',
+        },
+        'heading': {
+            'parent': 'Heading2', 'fontSize': 13, 'textColor': 'black',
+            'spaceAfter': 6, 'spaceBefore': 12, 'fontName': 'Times-Bold',
+            'borderColor': 'black', 'borderWidth': 1, 'borderPadding': 3,
+        },
+    },
+    'creative': {
+        'label': "🟣 Creative - Unique & Colorful",
+        'title': {
+            'parent': 'Heading1', 'fontSize': 26, 'textColor': '#7c3aed',
+            'spaceAfter': 6, 'alignment': 'center', 'fontName': 'Helvetica-Bold',
+        },
+        'heading': {
+            'parent': 'Heading2', 'fontSize': 14, 'textColor': '#7c3aed',
+            'spaceAfter': 6, 'spaceBefore': 12, 'fontName': 'Helvetica-Bold',
+            'borderColor': '#a78bfa', 'borderWidth': 2, 'borderPadding': 5,
+        },
+    },
+    'minimal': {
+        'label': "⚪ Minimal - Clean & Simple",
+        'title': {
+            'parent': 'Heading1', 'fontSize': 20, 'textColor': '#374151',
+            'spaceAfter': 6, 'alignment': 'left', 'fontName': 'Helvetica-Bold',
+        },
+        'heading': {
+            'parent': 'Heading2', 'fontSize': 12, 'textColor': '#374151',
+            'spaceAfter': 6, 'spaceBefore': 12, 'fontName': 'Helvetica-Bold',
+        },
+    },
+}
+
+DEFAULT_TEMPLATE = 'minimal'
+
+_COLOR_KEYS = ('textColor', 'borderColor', 'backColor')
+# Roles are compiled in this order so later roles can use earlier ones as parent
+_ROLE_ORDER = ('title', 'heading', 'contact', 'body', 'muted', 'subheading', 'bullet')
+
+
+@lru_cache(maxsize=None)
+def _sample_styles():
+    from reportlab.lib.styles import getSampleStyleSheet
+    return getSampleStyleSheet()
+
+
+def _to_color(value):
+    from reportlab.lib import colors
+    if value.startswith('#'):
+        return colors.HexColor(value)
+    return getattr(colors, value)
+
+
+def compile_template(name, spec, sample_styles=None):
+    """Compile a template spec into a dict of role -> ParagraphStyle"""
+    from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT
+    from reportlab.lib.styles import ParagraphStyle
+    alignments = {'left': TA_LEFT, 'center': TA_CENTER, 'justify': TA_JUSTIFY}
+    sample_styles = sample_styles or _sample_styles()
+    roles = dict(DEFAULT_ROLES)
+    roles.update(spec)
+    compiled = {}
+    for role in _ROLE_ORDER:
+        kwargs = dict(roles[role])
+        parent = kwargs.pop('parent')
+        kwargs['parent'] = compiled[parent] if parent in compiled else sample_styles[parent]
+        for key in _COLOR_KEYS:
+            if key in kwargs:
+                kwargs[key] = _to_color(kwargs[key])
+        if 'alignment' in kwargs:
+            kwargs['alignment'] = alignments[kwargs['alignment']]
+        compiled[role] = ParagraphStyle(f"{name}-{role}", **kwargs)
+    return compiled
+
+
+class _TemplateRegistry(Mapping):
+    """Template name -> compiled styles; keys come from TEMPLATE_SPECS, styles compile on first lookup"""
+
+    def __init__(self, specs):
+        self._specs = specs
+        self._compiled = {}
+
+    def __getitem__(self, name):
+        styles = self._compiled.get(name)
+        if styles is None:
+            styles = self._compiled[name] = compile_template(name, self._specs[name])
+        return styles
+
+    def __iter__(self):
+        return iter(self._specs)
+
+    def __len__(self):
+        return len(self._specs)
+
+    def invalidate(self, name):
+        self._compiled.pop(name, None)
+
+    def prime(self, name, styles):
+        self._compiled[name] = styles
+
+
+TEMPLATES = _TemplateRegistry(TEMPLATE_SPECS)
+
+
+def register_template(name, spec):
+    """Add (or replace) a template from a spec dict like those in TEMPLATE_SPECS
+
+    The spec is compiled here, so a missing role or an unknown parent,
+    alignment or color raises ValueError now rather than at the first render.
+    """
+    try:
+        styles = compile_template(name, spec)
+    except (KeyError, AttributeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid template spec {name!r}: {e!r}") from e
+    TEMPLATE_SPECS[name] = spec
+    TEMPLATES.invalidate(name)
+    TEMPLATES.prime(name, styles)
+
+
+def template_label(template_style):
+    """Display label for a template"""
+    return TEMPLATE_SPECS[template_style].get('label', template_style.title())
+
+
+def get_template(template_style):
+    """Look up compiled styles; unknown names fall back to the minimal template"""
+    return TEMPLATES[template_style if template_style in TEMPLATE_SPECS else DEFAULT_TEMPLATE]
+
+
+def create_professional_pdf(resume_data, generated_resume, template_style="modern"):
+    """Create a professional PDF resume"""
+    styles = get_template(template_style)
+    if generated_resume and generated_resume.strip() and not generated_resume.startswith("Error:"):
+        from markdown_pdf import markdown_blocks
+        return render_markdown_pdf(markdown_blocks(generated_resume), styles, resume_data)
+    return render_pdf(resume_data, styles)
+
+
+def render_markdown_pdf(blocks, styles, resume_data=None):
+    """Lay out parsed markdown Blocks with the given compiled template styles"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import HRFlowable, Paragraph, SimpleDocTemplate
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
+
+    elements = []
+    if not blocks or blocks[0].role != 'title':
+        # Models sometimes skip the name heading; keep the header the fields layout would have
+        name = ((resume_data or {}).get('basic_info') or {}).get('name')
+        if name:
+            from markdown_pdf import escape
+            elements.append(Paragraph(escape(name.upper()), styles['title']))
+    bullet_style = styles['bullet']
+    nested_styles = {}
+    for block in blocks:
+        if block.role == 'rule':
+            elements.append(HRFlowable(width='100%', thickness=0.5, color=styles['muted'].textColor,
+                                       spaceBefore=2, spaceAfter=6))
+        elif block.role == 'bullet':
+            style = bullet_style
+            if block.depth:
+                style = nested_styles.get(block.depth)
+                if style is None:
+                    from reportlab.lib.styles import ParagraphStyle
+                    indent = 14 * block.depth
+                    style = nested_styles[block.depth] = ParagraphStyle(
+                        f"{bullet_style.name}-{block.depth}", parent=bullet_style,
+                        leftIndent=bullet_style.leftIndent + indent, bulletIndent=bullet_style.bulletIndent + indent)
+            elements.append(Paragraph(block.markup, style, bulletText=block.bullet))
+        else:
+            elements.append(Paragraph(block.markup, styles[block.role]))
+
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+
+def render_pdf(resume_data, styles):
+    """Lay out resume_data with the given compiled template styles"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+    from markdown_pdf import escape
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
+
+    elements = []
+    title_style = styles['title']
+    heading_style = styles['heading']
+    contact_style = styles['contact']
+    body_style = styles['body']
+    muted_style = styles['muted']
+
+    # Get data
+    basic = resume_data.get('basic_info', {})
+    experiences = resume_data.get('experience', [])
+    education = resume_data.get('education', [])
+    projects = resume_data.get('projects', [])
+
+    # Header - Name
+    name = basic.get('name', 'Your Name')
+    elements.append(Paragraph(escape(name.upper()), title_style))
+
+    # Contact Information
+    contact_info = []
+    if basic.get('email'):
+        contact_info.append(basic['email'])
+    if basic.get('phone'):
+        contact_info.append(basic['phone'])
+    if basic.get('location'):
+        contact_info.append(basic['location'])
+    if basic.get('linkedin'):
+        contact_info.append(basic['linkedin'])
+
+    if contact_info:
+        elements.append(Paragraph(escape(' | '.join(contact_info)), contact_style))
+
+    elements.append(Spacer(1, 0.2*inch))
+
+    # Professional Summary
+    if basic.get('summary'):
+        elements.append(Paragraph("PROFESSIONAL SUMMARY", heading_style))
+        elements.append(Paragraph(escape(basic['summary']), body_style))
+        elements.append(Spacer(1, 0.15*inch))
+
+    # Skills
+    if basic.get('skills'):
+        elements.append(Paragraph("SKILLS", heading_style))
+        elements.append(Paragraph(escape(basic['skills']), body_style))
+        elements.append(Spacer(1, 0.15*inch))
+
+    # Work Experience
+    if experiences and any(exp.get('title') for exp in experiences):
+        elements.append(Paragraph("WORK EXPERIENCE", heading_style))
+
+        for exp in experiences:
+            if exp.get('title'):
+                job_header = f"<b>{escape(exp['title'])}</b> | {escape(exp.get('company', ''))}"
+                elements.append(Paragraph(job_header, body_style))
+
+                duration = escape(f"{exp.get('start', '')} - {exp.get('end', '')}")
+                elements.append(Paragraph(duration, muted_style))
+
+                if exp.get('responsibilities'):
+                    resp_lines = exp['responsibilities'].split('\n')
+                    for line in resp_lines:
+                        if line.strip():
+                            elements.append(Paragraph(f"• {escape(line.strip())}", body_style))
+
+                elements.append(Spacer(1, 0.1*inch))
+
+    # Education
+    if education and any(edu.get('degree') for edu in education):
+        elements.append(Paragraph("EDUCATION", heading_style))
+        for edu in education:
+            if edu.get('degree'):
+                edu_text = f"<b>{escape(edu['degree'])}</b> | " \
+                    + escape(f"{edu.get('institution', '')} | {edu.get('year', '')}")
+                elements.append(Paragraph(edu_text, body_style))
+                elements.append(Spacer(1, 0.05*inch))
+
+    # Projects
+    if projects and any(proj.get('name') for proj in projects):
+        elements.append(Paragraph("PROJECTS", heading_style))
+        for proj in projects:
+            if proj.get('name'):
+                proj_header = f"<b>{escape(proj['name'])}</b>"
+                elements.append(Paragraph(proj_header, body_style))
+
+                if proj.get('description'):
+                    elements.append(Paragraph(escape(proj['description']), body_style))
+
+                if proj.get('technologies'):
+                    elements.append(Paragraph(f"<i>Technologies: {escape(proj['technologies'])}</i>", muted_style))
+
+                elements.append(Spacer(1, 0.1*inch))
+
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
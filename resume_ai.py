@@ -0,0 +1,384 @@
+"""Resume generation with Gemini: prompt building, config and error handling"""
+import asyncio
+import itertools
+from contextlib import nullcontext
+from typing import NamedTuple
+
+from caching import generation_cache_key
+from gemini_client import ErrorKind, classify_error
+
+CHARS_PER_TOKEN = 4  # Gemini averages roughly 4 characters of English text per token
+DEFAULT_PROMPT_TOKEN_BUDGET = 6000
+TRIMMED_CHARS = 400  # responsibilities/descriptions are cut to this when over budget
+MIN_OUTPUT_TOKENS = 1024
+MAX_OUTPUT_TOKENS = 8192
+
+# Fixed for every request, so it is sent as the system instruction (served from a
+# context cache where possible) rather than repeated in each prompt
+SYSTEM_INSTRUCTION = """You are an expert resume writer. From the candidate details you are given, create a professional, ATS-friendly resume.
+
+Please create a well-structured, professional resume with:
+1. A compelling professional summary (if not provided, create one)
+2. Optimized work experience with achievement-focused bullet points
+3. Relevant skills section
+4. Clean formatting suitable for ATS systems
+5. Action verbs and quantifiable results
+
+Format in clean, readable markdown."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (no API round trip), rounded up"""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _truncate(text, limit):
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(' ', 1)[0].rstrip() + " …"
+
+
+class PromptPlan(NamedTuple):
+    prompt: str
+    input_tokens: int
+    max_output_tokens: int
+    trimmed: tuple  # labels of the entries shortened or dropped to fit the budget
+
+
+class _Entry:
+    """One trimmable piece of the prompt: full text, a shortened form, or nothing"""
+    __slots__ = ('label', 'forms', 'level')
+
+    def __init__(self, label, full, reduced):
+        self.label = label
+        self.forms = (full, reduced, '')
+        self.level = 0
+
+    @property
+    def text(self):
+        return self.forms[self.level]
+
+
+def plan_resume_prompt(resume_data: dict, token_budget=DEFAULT_PROMPT_TOKEN_BUDGET) -> PromptPlan:
+    """Build the prompt for Gemini within token_budget and size the output cap to it
+
+    When the estimated prompt exceeds the budget, projects (last first)
+    and older jobs are shortened to TRIMMED_CHARS, then dropped, and only
+    then are the most recent job, skills and summary shortened; those are
+    never dropped. max_output_tokens grows with the amount of content
+    actually sent.
+    """
+    basic = resume_data.get('basic_info', {})
+    experiences = [exp for exp in resume_data.get('experience', []) if exp.get('title')]
+    education = resume_data.get('education', [])
+    projects = [proj for proj in resume_data.get('projects', []) if proj.get('name')]
+
+    skills = str(basic.get('skills', 'N/A'))
+    summary = str(basic.get('summary', 'Generate a compelling 3-4 sentence professional summary'))
+    skills_entry = _Entry('skills', skills, _truncate(skills, TRIMMED_CHARS))
+    summary_entry = _Entry('summary', summary, _truncate(summary, TRIMMED_CHARS))
+
+    exp_entries = []
+    for exp in experiences:
+        head = f"\n\n{exp['title']} at {exp.get('company', 'N/A')}\n{exp.get('start', '')} - {exp.get('end', '')}\n"
+        responsibilities = str(exp.get('responsibilities', ''))
+        exp_entries.append(_Entry(f"experience: {exp['title']}", head + responsibilities,
+                                  head + _truncate(responsibilities, TRIMMED_CHARS)))
+
+    proj_entries = []
+    for proj in projects:
+        head = f"\n\n{proj['name']}\n"
+        tech = f"\nTechnologies: {proj.get('technologies', '')}"
+        description = str(proj.get('description', ''))
+        proj_entries.append(_Entry(f"project: {proj['name']}", head + description + tech,
+                                   head + _truncate(description, TRIMMED_CHARS) + tech))
+
+    education_text = "".join(
+        f"\n{edu['degree']}, {edu.get('institution', '')}, {edu.get('year', '')}"
+        for edu in education if edu.get('degree'))
+
+    def render():
+        parts = [f"""Candidate details:
+
+PERSONAL INFORMATION:
+Name: {basic.get('name', 'N/A')}
+Email: {basic.get('email', 'N/A')}
+Phone: {basic.get('phone', 'N/A')}
+Location: {basic.get('location', 'N/A')}
+LinkedIn: {basic.get('linkedin', 'N/A')}
+Target Job Title: {basic.get('job_title', 'N/A')}
+
+SKILLS:
+""", skills_entry.text, "\n\nPROFESSIONAL SUMMARY:\n", summary_entry.text, "\n\nWORK EXPERIENCE:"]
+        parts.extend(entry.text for entry in exp_entries)
+        parts.append("\n\nEDUCATION:")
+        parts.append(education_text)
+        kept_projects = [entry.text for entry in proj_entries if entry.text]
+        if kept_projects:
+            parts.append("\n\nPROJECTS:")
+            parts.extend(kept_projects)
+        return "".join(parts)
+
+    # Lowest priority first: shorten the optional entries, then drop them, and only then
+    # shorten the most recent job, skills and summary. The character total is kept
+    # incrementally instead of re-rendering after every step.
+    optional = proj_entries[::-1] + exp_entries[:0:-1]
+    essential = exp_entries[:1] + [skills_entry, summary_entry]
+    prompt = render()
+    total_chars = len(prompt)
+    budget_chars = token_budget * CHARS_PER_TOKEN if token_budget else None
+    trimmed = []
+    for entries, level in ((optional, 1), (optional, 2), (essential, 1)):
+        for entry in entries:
+            if budget_chars is None or total_chars <= budget_chars:
+                break
+            if entry.level >= level:
+                continue
+            before = len(entry.text)
+            entry.level = level
+            total_chars -= before - len(entry.text)
+            if entry.label not in trimmed:
+                trimmed.append(entry.label)
+    if trimmed:
+        prompt = render()
+
+    input_tokens = estimate_tokens(prompt)
+    # A rewritten resume runs about 1.5x its source content, plus a generated summary
+    max_output_tokens = max(MIN_OUTPUT_TOKENS, min(MAX_OUTPUT_TOKENS, 512 + input_tokens * 3 // 2))
+    return PromptPlan(prompt, input_tokens, max_output_tokens, tuple(trimmed))
+
+
+def build_resume_prompt(resume_data: dict, token_budget=DEFAULT_PROMPT_TOKEN_BUDGET) -> str:
+    """Build the prompt for Gemini"""
+    return plan_resume_prompt(resume_data, token_budget).prompt
+
+
+GEMINI_MODEL = 'gemini-2.0-flash-exp'  # Using Gemini 2.0 Flash (most recent available)
+INSTRUCTION_TOKENS = estimate_tokens(SYSTEM_INSTRUCTION)
+
+
+def build_generation_config(max_output_tokens=MAX_OUTPUT_TOKENS, system_instruction=None, cached_content=None):
+    """Build the GenerateContentConfig used for resume generation"""
+    from google.genai import types  # imported on first use: the SDK takes ~1s to load
+    return types.GenerateContentConfig(
+        system_instruction=system_instruction,
+        cached_content=cached_content,
+        temperature=0.7,
+        top_p=0.95,
+        top_k=40,
+        max_output_tokens=max_output_tokens,
+        safety_settings=[
+            types.SafetySetting(
+                category='HARM_CATEGORY_HATE_SPEECH',
+                threshold='BLOCK_NONE'
+            ),
+            types.SafetySetting(
+                category='HARM_CATEGORY_HARASSMENT',
+                threshold='BLOCK_NONE'
+            ),
+            types.SafetySetting(
+                category='HARM_CATEGORY_SEXUALLY_EXPLICIT',
+                threshold='BLOCK_NONE'
+            ),
+            types.SafetySetting(
+                category='HARM_CATEGORY_DANGEROUS_CONTENT',
+                threshold='BLOCK_NONE'
+            )
+        ]
+    )
+
+
+ERROR_MESSAGES = {
+    ErrorKind.INVALID_KEY: "Error: Invalid API key. Please verify your Gemini API key.",
+    ErrorKind.QUOTA: "Error: API quota exceeded. Please try again later.",
+    ErrorKind.FORBIDDEN: "Error: API access forbidden. Ensure Gemini API is enabled.",
+    ErrorKind.NOT_FOUND: "Error: Model not found. Please check if the model is available.",
+    ErrorKind.BLOCKED: "Error: Content was blocked by safety filters.",
+    ErrorKind.TIMEOUT: "Error: Request timed out. Please try again.",
+    ErrorKind.UNAVAILABLE: "Error: Gemini service unavailable. Please try again later.",
+    ErrorKind.CIRCUIT_OPEN: "Error: AI service is temporarily unavailable. Please try again in a minute.",
+}
+
+
+def classify_gemini_error(e: Exception) -> str:
+    """Map a Gemini exception to a user-facing error message"""
+    return ERROR_MESSAGES.get(classify_error(e), f"Error: {str(e)}")
+
+
+class GenerationError(Exception):
+    """Raised by stream_resume_with_gemini; str() is the classified error message"""
+
+
+def _generation_cache_key(prompt, config, cache):
+    if cache is None:
+        return None
+    # Keyed on the prompt actually sent, after trimming to the token budget
+    return generation_cache_key(prompt, GEMINI_MODEL, config.model_dump(mode='json', exclude_none=True))
+
+
+def _with_context_cache(config, context_cache):
+    """config with the system instruction swapped for a cached_content reference, if one is live"""
+    name = context_cache.cached_content() if context_cache else None
+    if not name:
+        return config, None
+    return config.model_copy(update={'system_instruction': None, 'cached_content': name}), name
+
+
+def _cache_missing(e, cached_name, context_cache):
+    """True (after dropping the cache) if a call failed because its context cache is gone"""
+    # Gemini answers 403 as well as 404 for a cache that has expired or been deleted
+    if cached_name and classify_error(e) in (ErrorKind.NOT_FOUND, ErrorKind.FORBIDDEN):
+        context_cache.invalidate(cached_name)
+        return True
+    return False
+
+
+def _record_usage(context_cache, response):
+    if context_cache is not None:
+        context_cache.record_usage(getattr(response, 'usage_metadata', None))
+
+
+def generate_resume_with_gemini(resume_data: dict, client, cache=None, use_cache=True,
+                                token_budget=DEFAULT_PROMPT_TOKEN_BUDGET, context_cache=None, admit=None) -> str:
+    """Generate resume using Gemini with new API
+
+    When a cache is given, identical inputs are served from it; pass
+    use_cache=False to force a fresh generation (the result still refreshes
+    the cache). With a ContextCache the system instruction is referenced
+    from Gemini's context cache instead of being sent with the request.
+    admit, if given, returns a context manager held around the Gemini call
+    (e.g. AdmissionController.admit bound to the user); cache hits skip it.
+    """
+    try:
+        if not client:
+            return "Error: Gemini client not initialized. Please configure your API key."
+        
+        # Build the prompt
+        plan = plan_resume_prompt(resume_data, token_budget)
+        config = build_generation_config(plan.max_output_tokens, system_instruction=SYSTEM_INSTRUCTION)
+        cache_key = _generation_cache_key(plan.prompt, config, cache)
+        if cache_key is not None and use_cache:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        # Generate content with new API
+        with admit() if admit else nullcontext():
+            request_config, cached_name = _with_context_cache(config, context_cache)
+            try:
+                response = client.models.generate_content(
+                    model=GEMINI_MODEL,
+                    contents=plan.prompt,
+                    config=request_config
+                )
+            except Exception as e:
+                if not _cache_missing(e, cached_name, context_cache):
+                    raise
+                response = client.models.generate_content(model=GEMINI_MODEL, contents=plan.prompt, config=config)
+        _record_usage(context_cache, response)
+        
+        # Extract text from response
+        if hasattr(response, 'text') and response.text:
+            if cache_key is not None:
+                cache.put(cache_key, response.text)
+            return response.text
+        else:
+            return "Error: No response generated. Content may have been filtered."
+        
+    except Exception as e:
+        return classify_gemini_error(e)
+
+
+def stream_resume_with_gemini(resume_data: dict, client, cache=None, use_cache=True,
+                              token_budget=DEFAULT_PROMPT_TOKEN_BUDGET, context_cache=None, admit=None):
+    """Generate resume using Gemini's streaming endpoint, yielding text chunks
+
+    Failures raise GenerationError with the same messages as
+    generate_resume_with_gemini. The cache is only filled once the stream
+    completes, so a cancelled or failed stream never caches partial text.
+    The admit context, if given, is held until the stream ends.
+    """
+    if not client:
+        raise GenerationError("Error: Gemini client not initialized. Please configure your API key.")
+    
+    plan = plan_resume_prompt(resume_data, token_budget)
+    config = build_generation_config(plan.max_output_tokens, system_instruction=SYSTEM_INSTRUCTION)
+    cache_key = _generation_cache_key(plan.prompt, config, cache)
+    if cache_key is not None and use_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    
+    chunks = []
+    stream = None
+    last_chunk = None
+    with admit() if admit else nullcontext():
+        request_config, cached_name = _with_context_cache(config, context_cache)
+        try:
+            try:
+                stream = iter(client.models.generate_content_stream(
+                    model=GEMINI_MODEL,
+                    contents=plan.prompt,
+                    config=request_config
+                ))
+                first = next(stream, None)
+            except Exception as e:
+                if not _cache_missing(e, cached_name, context_cache):
+                    raise
+                stream = iter(client.models.generate_content_stream(
+                    model=GEMINI_MODEL, contents=plan.prompt, config=config))
+                first = next(stream, None)
+            for chunk in itertools.chain([first] if first is not None else [], stream):
+                last_chunk = chunk
+                text = getattr(chunk, 'text', None)
+                if text:
+                    chunks.append(text)
+                    yield text
+        except Exception as e:
+            raise GenerationError(classify_gemini_error(e)) from e
+        finally:
+            # Release the HTTP stream if the consumer stopped early (e.g. a Streamlit rerun)
+            close = getattr(stream, 'close', None)
+            if close:
+                close()
+    
+    if not chunks:
+        raise GenerationError("Error: No response generated. Content may have been filtered.")
+    _record_usage(context_cache, last_chunk)  # usage totals arrive with the final chunk
+    if cache_key is not None:
+        cache.put(cache_key, "".join(chunks))
+
+
+async def agenerate_resume_with_gemini(resume_data: dict, client,
+                                       token_budget=DEFAULT_PROMPT_TOKEN_BUDGET, context_cache=None) -> str:
+    """Async variant of generate_resume_with_gemini using the client's aio API"""
+    try:
+        if not client:
+            return "Error: Gemini client not initialized. Please configure your API key."
+        
+        plan = plan_resume_prompt(resume_data, token_budget)
+        config = build_generation_config(plan.max_output_tokens, system_instruction=SYSTEM_INSTRUCTION)
+        # Creating the context cache is a blocking call, made at most once per TTL
+        request_config, cached_name = await asyncio.to_thread(_with_context_cache, config, context_cache) \
+            if context_cache else (config, None)
+        try:
+            response = await client.aio.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=plan.prompt,
+                config=request_config
+            )
+        except Exception as e:
+            if not _cache_missing(e, cached_name, context_cache):
+                raise
+            response = await client.aio.models.generate_content(
+                model=GEMINI_MODEL, contents=plan.prompt, config=config)
+        _record_usage(context_cache, response)
+        
+        if hasattr(response, 'text') and response.text:
+            return response.text
+        else:
+            return "Error: No response generated. Content may have been filtered."
+        
+    except Exception as e:
+        return classify_gemini_error(e)
@@ -0,0 +1,141 @@
+"""Typed resume model: immutable, slotted dataclasses for the details entered in the tabs
+
+The app keeps a Resume in session state instead of the nested resume_data
+dict. Instances are never mutated (a save builds a new one with
+dataclasses.replace), so the snapshot taken at generation time can share
+it instead of deep-copying, equality is a tuple comparison and the
+canonical hash is computed once per instance. to_dict() and from_dict()
+convert to and from the resume_data shape stored in Firestore and taken
+by the prompt, PDF and storage helpers.
+"""
+import re
+from dataclasses import dataclass, field
+
+from caching import canonical_hash
+
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+class _Entry:
+    """Shared behaviour of the all-text entry dataclasses (fields listed in __match_args__)"""
+    __slots__ = ()
+
+    def __post_init__(self):
+        for name in self.__match_args__:
+            if not isinstance(getattr(self, name), str):
+                raise TypeError(f"{type(self).__name__}.{name} must be a string, "
+                                f"got {type(getattr(self, name)).__name__}")
+
+    def is_blank(self):
+        return not any(getattr(self, name) for name in self.__match_args__)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__match_args__}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build from a dict; missing or None values become '' and other values are str()-ed"""
+        data = data or {}
+        return cls(*('' if data.get(name) is None else str(data[name]) for name in cls.__match_args__))
+
+
+@dataclass(frozen=True, slots=True)
+class BasicInfo(_Entry):
+    name: str = ''
+    email: str = ''
+    phone: str = ''
+    location: str = ''
+    linkedin: str = ''
+    job_title: str = ''
+    skills: str = ''
+    summary: str = ''
+
+    # Fields marked * in the Basic Info tab
+    REQUIRED = ('name', 'email', 'phone', 'skills')
+
+    def problems(self) -> list:
+        """Human-readable issues with these details (missing required fields, malformed email)"""
+        missing = [f.replace('_', ' ').title() for f in self.REQUIRED if not getattr(self, f).strip()]
+        issues = [f"Missing required fields: {', '.join(missing)}"] if missing else []
+        if self.email.strip() and not _EMAIL.match(self.email.strip()):
+            issues.append(f"'{self.email.strip()}' doesn't look like an email address")
+        return issues
+
+
+@dataclass(frozen=True, slots=True)
+class Experience(_Entry):
+    title: str = ''
+    company: str = ''
+    start: str = ''
+    end: str = ''
+    responsibilities: str = ''
+
+
+@dataclass(frozen=True, slots=True)
+class Education(_Entry):
+    degree: str = ''
+    institution: str = ''
+    year: str = ''
+
+
+@dataclass(frozen=True, slots=True)
+class Project(_Entry):
+    name: str = ''
+    description: str = ''
+    technologies: str = ''
+
+
+_SECTIONS = (('experience', Experience), ('education', Education), ('projects', Project))
+
+
+@dataclass(frozen=True, slots=True)
+class Resume:
+    """Everything entered in the tabs; basic_info is None until the Basic Info tab is saved
+
+    Entry lists are stored as tuples with entries left completely blank in
+    the form dropped.
+    """
+    basic_info: BasicInfo = None
+    experience: tuple = ()
+    education: tuple = ()
+    projects: tuple = ()
+    _hash: str = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.basic_info is not None and not isinstance(self.basic_info, BasicInfo):
+            raise TypeError(f"Resume.basic_info must be BasicInfo, got {type(self.basic_info).__name__}")
+        for section, entry_type in _SECTIONS:
+            entries = getattr(self, section)
+            for entry in entries:
+                if not isinstance(entry, entry_type):
+                    raise TypeError(f"Resume.{section} entries must be {entry_type.__name__}, "
+                                    f"got {type(entry).__name__}")
+            object.__setattr__(self, section, tuple(entry for entry in entries if not entry.is_blank()))
+
+    @classmethod
+    def from_dict(cls, resume_data):
+        """Build a Resume from a resume_data dict (e.g. a Firestore document's 'resume_data')"""
+        resume_data = resume_data or {}
+        basic = resume_data.get('basic_info')
+        return cls(
+            basic_info=BasicInfo.from_dict(basic) if basic else None,
+            **{section: tuple(entry_type.from_dict(entry) for entry in resume_data.get(section) or ())
+               for section, entry_type in _SECTIONS}
+        )
+
+    def to_dict(self) -> dict:
+        """The resume_data dict; sections that were never filled in are left out"""
+        data = {}
+        if self.basic_info is not None:
+            data['basic_info'] = self.basic_info.to_dict()
+        for section, _ in _SECTIONS:
+            entries = getattr(self, section)
+            if entries:
+                data[section] = [entry.to_dict() for entry in entries]
+        return data
+
+    def canonical_hash(self) -> str:
+        """Stable hash of the content, equal to caching.canonical_hash(self.to_dict())"""
+        if self._hash is None:
+            object.__setattr__(self, '_hash', canonical_hash(self.to_dict()))
+        return self._hash
@@ -0,0 +1,257 @@
+"""Addressable sections of a generated resume and incremental section regeneration
+
+The generated markdown is split at its section headings into keyed
+blocks: 'header' (name and contact lines), 'summary', 'skills',
+'experience' (with one 'experience:<i>' block per job when the jobs can be
+matched to resume_data), 'education', 'projects' and 'other:<n>'. Joining
+the block texts gives back the original markdown exactly, so a changed
+section can be re-prompted on its own and spliced in place.
+"""
+import re
+from contextlib import nullcontext
+from typing import NamedTuple
+
+from caching import normalize_resume_data
+from resume_ai import (GEMINI_MODEL, MAX_OUTPUT_TOKENS, GenerationError, build_generation_config,
+                       classify_gemini_error, estimate_tokens)
+
+SECTION_KEYWORDS = (
+    ('summary', ('summary', 'profile', 'objective', 'about')),
+    ('experience', ('experience', 'employment', 'work history')),
+    ('education', ('education', 'academic')),
+    ('projects', ('project',)),
+    ('skills', ('skill', 'competenc', 'technolog')),
+)
+CONTACT_FIELDS = ('name', 'email', 'phone', 'location', 'linkedin')
+
+_HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_BOLD_LINE = re.compile(r'^\*\*(.+?)\*\*')
+
+
+class Section(NamedTuple):
+    key: str
+    text: str
+
+
+class SectionUpdate(NamedTuple):
+    markdown: str
+    sections: tuple  # keys that were regenerated
+    output_tokens: int  # estimated tokens generated for them
+    full_output_tokens: int  # estimated tokens of the whole resume
+
+
+def _classify(title):
+    lowered = title.lower()
+    for key, keywords in SECTION_KEYWORDS:
+        if any(word in lowered for word in keywords):
+            return key
+    return None
+
+
+def _experience_entries(resume_data):
+    return normalize_resume_data(resume_data).get('experience', [])
+
+
+def split_sections(markdown: str, resume_data: dict) -> list:
+    """Split generated markdown into keyed Sections; ''.join(texts) == markdown"""
+    lines = markdown.splitlines(keepends=True)
+    headings = [(i, len(m.group(1)), m.group(2)) for i, m in
+                ((i, _HEADING.match(line)) for i, line in enumerate(lines)) if m]
+    classified = [(i, level) for i, level, title in headings if _classify(title)]
+    if not classified:
+        return [Section('header', markdown)]
+    section_level = min(level for _, level in classified)
+    first = min(i for i, level in classified if level == section_level)
+
+    # Everything before the first recognised section (name heading, contact line) is the
+    # header; after it, every heading at the section level or above starts a new block
+    starts = {i: title for i, level, title in headings if level <= section_level and i >= first}
+    blocks, current, seen = [], ['header', []], set()
+    for i, line in enumerate(lines):
+        if i in starts:
+            if current[1]:
+                blocks.append(current)
+            key = _classify(starts[i])
+            if key is None or key in seen:
+                key = f'other:{len(blocks)}'
+            seen.add(key)
+            current = [key, []]
+        current[1].append(line)
+    blocks.append(current)
+
+    sections = []
+    for key, block_lines in blocks:
+        if key == 'experience':
+            sections.extend(_split_jobs(block_lines, section_level, _experience_entries(resume_data)))
+        else:
+            sections.append(Section(key, ''.join(block_lines)))
+    return sections
+
+
+def _split_jobs(block_lines, section_level, experiences):
+    """Split the experience block into one Section per job, if the jobs line up with resume_data"""
+    whole = [Section('experience', ''.join(block_lines))]
+    sub_headings = [i for i, line in enumerate(block_lines[1:], 1)
+                    if (m := _HEADING.match(line)) and len(m.group(1)) > section_level]
+    starts = sub_headings or [i for i, line in enumerate(block_lines[1:], 1) if _BOLD_LINE.match(line)]
+    if not experiences or len(starts) != len(experiences):
+        return whole
+    for start, exp in zip(starts, experiences):
+        if exp['title'].lower() not in block_lines[start].lower():
+            return whole
+    sections = [Section('experience', ''.join(block_lines[:starts[0]]))]
+    for n, (start, end) in enumerate(zip(starts, starts[1:] + [len(block_lines)])):
+        sections.append(Section(f'experience:{n}', ''.join(block_lines[start:end])))
+    return sections
+
+
+def section_label(key: str) -> str:
+    """Human-readable name for a section key ('experience:1' -> 'Experience #2')"""
+    if key == 'header':
+        return 'Contact details'
+    name, _, index = key.partition(':')
+    return f"{name.title()} #{int(index) + 1}" if index and name == 'experience' else name.title()
+
+
+def changed_sections(old_data: dict, new_data: dict):
+    """Section keys affected by the edit from old_data to new_data; None if everything is"""
+    old, new = normalize_resume_data(old_data), normalize_resume_data(new_data)
+    if old == new:
+        return set()
+    old_basic, new_basic = old.get('basic_info', {}), new.get('basic_info', {})
+    # Retargeting the resume (or any field we can't place) changes every section
+    if old_basic.get('job_title') != new_basic.get('job_title'):
+        return None
+    known = set(CONTACT_FIELDS) | {'job_title', 'summary', 'skills'}
+    if {k for k in old_basic.keys() | new_basic.keys() if old_basic.get(k) != new_basic.get(k)} - known:
+        return None
+    if {k for k in old.keys() | new.keys() if old.get(k) != new.get(k)} - \
+            {'basic_info', 'experience', 'education', 'projects'}:
+        return None
+
+    changed = set()
+    if any(old_basic.get(f) != new_basic.get(f) for f in CONTACT_FIELDS):
+        changed.add('header')
+    for field in ('summary', 'skills'):
+        if old_basic.get(field) != new_basic.get(field):
+            changed.add(field)
+    old_jobs, new_jobs = old.get('experience', []), new.get('experience', [])
+    if len(old_jobs) != len(new_jobs):
+        changed.add('experience')
+    else:
+        changed.update(f'experience:{i}' for i, (a, b) in enumerate(zip(old_jobs, new_jobs)) if a != b)
+    for section in ('education', 'projects'):
+        if old.get(section, []) != new.get(section, []):
+            changed.add(section)
+    return changed
+
+
+def plan_section_update(sections: list, old_data: dict, new_data: dict):
+    """Keys of the sections to regenerate, in document order; None when a full regeneration is needed"""
+    changed = changed_sections(old_data, new_data)
+    if changed is None:
+        return None
+    available = {section.key for section in sections}
+    targets = set()
+    for key in changed:
+        if key in available:
+            targets.add(key)
+        elif key.startswith('experience') and 'experience' in available:
+            targets.add('experience')
+        else:
+            return None  # the generated text has no section we could replace
+    if 'experience' in targets:
+        targets = {key for key in targets if not key.startswith('experience:')}
+    return [section.key for section in sections if section.key in targets]
+
+
+def _section_details(key, resume_data):
+    data = normalize_resume_data(resume_data)
+    basic = data.get('basic_info', {})
+    jobs = data.get('experience', [])
+
+    def job(exp):
+        return (f"{exp['title']} at {exp.get('company', 'N/A')}\n{exp.get('start', '')} - {exp.get('end', '')}\n"
+                f"{exp.get('responsibilities', '')}")
+
+    if key == 'header':
+        return "\n".join(f"{field.title()}: {basic.get(field, 'N/A')}" for field in CONTACT_FIELDS)
+    if key == 'summary':
+        recent = ", ".join(exp['title'] for exp in jobs[:3]) or 'N/A'
+        return (f"Summary provided: {basic.get('summary') or 'none, write a compelling 3-4 sentence summary'}\n"
+                f"Skills: {basic.get('skills', 'N/A')}\nRecent roles: {recent}")
+    if key == 'skills':
+        return f"Skills: {basic.get('skills', 'N/A')}"
+    if key.startswith('experience:'):
+        return job(jobs[int(key.split(':', 1)[1])])
+    if key == 'experience':
+        return "\n\n".join(job(exp) for exp in jobs)
+    if key == 'education':
+        return "\n".join(f"{edu['degree']}, {edu.get('institution', '')}, {edu.get('year', '')}"
+                         for edu in data.get('education', []))
+    if key == 'projects':
+        return "\n\n".join(f"{proj['name']}\n{proj.get('description', '')}\n"
+                           f"Technologies: {proj.get('technologies', '')}" for proj in data.get('projects', []))
+    raise KeyError(key)
+
+
+def build_section_prompt(key: str, current_text: str, resume_data: dict) -> str:
+    """Prompt asking Gemini to rewrite one section from its updated details"""
+    basic = resume_data.get('basic_info', {})
+    return "".join([
+        "You are updating one section of an existing professional, ATS-friendly markdown resume",
+        f" for {basic.get('name', 'the candidate')}, target job title: {basic.get('job_title', 'N/A')}.",
+        "\n\nCURRENT SECTION:\n", current_text.strip(),
+        "\n\nUPDATED DETAILS:\n", _section_details(key, resume_data),
+        "\n\nRewrite this section from the updated details. Keep the same heading text and level,",
+        " the same markdown style, achievement-focused bullet points with action verbs and",
+        " quantifiable results. Return only the markdown for this section.",
+    ])
+
+
+def _clean_section(text, old_text):
+    text = text.strip()
+    fence = re.match(r'^```[a-z]*\n(.*)\n```$', text, re.S)
+    if fence:
+        text = fence.group(1).strip()
+    # Keep the blank lines that separated the old block from the next one
+    return text + old_text[len(old_text.rstrip()):]
+
+
+def regenerate_sections(sections: list, targets: list, resume_data: dict, client, admit=None) -> SectionUpdate:
+    """Re-prompt only the target sections and splice them into the resume
+
+    Raises GenerationError with the usual classified messages on failure.
+    admit works as in generate_resume_with_gemini, once per section call.
+    """
+    if not client:
+        raise GenerationError("Error: Gemini client not initialized. Please configure your API key.")
+    replacements, output_tokens = {}, 0
+    for key in targets:
+        # 'experience' replaces the whole section, including any per-job blocks
+        old_text = ''.join(s.text for s in sections
+                           if s.key == key or (key == 'experience' and s.key.startswith('experience:')))
+        config = build_generation_config(max(512, min(MAX_OUTPUT_TOKENS, 256 + 2 * estimate_tokens(old_text))))
+        with admit() if admit else nullcontext():
+            try:
+                response = client.models.generate_content(
+                    model=GEMINI_MODEL,
+                    contents=build_section_prompt(key, old_text, resume_data),
+                    config=config
+                )
+            except Exception as e:
+                raise GenerationError(classify_gemini_error(e)) from e
+        text = getattr(response, 'text', None)
+        if not text:
+            raise GenerationError("Error: No response generated. Content may have been filtered.")
+        replacements[key] = _clean_section(text, old_text)
+        output_tokens += estimate_tokens(text)
+
+    parts = []
+    for section in sections:
+        if section.key in replacements:
+            parts.append(replacements[section.key])
+        elif not ('experience' in replacements and section.key.startswith('experience:')):
+            parts.append(section.text)
+    markdown = ''.join(parts)
+    return SectionUpdate(markdown, tuple(targets), output_tokens, estimate_tokens(markdown))
@@ -0,0 +1,222 @@
+"""Content-addressed, compressed storage for saved resume versions
+
+A version document in `resumes` holds only metadata and references:
+
+    user_email, name, created_at, parent_id,
+    resume_data_ref   -> blob id of the canonical resume_data JSON
+    generated_ref     -> blob id of a representation of generated_resume
+    generated_hash    -> content hash of generated_resume
+    storage_version   = 2
+
+Blobs in `resume_blobs` are immutable. Their id is derived from their
+content, so identical resume_data or generated text is written once and
+shared by every version that references it. Generated text is stored
+either whole (blob id = content hash) or as a line delta against the
+parent version's representation (blob id = hash of content hash + base
+id). Delta chains are capped at MAX_CHAIN so reads stay bounded.
+Every blob write stamps written_at with the commit time. A saver skips
+rewriting a blob only for WRITTEN_TTL after it committed it, so the blob
+sweep in retention.py leaves any blob written more recently than that
+(plus a margin) alone.
+Documents written before storage_version 2 still carry resume_data and
+generated_resume inline and are read as-is until migrate_resumes.py
+converts them.
+"""
+import difflib
+import json
+import zlib
+
+from caching import LRUCache, canonical_hash
+from storage import SERVER_TIMESTAMP
+
+STORAGE_VERSION = 2
+MAX_CHAIN = 8
+WRITTEN_TTL = 3600  # seconds a committed blob is trusted to still exist without rewriting it
+COMPRESS_THRESHOLD = 512  # bytes; smaller payloads are stored uncompressed
+
+
+def encode_payload(raw: bytes) -> dict:
+    if len(raw) >= COMPRESS_THRESHOLD:
+        compressed = zlib.compress(raw, 9)
+        if len(compressed) < len(raw):
+            return {'encoding': 'zlib', 'data': compressed}
+    return {'encoding': 'raw', 'data': raw}
+
+
+def decode_payload(blob: dict) -> bytes:
+    data = bytes(blob['data'])
+    return zlib.decompress(data) if blob.get('encoding') == 'zlib' else data
+
+
+def make_delta(base: str, new: str) -> list:
+    """Line delta turning base into new: ["c", i1, i2] copies base lines, ["i", text] inserts"""
+    base_lines = base.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, base_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(['c', i1, i2])
+        elif j2 > j1:  # replace or insert; deletes simply aren't copied
+            ops.append(['i', ''.join(new_lines[j1:j2])])
+    return ops
+
+
+def apply_delta(base: str, ops: list) -> str:
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if op[0] == 'c':
+            parts.extend(base_lines[op[1]:op[2]])
+        else:
+            parts.append(op[1])
+    return ''.join(parts)
+
+
+class ResumeStore:
+    """Builds and resolves content-addressed resume versions in a storage backend (storage.py)"""
+
+    def __init__(self, storage, collection='resumes', blob_collection='resume_blobs',
+                 max_chain=MAX_CHAIN):
+        self.storage = storage
+        self.collection = collection
+        self.blob_collection = blob_collection
+        self.max_chain = max_chain
+        self._resume_data = LRUCache(max_entries=512)  # blob id -> resume_data
+        self._generated = LRUCache(max_entries=512)  # blob id -> (text, chain depth)
+        self._written = LRUCache(max_entries=4096, ttl=WRITTEN_TTL)  # blob ids committed recently
+        self.blob_reads = 0
+
+    def build_version(self, user_email, resume_data, generated_resume, parent=None,
+                      require_committed_base=True):
+        """Build the version document and the blob writes for a new save
+
+        parent is the version_info of the version this one was derived from
+        (the last one saved or loaded in the session), or None. Returns
+        (version_doc, blob_writes, version_info), where blob_writes is a list
+        of (collection, doc_id, data) tuples and version_info is the parent
+        to pass to the next save. Nothing is read from storage.
+
+        A delta is only taken against a parent blob known to be committed,
+        so a failed parent save can't leave a dangling base; callers that
+        commit parent and child atomically may pass require_committed_base=False.
+        """
+        blob_writes = []
+
+        resume_json = json.dumps(resume_data, sort_keys=True, separators=(',', ':'),
+                                 ensure_ascii=False).encode('utf-8')
+        resume_data_ref = canonical_hash(resume_data)
+        self._add_blob(blob_writes, resume_data_ref, dict(encode_payload(resume_json), kind='resume_data'))
+
+        generated_hash = canonical_hash(generated_resume)
+        # The parent's representation is reused only under the same rule as a delta base:
+        # the parent may have been deleted and its blobs swept since it was saved or loaded
+        if parent and parent['generated_hash'] == generated_hash \
+                and (not require_committed_base or self._committed(parent['generated_ref'])):
+            generated_ref, depth = parent['generated_ref'], parent['depth']
+        else:
+            generated_ref, depth = generated_hash, 0
+            full = encode_payload(generated_resume.encode('utf-8'))
+            blob = dict(full, kind='generated', content_hash=generated_hash, base=None, depth=0)
+            base_ok = parent and parent.get('generated_resume') and parent['depth'] < self.max_chain \
+                and (not require_committed_base or self._committed(parent['generated_ref']))
+            if base_ok:
+                ops = make_delta(parent['generated_resume'], generated_resume)
+                delta = encode_payload(json.dumps(ops, separators=(',', ':')).encode('utf-8'))
+                # Deltas only pay off when much smaller than the full (compressed) text
+                if len(delta['data']) < len(full['data']) // 2:
+                    depth = parent['depth'] + 1
+                    generated_ref = canonical_hash([generated_hash, parent['generated_ref']])
+                    blob = dict(delta, kind='generated_delta', content_hash=generated_hash,
+                                base=parent['generated_ref'], depth=depth)
+            self._add_blob(blob_writes, generated_ref, blob)
+        self._generated.put(generated_ref, (generated_resume, depth))
+
+        version_doc = {
+            'user_email': user_email,
+            'name': resume_data.get('basic_info', {}).get('name', ''),
+            'parent_id': parent['id'] if parent else None,
+            'resume_data_ref': resume_data_ref,
+            'generated_ref': generated_ref,
+            'generated_hash': generated_hash,
+            'storage_version': STORAGE_VERSION,
+        }
+        version_info = {
+            'id': None, 'generated_ref': generated_ref, 'generated_hash': generated_hash,
+            'depth': depth, 'generated_resume': generated_resume,
+        }
+        return version_doc, blob_writes, version_info
+
+    def _committed(self, blob_id):
+        return self._written.get(blob_id) is not None
+
+    def _add_blob(self, blob_writes, blob_id, blob):
+        # Blobs are immutable, so one committed recently needs no rewriting
+        if not self._committed(blob_id):
+            blob_writes.append((self.blob_collection, blob_id, dict(blob, written_at=SERVER_TIMESTAMP)))
+
+    def mark_written(self, blob_writes):
+        """Record blobs whose commit succeeded so later saves can skip them"""
+        for _, blob_id, _ in blob_writes:
+            self._written.put(blob_id, True)
+
+    def forget(self, blob_ids):
+        """Stop treating deleted blobs as committed, so later saves write them again"""
+        for blob_id in blob_ids:
+            self._written.pop(blob_id)
+
+    def resolve(self, doc: dict) -> dict:
+        """Return doc with resume_data and generated_resume filled in from blobs"""
+        if doc.get('storage_version') != STORAGE_VERSION:
+            return doc
+        resolved = dict(doc)
+        resolved['resume_data'] = self._read_resume_data(doc['resume_data_ref'])
+        resolved['generated_resume'], resolved['generated_depth'] = \
+            self._read_generated(doc['generated_ref'])
+        return resolved
+
+    def version_info(self, resolved: dict) -> dict:
+        """Parent info for the next save, from a resolved version document"""
+        if resolved.get('storage_version') != STORAGE_VERSION:
+            return None
+        return {
+            'id': resolved['id'], 'generated_ref': resolved['generated_ref'],
+            'generated_hash': resolved['generated_hash'], 'depth': resolved['generated_depth'],
+            'generated_resume': resolved['generated_resume'],
+        }
+
+    def _get_blob(self, blob_id):
+        self.blob_reads += 1
+        blob = self.storage.get(self.blob_collection, blob_id)
+        if blob is None:
+            raise KeyError(f"Missing resume blob {blob_id}")
+        return blob
+
+    def _read_resume_data(self, blob_id):
+        value = self._resume_data.get(blob_id)
+        if value is None:
+            value = json.loads(decode_payload(self._get_blob(blob_id)).decode('utf-8'))
+            self._resume_data.put(blob_id, value)
+        return json.loads(json.dumps(value))  # callers may mutate their copy
+
+    def _read_generated(self, blob_id):
+        # Walk the delta chain down to a full snapshot or a cached text, then replay it
+        chain = []
+        current = blob_id
+        cached = self._generated.get(current)
+        while cached is None:
+            # Not marked written: a blob read may be old enough for the sweep to remove
+            blob = self._get_blob(current)
+            if blob.get('base') is None:
+                cached = (decode_payload(blob).decode('utf-8'), 0)
+                self._generated.put(current, cached)
+                break
+            chain.append((current, blob))
+            current = blob['base']
+            cached = self._generated.get(current)
+        text, depth = cached
+        for rep_id, blob in reversed(chain):
+            text = apply_delta(text, json.loads(decode_payload(blob).decode('utf-8')))
+            depth = blob['depth']
+            self._generated.put(rep_id, (text, depth))
+        return text, depth
@@ -0,0 +1,304 @@
+"""Retention and bulk deletion of saved resume versions, in bounded batches off the request path
+
+purge_versions() deletes a user's saved versions older than the `keep`
+newest (keep=0 deletes all of them). It lists the matching ids through the
+history index, newest first, then deletes them in atomic chunks of
+chunk_size, reporting progress after each chunk; with dry_run it only
+counts. The content-addressed blobs in resume_blobs may be shared between
+versions (and users), so sweep_blobs() removes them separately: it marks
+every blob a remaining version references, following delta bases, and
+deletes the rest that were last written more than `grace` seconds ago.
+RetentionWorker runs purges, and a sweep at most once per sweep_interval
+after them, on a background thread for the app. From the command line it
+applies a retention policy to every user, then sweeps:
+
+    python retention.py --keep 20 --dry-run
+    python retention.py --keep 20 --storage sqlite --sqlite-path cvready.db
+    python retention.py --keep 0 --user someone@example.com
+"""
+import argparse
+import datetime
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from caching import LRUCache
+from resume_store import WRITTEN_TTL
+from storage import RESUME_COLLECTION
+
+BLOB_COLLECTION = 'resume_blobs'
+MAX_CHUNK = 500  # Firestore's limit on writes per batch
+# A saver may skip rewriting a blob for WRITTEN_TTL after committing it, and
+# its queued save may commit a little later still
+MIN_SWEEP_GRACE = 2 * WRITTEN_TTL
+
+
+class PurgeResult(NamedTuple):
+    matched: int
+    deleted: int
+
+
+class SweepResult(NamedTuple):
+    scanned: int
+    unreachable: int
+    deleted: int
+
+
+def versions_to_purge(storage, user_email, keep=0, page_size=500):
+    """Ids of user_email's saved versions older than the keep newest, newest first"""
+    cursor = None
+    if keep:
+        newest = storage.list_resumes(user_email, limit=keep, summary=True)
+        if len(newest) < keep:
+            return []
+        cursor = (newest[-1][1]['created_at'], newest[-1][0])
+    ids = []
+    while True:
+        page = storage.list_resumes(user_email, start_after=cursor, limit=page_size, summary=True)
+        ids.extend(doc_id for doc_id, _ in page)
+        if len(page) < page_size:
+            return ids
+        cursor = (page[-1][1]['created_at'], page[-1][0])
+
+
+def purge_versions(storage, user_email, keep=0, chunk_size=100, dry_run=False, progress=None):
+    """Delete user_email's versions older than the keep newest, chunk by chunk; returns a PurgeResult
+
+    progress(deleted, matched) is called once the matching versions are
+    listed and again after each chunk is committed.
+    """
+    ids = versions_to_purge(storage, user_email, keep)
+    chunk_size = max(1, min(chunk_size, MAX_CHUNK))
+    deleted = 0
+    if progress:
+        progress(0, len(ids))
+    if not dry_run:
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            storage.delete_many([(RESUME_COLLECTION, doc_id) for doc_id in chunk])
+            deleted += len(chunk)
+            if progress:
+                progress(deleted, len(ids))
+    return PurgeResult(len(ids), deleted)
+
+
+def reachable_blobs(storage, bases):
+    """Ids of the blobs referenced by any saved version, following the delta bases in bases (blob id -> base)"""
+    pending = []
+    for _, doc in storage.list_documents(RESUME_COLLECTION, ['resume_data_ref', 'generated_ref']):
+        pending.extend(ref for ref in (doc.get('resume_data_ref'), doc.get('generated_ref')) if ref)
+    marked = set()
+    while pending:
+        blob_id = pending.pop()
+        if blob_id not in marked:
+            marked.add(blob_id)
+            if bases.get(blob_id):
+                pending.append(bases[blob_id])
+    return marked
+
+
+def sweep_blobs(storage, chunk_size=100, dry_run=False, progress=None, grace=86400.0, forget=None):
+    """Delete the resume blobs no saved version references, chunk by chunk; returns a SweepResult
+
+    Only blobs last written more than grace seconds ago (at least
+    MIN_SWEEP_GRACE) are deleted: a save in flight, in this process or
+    another, may reference a newer one without rewriting it. Blobs without
+    written_at predate the stamp and count as old. progress(deleted,
+    unreachable) is called once the blobs are marked and again after each
+    chunk is committed; forget(blob_ids) after each chunk.
+    """
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - \
+        datetime.timedelta(seconds=max(grace, MIN_SWEEP_GRACE))
+    blobs = dict(storage.list_documents(BLOB_COLLECTION, ['base', 'written_at']))
+    bases = {blob_id: blob.get('base') for blob_id, blob in blobs.items()}
+    ids = sorted(blob_id for blob_id in set(blobs) - reachable_blobs(storage, bases)
+                 if blobs[blob_id].get('written_at') is None or blobs[blob_id]['written_at'] < cutoff)
+    chunk_size = max(1, min(chunk_size, MAX_CHUNK))
+    deleted = 0
+    if progress:
+        progress(0, len(ids))
+    if not dry_run:
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            storage.delete_many([(BLOB_COLLECTION, blob_id) for blob_id in chunk])
+            deleted += len(chunk)
+            if forget:
+                forget(chunk)
+            if progress:
+                progress(deleted, len(ids))
+    return SweepResult(len(blobs), len(ids), deleted)
+
+
+class PurgeJob:
+    """A queued purge; the worker thread updates matched, deleted, error and finished as it runs"""
+
+    def __init__(self, user_email, keep=0, dry_run=False):
+        self.user_email = user_email
+        self.keep = keep
+        self.dry_run = dry_run
+        self.matched = None  # versions to delete, once listed
+        self.deleted = 0
+        self.error = None
+        self.finished = False
+
+    def _progress(self, deleted, matched):
+        self.deleted, self.matched = deleted, matched
+
+
+class RetentionWorker:
+    """Runs purges one at a time on a background thread
+
+    submit() queues a purge and returns its PurgeJob; an identical purge
+    still waiting to start is returned instead of queueing another.
+    enforce(user_email) applies the keep-newest-`keep` policy at most once
+    per interval seconds per user, so frequent saves don't each pay for a
+    listing. on_purged(user_email) is called after a purge deleted anything,
+    before its job is marked finished.
+
+    A sweep reads every version and blob, so it isn't run per purge: once a
+    purge has deleted versions, one is scheduled on the same thread, at
+    least sweep_interval seconds after the previous one (0 never sweeps,
+    leaving it to the command line). sweep_grace and forget_blobs are passed
+    to sweep_blobs as grace and forget.
+    """
+
+    def __init__(self, storage, keep=0, interval=3600.0, chunk_size=100, on_purged=None,
+                 sweep_interval=86400.0, sweep_grace=86400.0, forget_blobs=None):
+        self.storage = storage
+        self.keep = keep
+        self.chunk_size = chunk_size
+        self.on_purged = on_purged
+        self.sweep_interval = sweep_interval
+        self.sweep_grace = sweep_grace
+        self.forget_blobs = forget_blobs
+        self._sweep_timer = None  # set while a sweep is scheduled
+        self._last_sweep = None  # time.monotonic() when the last sweep started
+        self._checked = LRUCache(max_entries=10000, ttl=interval)  # users whose policy ran recently
+        self._waiting = {}  # (user_email, keep, dry_run) -> job not started yet
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retention")
+        self.jobs = 0
+        self.deleted = 0
+        self.sweeps = 0
+        self.blobs_deleted = 0
+        self.failures = 0
+
+    def submit(self, user_email, keep=0, dry_run=False):
+        key = (user_email, keep, dry_run)
+        with self._lock:
+            job = self._waiting.get(key)
+            if job is None:
+                job = self._waiting[key] = PurgeJob(user_email, keep, dry_run)
+                self._pool.submit(self._run, key, job)
+        return job
+
+    def enforce(self, user_email):
+        """Queue the retention purge for user_email unless it ran within the interval; returns the job or None"""
+        if not self.keep or self._checked.get(user_email):
+            return None
+        self._checked.put(user_email, True)
+        return self.submit(user_email, keep=self.keep)
+
+    def _run(self, key, job):
+        with self._lock:
+            self._waiting.pop(key, None)
+        try:
+            purge_versions(self.storage, job.user_email, job.keep, self.chunk_size, job.dry_run,
+                           progress=job._progress)
+        except Exception as e:
+            job.error = str(e)
+        if job.deleted and self.on_purged:
+            try:
+                self.on_purged(job.user_email)
+            except Exception:
+                pass
+        with self._lock:
+            self.jobs += 1
+            self.deleted += job.deleted
+            if job.error is not None:
+                self.failures += 1
+            if job.deleted:
+                self._schedule_sweep()
+        job.finished = True
+
+    def _schedule_sweep(self):
+        # Called with the lock held
+        if not self.sweep_interval or self._sweep_timer is not None:
+            return
+        delay = 0.0
+        if self._last_sweep is not None:
+            delay = max(0.0, self._last_sweep + self.sweep_interval - time.monotonic())
+        self._sweep_timer = threading.Timer(delay, self._pool.submit, (self._sweep,))
+        self._sweep_timer.daemon = True
+        self._sweep_timer.start()
+
+    def _sweep(self):
+        with self._lock:
+            self._sweep_timer = None
+            self._last_sweep = time.monotonic()
+        try:
+            result = sweep_blobs(self.storage, self.chunk_size, grace=self.sweep_grace, forget=self.forget_blobs)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+                self._schedule_sweep()  # retried after the interval
+            return
+        with self._lock:
+            self.sweeps += 1
+            self.blobs_deleted += result.deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'jobs': self.jobs, 'deleted': self.deleted, 'sweeps': self.sweeps,
+                    'blobs_deleted': self.blobs_deleted, 'failures': self.failures,
+                    'pending': len(self._waiting)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Delete saved resume versions beyond the newest --keep per user, "
+                                                 "then the blobs no version references")
+    parser.add_argument('--keep', type=int, required=True, help="newest versions to keep per user (0 deletes all)")
+    parser.add_argument('--user', help="only purge this user's versions (default: every user)")
+    parser.add_argument('--chunk-size', type=int, default=100, help=f"deletes per batch (max {MAX_CHUNK})")
+    parser.add_argument('--dry-run', action='store_true', help="report what would be deleted without deleting")
+    parser.add_argument('--sweep-grace', type=float, default=86400.0,
+                        help=f"keep unreferenced blobs written within this many seconds (min {MIN_SWEEP_GRACE})")
+    parser.add_argument('--storage', choices=('firestore', 'sqlite'), default='firestore')
+    parser.add_argument('--sqlite-path', default='cvready.db')
+    parser.add_argument('--credentials', default='serviceAccountKey.json')
+    args = parser.parse_args(argv)
+
+    if args.storage == 'sqlite':
+        from storage import SQLiteStorage
+        storage = SQLiteStorage(args.sqlite_path)
+    else:
+        from storage import FirestoreStorage
+        from warmup import create_firestore_client
+        storage = FirestoreStorage(create_firestore_client(args.credentials))
+
+    prefix = "[dry run] " if args.dry_run else ""
+    matched = deleted = 0
+    for email in [args.user] if args.user else storage.user_emails():
+        def report(done, total, email=email):
+            if done and not args.dry_run:
+                print(f"{email}: {done}/{total} deleted", file=sys.stderr)
+        result = purge_versions(storage, email, args.keep, args.chunk_size, args.dry_run, progress=report)
+        if result.matched:
+            print(f"{prefix}{email}: {result.matched} versions older than the newest {args.keep}", file=sys.stderr)
+        matched += result.matched
+        deleted += result.deleted
+    print(f"{prefix}{matched} versions matched, {deleted} deleted", file=sys.stderr)
+
+    def report_sweep(done, total):
+        if done and not args.dry_run:
+            print(f"blobs: {done}/{total} deleted", file=sys.stderr)
+    # A dry run deletes no versions, so it counts the blobs that are unreachable already
+    result = sweep_blobs(storage, args.chunk_size, args.dry_run, progress=report_sweep, grace=args.sweep_grace)
+    print(f"{prefix}{result.unreachable} of {result.scanned} blobs unreachable and older than the grace period, "
+          f"{result.deleted} deleted", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+"""Storage backends for saved resumes: Firestore, or a local SQLite file
+
+The app, ResumeStore and WriteBehindQueue talk to storage only through
+these methods, which both backends implement:
+
+    new_id(collection)            -> id for a document about to be written
+    commit(writes)                   atomically set a list of (collection, doc_id, data)
+    get(collection, doc_id)       -> document dict, or None if missing
+    delete(collection, doc_id)
+    delete_many(refs)                atomically delete a list of (collection, doc_id)
+    user_emails()                 -> sorted distinct user emails with saved resumes
+    list_documents(collection, fields)
+                                  -> [(doc_id, data)] for every document in the
+                                     collection, data holding only the given
+                                     top-level fields
+    list_resumes(user_email, start_after=None, limit=None, summary=False)
+                                  -> [(doc_id, data)] newest first (ties broken
+                                     by id), after the (created_at, doc_id)
+                                     cursor start_after; summary returns only
+                                     the name fields and created_at
+
+Documents may hold SERVER_TIMESTAMP, which the backend replaces with the
+commit time. FirestoreStorage wraps a firestore.Client (or fakes.FakeFirestore).
+SQLiteStorage keeps everything in one database file for self-hosted
+deployments and tests, with no network round trip per read.
+"""
+import base64
+import datetime
+import json
+import queue
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+
+SERVER_TIMESTAMP = object()  # replaced with the commit time when written
+
+RESUME_COLLECTION = 'resumes'
+SUMMARY_FIELDS = ['name', 'resume_data.basic_info.name', 'created_at']
+
+
+class FirestoreStorage:
+    """Storage on Firestore; listings use the composite index in firestore.indexes.json"""
+
+    def __init__(self, db):
+        self.db = db
+
+    @staticmethod
+    def _firestore():
+        # Imported on first use (the warm-up thread has usually loaded it)
+        from firebase_admin import firestore
+        return firestore
+
+    def new_id(self, collection):
+        return self.db.collection(collection).document().id
+
+    def commit(self, writes):
+        server_timestamp = self._firestore().SERVER_TIMESTAMP
+        batch = self.db.batch()
+        for collection, doc_id, data in writes:
+            data = {key: server_timestamp if value is SERVER_TIMESTAMP else value for key, value in data.items()}
+            batch.set(self.db.collection(collection).document(doc_id), data)
+        batch.commit()
+
+    def get(self, collection, doc_id):
+        snapshot = self.db.collection(collection).document(doc_id).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    def delete(self, collection, doc_id):
+        self.db.collection(collection).document(doc_id).delete()
+
+    def delete_many(self, refs):
+        # Firestore caps a batch at 500 writes; callers delete in smaller chunks
+        batch = self.db.batch()
+        for collection, doc_id in refs:
+            batch.delete(self.db.collection(collection).document(doc_id))
+        batch.commit()
+
+    def user_emails(self):
+        # Projected, so only the emails are read (still one read per document)
+        emails = {doc.to_dict().get('user_email')
+                  for doc in self.db.collection(RESUME_COLLECTION).select(['user_email']).stream()}
+        return sorted(email for email in emails if email)
+
+    def list_documents(self, collection, fields):
+        # Projected, but still one read per document
+        return [(doc.id, doc.to_dict()) for doc in self.db.collection(collection).select(fields).stream()]
+
+    def list_resumes(self, user_email, start_after=None, limit=None, summary=False):
+        query = self.db.collection(RESUME_COLLECTION)\
+            .where('user_email', '==', user_email)\
+            .order_by('created_at', direction=self._firestore().Query.DESCENDING)\
+            .order_by('__name__', direction=self._firestore().Query.DESCENDING)
+        if summary:
+            query = query.select(SUMMARY_FIELDS)
+        if start_after is not None:
+            # Every save in one batch shares its commit time, so the id breaks ties
+            created_at, doc_id = start_after
+            query = query.start_after({'created_at': created_at, '__name__': doc_id})
+        if limit is not None:
+            query = query.limit(limit)
+        return [(doc.id, doc.to_dict()) for doc in query.stream()]
+
+
+def _encode(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {'$bytes': base64.b64encode(value).decode('ascii')}
+    if isinstance(value, datetime.datetime):
+        return {'$datetime': _timestamp_text(value)}
+    raise TypeError(f"Can't store {type(value).__name__} values")
+
+
+def _decode(obj):
+    if len(obj) == 1:
+        if '$bytes' in obj:
+            return base64.b64decode(obj['$bytes'])
+        if '$datetime' in obj:
+            return datetime.datetime.fromisoformat(obj['$datetime'])
+    return obj
+
+
+def _timestamp_text(value):
+    """Fixed-width UTC text, so timestamps compare and sort as strings"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f+00:00')
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resumes (
+    id TEXT PRIMARY KEY,
+    user_email TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+DROP INDEX IF EXISTS resumes_user_created;
+CREATE INDEX IF NOT EXISTS resumes_user_created_id ON resumes (user_email, created_at DESC, id DESC);
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (collection, id)
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteStorage:
+    """Storage in a local SQLite database in WAL mode, behind a small connection pool
+
+    Saved resumes go in a `resumes` table whose (user_email, created_at, id)
+    index serves the history listing; other collections (resume blobs)
+    share a generic `documents` table. WAL lets readers run alongside the
+    single writer, so pool_size threads can read at once while the write
+    queue commits. Documents are stored as JSON, with bytes and datetimes
+    tagged so they round-trip.
+    """
+
+    def __init__(self, path, pool_size=4, busy_timeout=5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._clock_lock = threading.Lock()
+        self._last_timestamp = None
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # With WAL, NORMAL never corrupts the file; a power cut may only lose the last commits
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Borrow a pooled connection, opening one if none is idle (at most pool_size at once)"""
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+            finally:
+                self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _now(self):
+        """Commit timestamp, strictly increasing so history order and paging cursors are unambiguous"""
+        with self._clock_lock:
+            now = datetime.datetime.now(datetime.timezone.utc)
+            if self._last_timestamp is not None and now <= self._last_timestamp:
+                now = self._last_timestamp + datetime.timedelta(microseconds=1)
+            self._last_timestamp = now
+            return now
+
+    def new_id(self, collection):
+        return uuid.uuid4().hex
+
+    def commit(self, writes):
+        with self._connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            for collection, doc_id, data in writes:
+                if any(value is SERVER_TIMESTAMP for value in data.values()):
+                    now = self._now()
+                    data = {key: now if value is SERVER_TIMESTAMP else value for key, value in data.items()}
+                text = json.dumps(data, default=_encode, separators=(',', ':'), ensure_ascii=False)
+                if collection == RESUME_COLLECTION:
+                    created_at = data.get('created_at')
+                    conn.execute(
+                        'INSERT OR REPLACE INTO resumes (id, user_email, created_at, name, data) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        (doc_id, data.get('user_email', ''),
+                         _timestamp_text(created_at) if created_at else '', _resume_name(data), text))
+                else:
+                    conn.execute('INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)',
+                                 (collection, doc_id, text))
+            conn.execute('COMMIT')
+
+    def get(self, collection, doc_id):
+        with self._connection() as conn:
+            if collection == RESUME_COLLECTION:
+                row = conn.execute('SELECT data FROM resumes WHERE id = ?', (doc_id,)).fetchone()
+            else:
+                row = conn.execute('SELECT data FROM documents WHERE collection = ? AND id = ?',
+                                   (collection, doc_id)).fetchone()
+        return json.loads(row[0], object_hook=_decode) if row else None
+
+    def delete(self, collection, doc_id):
+        with self._connection() as conn:
+            if collection == RESUME_COLLECTION:
+                conn.execute('DELETE FROM resumes WHERE id = ?', (doc_id,))
+            else:
+                conn.execute('DELETE FROM documents WHERE collection = ? AND id = ?', (collection, doc_id))
+
+    def delete_many(self, refs):
+        with self._connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany('DELETE FROM resumes WHERE id = ?',
+                             [(doc_id,) for collection, doc_id in refs if collection == RESUME_COLLECTION])
+            conn.executemany('DELETE FROM documents WHERE collection = ? AND id = ?',
+                             [ref for ref in refs if ref[0] != RESUME_COLLECTION])
+            conn.execute('COMMIT')
+
+    def user_emails(self):
+        with self._connection() as conn:
+            # Answered from the history index
+            rows = conn.execute('SELECT DISTINCT user_email FROM resumes ORDER BY user_email').fetchall()
+        return [email for email, in rows if email]
+
+    def list_documents(self, collection, fields):
+        # The fields are picked out in SQL, so large payloads are never decoded
+        projection = 'json_object({})'.format(', '.join('?, json_extract(data, ?)' for _ in fields))
+        params = [param for field in fields for param in (field, f'$.{field}')]
+        with self._connection() as conn:
+            if collection == RESUME_COLLECTION:
+                rows = conn.execute(f'SELECT id, {projection} FROM resumes', params).fetchall()
+            else:
+                rows = conn.execute(f'SELECT id, {projection} FROM documents WHERE collection = ?',
+                                    params + [collection]).fetchall()
+        documents = []
+        for doc_id, text in rows:
+            data = json.loads(text, object_hook=_decode)
+            documents.append((doc_id, {field: value for field, value in data.items() if value is not None}))
+        return documents
+
+    def list_resumes(self, user_email, start_after=None, limit=None, summary=False):
+        columns = 'id, name, created_at' if summary else 'id, data'
+        sql = f'SELECT {columns} FROM resumes WHERE user_email = ?'
+        params = [user_email]
+        if start_after is not None:
+            created_at, doc_id = start_after
+            sql += ' AND (created_at, id) < (?, ?)'
+            params.extend((_timestamp_text(created_at), doc_id))
+        sql += ' ORDER BY created_at DESC, id DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self._connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        if summary:
+            return [(doc_id, {'name': name, 'created_at': datetime.datetime.fromisoformat(created_at)})
+                    for doc_id, name, created_at in rows]
+        return [(doc_id, json.loads(text, object_hook=_decode)) for doc_id, text in rows]
+
+
+def _resume_name(data):
+    # 'name' is top-level on content-addressed versions, nested on older documents
+    return data.get('name') or (data.get('resume_data') or {}).get('basic_info', {}).get('name') or ''
@@ -0,0 +1,103 @@
+"""Background start-up: create the Firebase and Gemini clients and warm their connections
+
+Importing firebase_admin and google.genai, loading credentials and the
+first TLS/gRPC handshakes take over a second on a cold container. Warmup
+does all of it on background threads as soon as the server handles its
+first script run, so the page can render while the clients come up.
+Callers block only when they actually need a client.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def create_firestore_client(credentials_source):
+    """Initialize the default Firebase app (if needed) and return a Firestore client"""
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    try:
+        firebase_admin.get_app()
+    except ValueError:
+        firebase_admin.initialize_app(credentials.Certificate(credentials_source))
+    return firestore.client()
+
+
+def create_gemini_client(api_key):
+    from google import genai
+    return genai.Client(api_key=api_key) if api_key else None
+
+
+class Warmup:
+    """Futures for the Firestore and Gemini clients, created on a small thread pool
+
+    firestore() and gemini() wait for the client (re-raising any creation
+    error). With warm_connections, a cheap request is then sent on each
+    client so the first real request reuses an open channel; failures there
+    are logged and otherwise ignored. PDF templates are compiled in the
+    background too. timings holds the seconds each step took.
+    create_firestore and create_gemini build the clients from the
+    credentials and API key; they can be swapped for stand-ins.
+    """
+
+    def __init__(self, firebase_credentials, gemini_api_key, gemini_model=None, warm_connections=True,
+                 create_firestore=create_firestore_client, create_gemini=create_gemini_client):
+        self.timings = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="warmup")
+        self._firestore = self._pool.submit(self._timed, 'firestore_client',
+                                            create_firestore, firebase_credentials)
+        self._gemini = self._pool.submit(self._timed, 'gemini_client', create_gemini, gemini_api_key)
+        self._pool.submit(self._timed, 'pdf_templates', self._compile_templates)
+        if warm_connections:
+            self._firestore.add_done_callback(
+                lambda future: self._warm(future, 'firestore_channel', self._ping_firestore))
+            self._gemini.add_done_callback(
+                lambda future: self._warm(future, 'gemini_connection',
+                                          lambda client: self._ping_gemini(client, gemini_model)))
+
+    def firestore(self, timeout=None):
+        return self._firestore.result(timeout)
+
+    def gemini(self, timeout=None):
+        return self._gemini.result(timeout)
+
+    def _timed(self, name, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.timings[name] = time.perf_counter() - start
+
+    def _warm(self, future, name, ping):
+        if future.exception() is not None or future.result() is None:
+            return
+        try:
+            self._pool.submit(self._timed, name, ping, future.result())
+        except RuntimeError:
+            pass  # the pool is shutting down with the interpreter
+
+    @staticmethod
+    def _ping_firestore(db):
+        try:
+            # A point read of a document that doesn't exist opens the gRPC channel
+            db.collection('resumes').document('_warmup').get()
+        except Exception as e:
+            logger.warning("Firestore warm-up failed: %s", e)
+
+    @staticmethod
+    def _ping_gemini(client, model):
+        try:
+            # Model metadata is free and opens the HTTPS connection the generations reuse
+            client.models.get(model=model)
+        except Exception as e:
+            logger.warning("Gemini warm-up failed: %s", e)
+
+    @staticmethod
+    def _compile_templates():
+        from pdf_templates import TEMPLATES, get_template
+        for name in TEMPLATES:
+            get_template(name)